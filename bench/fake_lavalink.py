@@ -0,0 +1,242 @@
+# bench/fake_lavalink.py
+import asyncio
+import base64
+import json
+import logging
+import random
+
+from aiohttp import web, WSMsgType
+
+logger = logging.getLogger(__name__)
+
+
+class FakeLavalink:
+    """In-process stand-in for a Lavalink v4 node.
+
+    Implements what the bot and wavelink use: /v4/info, /v4/stats,
+    /v4/loadtracks, the session and player REST routes, and the websocket
+    with ready, TrackStartEvent and TrackEndEvent. Every REST call waits
+    ``rest_latency`` seconds and every TrackStart ``start_latency`` seconds
+    (each with up to ``jitter`` of that added at random) to stand in for
+    network and audio loading time.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, password: str = "bench",
+                 rest_latency: float = 0.0, start_latency: float = 0.0, jitter: float = 0.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.rest_latency = rest_latency
+        self.start_latency = start_latency
+        self.jitter = jitter
+        self.session_id = "bench-session"
+        self.tracks: dict[str, dict] = {}
+        self.players: dict[int, dict] = {}
+        self.requests = 0
+        self._ws: web.WebSocketResponse | None = None
+        self._runner: web.AppRunner | None = None
+        self._pending: set[asyncio.Task] = set()
+
+    @property
+    def uri(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # --- lifecycle ---
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/version", self._version)
+        app.router.add_get("/v4/info", self._info)
+        app.router.add_get("/v4/stats", self._stats)
+        app.router.add_get("/v4/loadtracks", self._loadtracks)
+        app.router.add_get("/v4/websocket", self._websocket)
+        app.router.add_patch("/v4/sessions/{session}", self._update_session)
+        app.router.add_get("/v4/sessions/{session}/players", self._get_players)
+        app.router.add_get("/v4/sessions/{session}/players/{guild}", self._get_player)
+        app.router.add_patch("/v4/sessions/{session}/players/{guild}", self._update_player)
+        app.router.add_delete("/v4/sessions/{session}/players/{guild}", self._destroy_player)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        if not self.port:
+            self.port = self._runner.addresses[0][1]
+        logger.info(f"Fake Lavalink listening on {self.uri}")
+
+    async def stop(self):
+        for task in list(self._pending):
+            task.cancel()
+        if self._ws is not None:
+            await self._ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    # --- helpers ---
+    async def _delay(self, base: float):
+        if base > 0:
+            await asyncio.sleep(base + random.uniform(0, base * self.jitter))
+
+    def _authorized(self, request: web.Request) -> bool:
+        return request.headers.get("Authorization") == self.password
+
+    def make_track(self, identifier: str, title: str | None = None, length: int = 180_000) -> dict:
+        encoded = base64.b64encode(f"bench:{identifier}".encode()).decode()
+        track = {
+            "encoded": encoded,
+            "info": {
+                "identifier": identifier,
+                "isSeekable": True,
+                "author": "Bench Artist",
+                "length": length,
+                "isStream": False,
+                "position": 0,
+                "title": title or f"Bench Track {identifier}",
+                "uri": f"https://example.invalid/watch?v={identifier}",
+                "artworkUrl": None,
+                "isrc": None,
+                "sourceName": "youtube",
+            },
+            "pluginInfo": {},
+            "userData": {},
+        }
+        self.tracks[encoded] = track
+        return track
+
+    async def send_event(self, payload: dict):
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.send_str(json.dumps(payload))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _start_track(self, guild_id: int, track: dict):
+        await self._delay(self.start_latency)
+        player = self.players.get(guild_id)
+        if not player or player["track"] is not track:
+            return
+        await self.send_event({"op": "event", "type": "TrackStartEvent", "guildId": str(guild_id), "track": track})
+
+    async def end_track(self, guild_id: int, reason: str = "finished"):
+        """Finish the guild's current track as if it played to the end."""
+        player = self.players.get(guild_id)
+        if not player or player["track"] is None:
+            return
+        track, player["track"] = player["track"], None
+        await self.send_event({"op": "event", "type": "TrackEndEvent", "guildId": str(guild_id), "track": track, "reason": reason})
+
+    def _player_json(self, guild_id: int) -> dict:
+        player = self.players.get(guild_id) or {}
+        return {
+            "guildId": str(guild_id),
+            "track": player.get("track"),
+            "volume": player.get("volume", 100),
+            "paused": player.get("paused", False),
+            "state": {"time": 0, "position": 0, "connected": True, "ping": 0},
+            "voice": player.get("voice", {"token": "", "endpoint": "", "sessionId": ""}),
+            "filters": player.get("filters", {}),
+        }
+
+    # --- routes ---
+    async def _version(self, request):
+        return web.Response(text="4.0.0")
+
+    async def _info(self, request):
+        return web.json_response({
+            "version": {"semver": "4.0.0", "major": 4, "minor": 0, "patch": 0, "preRelease": None, "build": None},
+            "buildTime": 0,
+            "git": {"branch": "bench", "commit": "0", "commitTime": 0},
+            "jvm": "bench",
+            "lavaplayer": "bench",
+            "sourceManagers": ["youtube", "local", "http"],
+            "filters": ["equalizer", "timescale"],
+            "plugins": [],
+        })
+
+    async def _stats(self, request):
+        playing = sum(1 for p in self.players.values() if p.get("track"))
+        return web.json_response({
+            "players": len(self.players),
+            "playingPlayers": playing,
+            "uptime": 0,
+            "memory": {"free": 0, "used": 0, "allocated": 0, "reservable": 0},
+            "cpu": {"cores": 1, "systemLoad": 0.0, "lavalinkLoad": 0.0},
+            "frameStats": None,
+        })
+
+    async def _loadtracks(self, request):
+        self.requests += 1
+        await self._delay(self.rest_latency)
+        identifier = request.query.get("identifier", "")
+        prefix, _, query = identifier.partition(":")
+        if "://" in identifier:
+            if "list=" in identifier:
+                tracks = [self.make_track(f"pl{abs(hash(identifier)) % 10**8}-{i}") for i in range(10)]
+                return web.json_response({"loadType": "playlist", "data": {
+                    "info": {"name": "Bench Playlist", "selectedTrack": -1}, "pluginInfo": {}, "tracks": tracks}})
+            return web.json_response({"loadType": "track", "data": self.make_track(str(abs(hash(identifier)) % 10**8))})
+        if prefix.endswith("search") and query:
+            key = abs(hash(query)) % 10**8
+            tracks = [self.make_track(f"{key}-{i}", title=f"{query} ({i})") for i in range(5)]
+            return web.json_response({"loadType": "search", "data": tracks})
+        return web.json_response({"loadType": "empty", "data": {}})
+
+    async def _websocket(self, request):
+        if not self._authorized(request):
+            return web.Response(status=401)
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self._ws = ws
+        await ws.send_str(json.dumps({"op": "ready", "resumed": False, "sessionId": self.session_id}))
+        async for msg in ws:
+            if msg.type in (WSMsgType.ERROR, WSMsgType.CLOSE):
+                break
+        return ws
+
+    async def _update_session(self, request):
+        self.requests += 1
+        data = await request.json()
+        return web.json_response({"resuming": data.get("resuming", False), "timeout": data.get("timeout", 60)})
+
+    async def _get_players(self, request):
+        return web.json_response([self._player_json(g) for g in self.players])
+
+    async def _get_player(self, request):
+        guild_id = int(request.match_info["guild"])
+        if guild_id not in self.players:
+            return web.json_response({"status": 404, "error": "Not Found", "message": "Player not found"}, status=404)
+        return web.json_response(self._player_json(guild_id))
+
+    async def _update_player(self, request):
+        self.requests += 1
+        await self._delay(self.rest_latency)
+        guild_id = int(request.match_info["guild"])
+        data = await request.json()
+        no_replace = request.query.get("noReplace", "false").lower() == "true"
+        player = self.players.setdefault(guild_id, {"track": None})
+
+        for key in ("volume", "paused", "filters", "voice"):
+            if key in data:
+                player[key] = data[key]
+
+        if "track" in data:
+            encoded = (data["track"] or {}).get("encoded")
+            current = player["track"]
+            if encoded is None:
+                if current is not None:
+                    player["track"] = None
+                    self._spawn(self.send_event({"op": "event", "type": "TrackEndEvent", "guildId": str(guild_id),
+                                                 "track": current, "reason": "stopped"}))
+            elif not (no_replace and current is not None):
+                track = self.tracks.get(encoded) or {"encoded": encoded, "info": self.make_track(encoded[:16])["info"],
+                                                     "pluginInfo": {}, "userData": {}}
+                player["track"] = track
+                if current is not None:
+                    self._spawn(self.send_event({"op": "event", "type": "TrackEndEvent", "guildId": str(guild_id),
+                                                 "track": current, "reason": "replaced"}))
+                self._spawn(self._start_track(guild_id, track))
+        return web.json_response(self._player_json(guild_id))
+
+    async def _destroy_player(self, request):
+        self.requests += 1
+        self.players.pop(int(request.match_info["guild"]), None)
+        return web.Response(status=204)
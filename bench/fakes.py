@@ -0,0 +1,165 @@
+# bench/fakes.py
+import asyncio
+import itertools
+import logging
+from types import SimpleNamespace
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+_ids = itertools.count(10_000)
+
+
+class FakeBot:
+    """Just enough of discord.Bot for MusicPlayer, the cogs and wavelink.
+
+    ``dispatch`` delivers events to registered cog listeners (and to any
+    extra callbacks the benchmark hooks in) as tasks, like the real client.
+    """
+
+    def __init__(self):
+        self.user = discord.Object(id=1)
+        self.guilds: dict[int, "FakeGuild"] = {}
+        self.channels: dict[int, "FakeVoiceChannel"] = {}
+        self._listeners: dict[str, list] = {}
+
+    def add_cog(self, cog):
+        for name, method in cog.get_listeners():
+            self.add_listener(method, name)
+
+    def add_listener(self, func, name: str):
+        self._listeners.setdefault(name, []).append(func)
+
+    def dispatch(self, event: str, *args, **kwargs):
+        for func in self._listeners.get(f"on_{event}", ()):
+            asyncio.create_task(func(*args, **kwargs))
+
+    async def wait_until_ready(self):
+        return None
+
+    def get_guild(self, guild_id: int):
+        return self.guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    def make_guild(self, guild_id: int) -> "FakeGuild":
+        guild = FakeGuild(self, guild_id)
+        self.guilds[guild_id] = guild
+        self.channels[guild.voice_channel.id] = guild.voice_channel
+        return guild
+
+
+class FakeMember:
+    def __init__(self, member_id: int, guild: "FakeGuild", channel: "FakeVoiceChannel | None" = None, bot: bool = False):
+        self.id = member_id
+        self.guild = guild
+        self.bot = bot
+        self.display_name = f"member-{member_id}"
+        self.mention = f"<@{member_id}>"
+        self.guild_permissions = discord.Permissions.all()
+        self.voice = SimpleNamespace(channel=channel) if channel else None
+
+
+class FakeVoiceChannel:
+    def __init__(self, client: FakeBot, guild: "FakeGuild"):
+        self.id = next(_ids)
+        self.client = client
+        self.guild = guild
+        self.name = f"voice-{guild.id}"
+        self.rtc_region = None
+        self.members: list[FakeMember] = []
+
+    def __eq__(self, other):
+        return isinstance(other, FakeVoiceChannel) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    async def connect(self, *, cls, timeout: float = 60.0, reconnect: bool = True):
+        """Mirror discord's channel.connect(): build the protocol and run its handshake."""
+        player = cls(self.client, self)
+        self.guild.voice_client = player
+        await player.connect(timeout=timeout, reconnect=reconnect)
+        return player
+
+
+class FakeGuild:
+    def __init__(self, client: FakeBot, guild_id: int):
+        self.id = guild_id
+        self.client = client
+        self.name = f"guild-{guild_id}"
+        self.voice_channel = FakeVoiceChannel(client, self)
+        self.text_channels = []
+        self.voice_client = None
+        self.me = FakeMember(client.user.id, self, bot=True)
+
+    async def change_voice_state(self, *, channel, self_mute: bool = False, self_deaf: bool = False):
+        """Answer the voice handshake the way Discord's gateway would, straight away."""
+        player = self.voice_client
+        if channel is None or player is None:
+            self.me.voice = None
+            return
+        self.me.voice = SimpleNamespace(channel=channel)
+        await player.on_voice_state_update({
+            "guild_id": str(self.id), "channel_id": str(channel.id), "user_id": str(self.client.user.id),
+            "session_id": f"bench-{self.id}", "deaf": False, "mute": False, "self_deaf": self_deaf,
+            "self_mute": self_mute, "suppress": False, "request_to_speak_timestamp": None,
+        })
+        await player.on_voice_server_update({"token": "bench", "guild_id": str(self.id), "endpoint": "bench.invalid"})
+
+
+class _Response:
+    def __init__(self):
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+
+class _Message:
+    def __init__(self, ctx: "FakeContext"):
+        self.ctx = ctx
+
+    async def edit(self, content=None, **kwargs):
+        self.ctx.sent.append((content, kwargs))
+
+
+class _Followup:
+    def __init__(self, ctx: "FakeContext"):
+        self.ctx = ctx
+
+    async def send(self, content=None, **kwargs):
+        self.ctx.sent.append((content, kwargs))
+        return _Message(self.ctx)
+
+
+class FakeContext:
+    """ApplicationContext stand-in that records every reply."""
+
+    def __init__(self, bot: FakeBot, guild: FakeGuild, author: FakeMember, command: str = "bench"):
+        self.bot = bot
+        self.guild = guild
+        self.author = author
+        self.command = SimpleNamespace(qualified_name=command)
+        self.interaction = SimpleNamespace(created_at=discord.utils.utcnow(), response=_Response())
+        self.followup = _Followup(self)
+        self.sent: list[tuple] = []
+
+    @property
+    def voice_client(self):
+        return self.guild.voice_client
+
+    async def defer(self, ephemeral: bool = False):
+        self.interaction.response._done = True
+
+    async def respond(self, content=None, **kwargs):
+        self.interaction.response._done = True
+        self.sent.append((content, kwargs))
+
+
+def make_context(bot: FakeBot, guild: FakeGuild, command: str) -> FakeContext:
+    """A fresh interaction from a member sitting in the guild's voice channel."""
+    author = FakeMember(next(_ids), guild, guild.voice_channel)
+    return FakeContext(bot, guild, author, command)
@@ -0,0 +1,206 @@
+# bench/run.py
+"""Playback-path benchmark against an in-process fake Lavalink node.
+
+Drives the real CommandsCog / MusicPlayer / EventHandler code through
+wavelink against bench.fake_lavalink, with fake Discord guilds and
+interaction contexts from bench.fakes. No Discord connection or Lavalink
+JVM is needed.
+
+Run from the repository root:
+
+    python -m bench.run --guilds 1,100,1000 --rest-latency 0.005 --start-latency 0.02
+
+Each scale runs /play, /playnext, /skip and a TrackEnd -> next TrackStart
+chain once per simulated guild, all guilds concurrently, and reports
+ops/sec and p50/p95/p99/max latency per operation.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Result:
+    def __init__(self, scale: int, op: str):
+        self.scale = scale
+        self.op = op
+        self.latencies: list[float] = []
+        self.failures = 0
+        self.wall = 0.0
+
+    def row(self) -> str:
+        if not self.latencies:
+            return f"{self.scale:>6} {self.op:<12} {'-':>6} {'-':>9} {'all failed':>36} {self.failures:>6}"
+        ms = [v * 1000 for v in self.latencies]
+        ops = len(self.latencies) / self.wall if self.wall else 0.0
+        return (f"{self.scale:>6} {self.op:<12} {len(ms):>6} {ops:>9.1f} "
+                f"{percentile(ms, 0.5):>8.1f} {percentile(ms, 0.95):>8.1f} {percentile(ms, 0.99):>8.1f} "
+                f"{max(ms):>8.1f} {self.failures:>6}")
+
+
+HEADER = f"{'guilds':>6} {'op':<12} {'n':>6} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'failed':>6}"
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.results: list[Result] = []
+        self._starts: dict[int, asyncio.Future] = {}
+
+    async def setup(self):
+        from bench.fake_lavalink import FakeLavalink
+        from bench.fakes import FakeBot
+        from cogs.commands import CommandsCog
+        from cogs.events import EventHandler
+        from core.nodes import NodePool, NodeSpec
+        from core.player_manager import PlayerManager
+
+        self.server = FakeLavalink(rest_latency=self.args.rest_latency, start_latency=self.args.start_latency,
+                                   jitter=self.args.jitter)
+        await self.server.start()
+
+        self.bot = FakeBot()
+        self.bot.players = PlayerManager(self.bot)
+        self.bot.players.nodes = NodePool(self.bot, specs=[NodeSpec("bench", self.server.uri, self.server.password)])
+        await self.bot.players.nodes.connect(timeout=10)
+        if not self.bot.players.nodes.ready.is_set():
+            raise RuntimeError("Could not connect to the fake Lavalink node")
+
+        self.commands = CommandsCog(self.bot)
+        self.bot.add_cog(EventHandler(self.bot))
+        self.bot.add_listener(self._on_track_start, "on_wavelink_track_start")
+
+    async def teardown(self):
+        import wavelink
+        await wavelink.Pool.close()
+        await self.server.stop()
+
+    async def _on_track_start(self, payload):
+        fut = self._starts.pop(payload.player.guild.id, None) if payload.player else None
+        if fut and not fut.done():
+            fut.set_result(time.perf_counter())
+
+    def _expect_start(self, guild_id: int) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._starts[guild_id] = fut
+        return fut
+
+    async def _measure(self, result: Result, guilds, op):
+        async def one(guild):
+            try:
+                latency = await op(guild)
+            except Exception as e:
+                logging.getLogger("bench").warning(f"{result.op} failed in guild {guild.id}: {e!r}")
+                result.failures += 1
+                return
+            result.latencies.append(latency)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(g) for g in guilds))
+        result.wall = time.perf_counter() - started
+        self.results.append(result)
+        print(result.row(), flush=True)
+
+    async def _wait_start(self, fut: asyncio.Future, t0: float) -> float:
+        return await asyncio.wait_for(fut, self.args.timeout) - t0
+
+    async def run_scale(self, scale: int, base_id: int):
+        from bench.fakes import make_context
+        from core.tracks import TrackRef
+        cog = type(self.commands)
+        guilds = [self.bot.make_guild(base_id + i) for i in range(scale)]
+
+        async def play(guild):
+            ctx = make_context(self.bot, guild, "play")
+            fut = self._expect_start(guild.id)
+            t0 = time.perf_counter()
+            await cog.play.callback(self.commands, ctx, f"bench song {guild.id}")
+            return await self._wait_start(fut, t0)
+
+        async def playnext(guild):
+            ctx = make_context(self.bot, guild, "playnext")
+            t0 = time.perf_counter()
+            await cog.playnext.callback(self.commands, ctx, f"bench next {guild.id}")
+            return time.perf_counter() - t0
+
+        async def skip(guild):
+            ctx = make_context(self.bot, guild, "skip")
+            fut = self._expect_start(guild.id)
+            t0 = time.perf_counter()
+            await cog.skip.callback(self.commands, ctx)
+            return await self._wait_start(fut, t0)
+
+        async def track_end(guild):
+            music = self.bot.players.get(guild.id)
+            music.queue.append(TrackRef.from_playable(music.current_song))
+            fut = self._expect_start(guild.id)
+            t0 = time.perf_counter()
+            await self.server.end_track(guild.id)
+            return await self._wait_start(fut, t0)
+
+        await self._measure(Result(scale, "play"), guilds, play)
+        await self._measure(Result(scale, "playnext"), guilds, playnext)
+        await self._measure(Result(scale, "skip"), guilds, skip)
+        await self._measure(Result(scale, "track_end"), guilds, track_end)
+
+        for guild in guilds:
+            music = self.bot.players.peek(guild.id)
+            if music and music.vc:
+                music.queue.clear()
+                await music.vc.disconnect()
+                music.vc = None
+                music.current_song = None
+            self.bot.players.remove(guild.id)
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guilds", default="1,100,1000", help="comma-separated guild counts")
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="fake Lavalink REST latency (s)")
+    parser.add_argument("--start-latency", type=float, default=0.0, help="delay before TrackStart (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, as a fraction")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-operation TrackStart timeout (s)")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    # Keep history/log files out of the working tree and the metrics port closed
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.setdefault("METRICS_PORT", "0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    workdir = tempfile.mkdtemp(prefix="bot-bench-")
+    os.chdir(workdir)
+    from core.logs import setup_logging, stop_logging
+    setup_logging()
+
+    bench = Bench(args)
+    await bench.setup()
+    print(HEADER, flush=True)
+    try:
+        base_id = 1_000_000
+        for scale in (int(s) for s in args.guilds.split(",") if s.strip()):
+            await bench.run_scale(scale, base_id)
+            base_id += scale
+    finally:
+        await bench.teardown()
+        stop_logging()
+
+    report = "\n".join([HEADER] + [r.row() for r in bench.results]) + "\n"
+    if args.output:
+        path = args.output if os.path.isabs(args.output) else os.path.join(REPO_ROOT, args.output)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(report)
+    print(f"Logs: {os.path.join(workdir, 'cache', 'logs')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,6 +5,9 @@ from discord import option
 import logging
 import asyncio
 from core.config import DISCORD_GUILD_IDS
+from core.spotify_poller import spotify_poller
+from core.track_map import track_map_matcher
+from core.tracing import STAGES, span, tracer
 
 logger = logging.getLogger(__name__)
 
@@ -22,11 +25,11 @@ class QueueControlsView(discord.ui.View):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         if self.music.vc._paused:
-            await self.music.vc.pause(False)
+            await self.music.set_paused(False)
             embed = discord.Embed(title="Resumed", description="Resumed playback.", color=0x1DB954)
             await interaction.response.send_message(embed=embed, ephemeral=True)
         elif self.music.vc.playing:
-            await self.music.vc.pause(True)
+            await self.music.set_paused(True)
             embed = discord.Embed(title="Paused", description="Paused playback.", color=0x1DB954)
             await interaction.response.send_message(embed=embed, ephemeral=True)
         else:
@@ -35,10 +38,7 @@ class QueueControlsView(discord.ui.View):
 
     @discord.ui.button(label="⏭️ Skip", style=discord.ButtonStyle.secondary, custom_id="skip")
     async def skip(self, button: discord.ui.Button, interaction: discord.Interaction):
-        if self.music.vc and self.music.vc.playing:
-            await self.music.vc.stop()
-            if self.music.queue:
-                await self.music.start_playback()
+        if await self.music.skip():
             embed = discord.Embed(title="Skipped", description="Skipped the current song.", color=0x1DB954)
             await interaction.response.send_message(embed=embed, ephemeral=True)
         else:
@@ -83,10 +83,11 @@ class CommandsCog(commands.Cog):
     @discord.slash_command(description="Bassboost: off or 1-100")
     async def bassboost(self, ctx: discord.ApplicationContext, value: str):
         """Set bassboost filter. Value: 'off' or 1-100."""
+        music = self.players.get(ctx.guild.id)
         await ctx.defer(ephemeral=True)
         # Accept both int and 'off'
         if value.lower() == 'off':
-            ok = await self.music.set_bassboost('off')
+            ok = await music.set_bassboost('off')
             if ok:
                 embed = discord.Embed(title="Bassboost Off", description="Bassboost filter disabled.", color=0x1DB954)
             else:
@@ -100,7 +101,7 @@ class CommandsCog(commands.Cog):
         if not (1 <= level <= 100):
             embed = discord.Embed(title="Invalid Value", description="Bassboost value must be 1-100.", color=0xED4245)
             return await ctx.followup.send(embed=embed)
-        ok = await self.music.set_bassboost(level)
+        ok = await music.set_bassboost(level)
         if ok:
             embed = discord.Embed(title="Bassboost Enabled", description=f"Bassboost set to {level}.", color=0x1DB954)
         else:
@@ -122,16 +123,17 @@ class CommandsCog(commands.Cog):
         embed3 = discord.Embed(
             color=15158332,
             title="⚠️ ADMIN ONLY COMMANDS ⚠️",
-            description="🟢 **/spotify_stalk** -Stalks and plays songs from client (OAuth)\n🟢 **/spotify_stopplaying** - Stops /spotify_stalk",
+            description="🟢 **/spotify_stalk** -Stalks and plays songs from client (OAuth)\n🟢 **/spotify_stopplaying** - Stops /spotify_stalk\n🟢 **/ttfa [command]** - Time-to-first-audio percentiles per stage",
         )
         await ctx.respond(embeds=[embed1, embed2, embed3], ephemeral=True)
-    # Store stalk tasks per user
-    spotify_stalk_tasks = {}
 
     @discord.slash_command(description="Continuously sync Discord music with your Spotify playback (play/pause/seek/track change)")
     async def spotify_stalk(self, ctx: discord.ApplicationContext):
+        music = self.players.get(ctx.guild.id)
         import core.spotify_oauth as spotify_oauth
         await ctx.defer(ephemeral=True)
+        if not await self._lavalink_ready(ctx):
+            return
         user_id = str(ctx.author.id)
 
         if not ctx.author.voice or not ctx.author.voice.channel:
@@ -142,17 +144,17 @@ class CommandsCog(commands.Cog):
             )
             await ctx.followup.send(embed=embed, ephemeral=True)
             return
-        if not self.music.vc or not self.music.vc.connected:
-            await self.music.join(ctx)
+        if not music.vc or not music.vc.connected:
+            await music.join(ctx)
 
-        if user_id in self.spotify_stalk_tasks:
+        if user_id in spotify_poller:
             await ctx.followup.send("Spotify stalk is already running for you! Use /spotify_stopplaying to stop.", ephemeral=True)
             return
 
         # DEBUG: Log user_id and token presence
         logger.info(f"[SpotifyStalk] Invoked by user_id={user_id}, has_token={bool(spotify_oauth.spotify_oauth.tokens.get(user_id))}")
-        access_token = spotify_oauth.spotify_oauth.get_access_token(user_id)
-        logger.info(f"[SpotifyStalk] get_access_token returned: {bool(access_token)}")
+        access_token = await spotify_oauth.token_manager.get(user_id)
+        logger.info(f"[SpotifyStalk] token_manager.get returned: {bool(access_token)}")
         if not access_token:
             import threading
             auth_done = threading.Event()
@@ -174,138 +176,25 @@ class CommandsCog(commands.Cog):
             if not result_holder['ok']:
                 await ctx.followup.send("Spotify authorization failed or timed out. Please try again.", ephemeral=True)
                 return
-            access_token = spotify_oauth.spotify_oauth.get_access_token(user_id)
+            access_token = await spotify_oauth.token_manager.get(user_id)
             if not access_token:
                 await ctx.followup.send("Spotify authorization did not complete. Please try again.", ephemeral=True)
                 return
 
-        # Start background stalk task
-        logger.info(f"[SpotifyStalk] Starting stalk task for user_id={user_id}")
-        async def stalk_task():
-            import logging
-            import os
-
-            spotify_log_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'cache', 'logs', 'spotify.log')
-            os.makedirs(os.path.dirname(spotify_log_path), exist_ok=True)
-            spotify_logger = logging.getLogger('spotify_logger')
-            spotify_logger.setLevel(logging.INFO)
-            if not spotify_logger.handlers:
-                handler = logging.FileHandler(spotify_log_path, encoding='utf-8')
-                formatter = logging.Formatter('%(asctime)s - %(message)s')
-                handler.setFormatter(formatter)
-                spotify_logger.addHandler(handler)
-
-            last_track_id = None
-            last_is_playing = None
-            last_position = None
-            error_count = 0
-            try:
-                while True:
-                    try:
-                        data = await asyncio.wait_for(
-                            asyncio.to_thread(spotify_oauth.spotify_oauth.get_currently_playing, user_id),
-                            timeout=10
-                        )
-                    except asyncio.TimeoutError:
-                        spotify_logger.warning(f"[SpotifyStalk] Spotify API timeout for user_id={user_id}. Retrying in 8s.")
-                        await asyncio.sleep(8)
-                        continue
-                    except Exception as e:
-                        spotify_logger.error(f"[SpotifyStalk] Spotify API error: {e}", exc_info=True)
-                        error_count += 1
-                        await asyncio.sleep(8)
-                        if error_count > 5:
-                            await ctx.followup.send("Spotify stalk stopped due to repeated errors.", ephemeral=True)
-                            self.spotify_stalk_tasks.pop(user_id, None)
-                            return
-                        continue
-                    error_count = 0
-                    spotify_logger.info(f"[SpotifyStalk] Spotify data for user_id={user_id}: {repr(data)}")
-                    if not data:
-                        spotify_logger.warning(f"[SpotifyStalk] get_currently_playing returned None for user_id={user_id}. This usually means the access token is invalid, expired, or the Spotify account is not actively playing on a device.")
-                        await asyncio.sleep(4)
-                        continue
-                    if 'error' in data:
-                        spotify_logger.warning(f"[SpotifyStalk] Spotify API error for user_id={user_id}: {data['error']}")
-                        await asyncio.sleep(8)
-                        continue
-                    if not data.get("item"):
-                        spotify_logger.info(f"[SpotifyStalk] No track playing for user_id={user_id}. Full data: {repr(data)}")
-                        await asyncio.sleep(3)
-                        continue
-                    item = data["item"]
-                    track_id = item.get("id")
-                    track_name = item.get("name")
-                    artists = ", ".join([a["name"] for a in item.get("artists", [])])
-                    is_playing = data.get("is_playing", False)
-                    position_ms = data.get("progress_ms", 0)
-
-                    #+0.5s offset for better sync
-                    seek_ms = max(0, position_ms + 1000)
-
-                    spotify_logger.info(f"[SpotifyStalk] Track: {track_name}, Artists: {artists}, Playing: {is_playing}, Position: {position_ms}, Seek: {seek_ms}")
-
-                    # Always seek to correct position after any play/pause/track change
-                    if track_id != last_track_id:
-                        author = item["artists"][0]["name"] if item.get("artists") else ""
-                        query = f"{track_name} {artists} {author}".strip()
-                        spotify_logger.info(f"[SpotifyStalk] New track detected. Query: {query}")
-                        if self.music.vc and self.music.vc.playing:
-                            spotify_logger.info(f"[SpotifyStalk] Stopping current playback for new track.")
-                            await self.music.vc.stop()
-                        self.music.queue.clear()
-                        track = await self.music.play_next(ctx, query)
-                        spotify_logger.info(f"[SpotifyStalk] play_next returned: {track}")
-                        await asyncio.sleep(0.5)
-                        await self.music.seek(seek_ms)
-                        last_track_id = track_id
-                        last_position = seek_ms
-                        last_is_playing = is_playing
-                    else:
-                        seek_needed = False
-                        if last_position is not None and abs(seek_ms - last_position) > 1800:
-                            seek_needed = True
-                        if is_playing != last_is_playing:
-                            seek_needed = True
-                        if seek_needed:
-                            spotify_logger.info(f"[SpotifyStalk] Seeking to {seek_ms}")
-                            await self.music.seek(seek_ms)
-                        if is_playing != last_is_playing:
-                            if self.music.vc and self.music.vc.connected:
-                                spotify_logger.info(f"[SpotifyStalk] Pausing/Resuming: {not is_playing}")
-                                await self.music.vc.pause(not is_playing)
-                            last_is_playing = is_playing
-                        last_position = seek_ms
-
-                    await asyncio.sleep(2.5)
-            except asyncio.CancelledError:
-                pass
-            except Exception as e:
-                spotify_logger.error(f"[SpotifyStalk] Error: {e}", exc_info=True)
-                error_count += 1
-                if error_count > 5:
-                    await ctx.followup.send("Spotify stalk stopped due to repeated errors.", ephemeral=True)
-                    self.spotify_stalk_tasks.pop(user_id, None)
-            finally:
-                self.spotify_stalk_tasks.pop(user_id, None)
-
-        task = asyncio.create_task(stalk_task())
-        self.spotify_stalk_tasks[user_id] = task
+        logger.info(f"[SpotifyStalk] Starting stalk for user_id={user_id}")
+        spotify_poller.add(user_id, ctx.guild.id, ctx)
         await ctx.followup.send("Spotify stalk started! Use /spotify_stopplaying to stop.", ephemeral=True)
 
     @discord.slash_command(description="Stop Spotify-based playback and stalk mode (stops music in Discord)")
     async def spotify_stopplaying(self, ctx: discord.ApplicationContext):
+        music = self.players.get(ctx.guild.id)
         user_id = str(ctx.author.id)
-        # Cancel stalk task if running
-        task = self.spotify_stalk_tasks.pop(user_id, None)
-        if task:
-            task.cancel()
-            await asyncio.sleep(0)
-        if self.music.vc:
-            self.music.queue.clear()
-            await self.music.stop(ctx)
+        spotify_poller.remove(user_id)
+        if music.vc:
+            music.queue.clear()
+            await music.stop(ctx)
             embed = discord.Embed(title="Stopped Spotify Playback & Stalk", color=0x1DB954)
-            view = QueueControlsView(self.music, ctx)
+            view = QueueControlsView(music, ctx)
             await ctx.respond(embed=embed, view=view, ephemeral=True)
         else:
             embed = discord.Embed(title="Not Connected", description="Not connected to a voice channel.", color=0xED4245)
@@ -313,7 +202,19 @@ class CommandsCog(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.music = bot.music_player
+        self.players = bot.players
+
+    async def _lavalink_ready(self, ctx):
+        """Wait briefly for a Lavalink node; tell the user to retry if none comes up."""
+        if await self.players.nodes.wait_ready():
+            return True
+        embed = discord.Embed(
+            title="Music Backend Unavailable",
+            description="The music server is starting up or reconnecting. Please try again in a moment.",
+            color=0xED4245
+        )
+        await ctx.followup.send(embed=embed, ephemeral=True)
+        return False
 
     def _song_line(self, song, show_length=False):
         title = getattr(song, 'title', 'Unknown')
@@ -358,26 +259,34 @@ class CommandsCog(commands.Cog):
 
     @discord.slash_command(description="Add a track to the front of the queue and play next.")
     async def playnext(self, ctx: discord.ApplicationContext, query: str):
-        await ctx.defer()
-        track = await self.music.play_next(ctx, query)
+        music = self.players.get(ctx.guild.id)
+        tracer.start("playnext", ctx.guild.id, ctx.interaction.created_at)
+        with span("defer"):
+            await ctx.defer()
+        with span("ready"):
+            if not await self._lavalink_ready(ctx):
+                return
+        track = await music.play_next(ctx, query)
         if track:
             embed = self._song_embed(track, title="Track Added to Front of Queue")
-            view = QueueControlsView(self.music, ctx)
+            view = QueueControlsView(music, ctx)
             await ctx.followup.send(embed=embed, view=view)
 
     @discord.slash_command(description="Shuffle the current queue.")
     async def shuffle(self, ctx: discord.ApplicationContext):
-        self.music.shuffle_queue()
+        music = self.players.get(ctx.guild.id)
+        music.shuffle_queue()
         embed = discord.Embed(title="Queue Shuffled", color=0x1DB954)
-        view = QueueControlsView(self.music, ctx)
+        view = QueueControlsView(music, ctx)
         await ctx.respond(embed=embed, view=view)
 
     @discord.slash_command(description="Show the currently playing track.")
     async def nowplaying(self, ctx: discord.ApplicationContext):
-        song = self.music.get_nowplaying()
+        music = self.players.get(ctx.guild.id)
+        song = music.get_nowplaying()
         if song:
             embed = self._song_embed(song, title="Now Playing")
-            view = QueueControlsView(self.music, ctx)
+            view = QueueControlsView(music, ctx)
             await ctx.respond(embed=embed, view=view)
         else:
             embed = discord.Embed(title="Now Playing", description="Nothing is currently playing.", color=0xED4245)
@@ -389,21 +298,23 @@ class CommandsCog(commands.Cog):
 
     @discord.slash_command(description="Clear the song queue (admin only).")
     async def clearqueue(self, ctx: discord.ApplicationContext):
+        music = self.players.get(ctx.guild.id)
         if not ctx.author.guild_permissions.administrator:
             embed = discord.Embed(title="Permission Denied", description="Only admins can clear the queue.", color=0xED4245)
             return await ctx.respond(embed=embed, ephemeral=True)
-        self.music.clear_queue()
+        music.clear_queue()
         embed = discord.Embed(title="Queue Cleared", color=0x1DB954)
-        view = QueueControlsView(self.music, ctx)
+        view = QueueControlsView(music, ctx)
         await ctx.respond(embed=embed, view=view)
 
     @discord.slash_command(description="Seek to a specific timestamp in the current track (in seconds).")
     async def seek(self, ctx: discord.ApplicationContext, seconds: int):
+        music = self.players.get(ctx.guild.id)
         ms = seconds * 1000
-        ok = await self.music.seek(ms)
+        ok = await music.seek(ms)
         if ok:
             embed = discord.Embed(title="Seeked", description=f"Seeked to {seconds} seconds.", color=0x1DB954)
-            view = QueueControlsView(self.music, ctx)
+            view = QueueControlsView(music, ctx)
             await ctx.respond(embed=embed, view=view)
         else:
             embed = discord.Embed(title="Seek Failed", description="Failed to seek. Is something playing?", color=0xED4245)
@@ -411,16 +322,19 @@ class CommandsCog(commands.Cog):
 
     @discord.slash_command(description="Save the current queue as a playlist.")
     async def saveplaylist(self, ctx: discord.ApplicationContext, name: str):
-        ok = self.music.save_playlist(ctx.author.id, name, include_nowplaying=True)
+        music = self.players.get(ctx.guild.id)
+        await ctx.defer()
+        ok = await music.save_playlist(ctx.author.id, name, include_nowplaying=True)
         if ok:
             embed = discord.Embed(title="Playlist Saved", description=f"Playlist '{name}' saved (including current song).", color=0x1DB954)
         else:
             embed = discord.Embed(title="Playlist Not Saved", description="No songs to save in the playlist.", color=0xED4245)
-        view = QueueControlsView(self.music, ctx)
+        view = QueueControlsView(music, ctx)
         await ctx.respond(embed=embed, view=view)
     @discord.slash_command(description="Show your saved playlists.")
     async def playlists(self, ctx: discord.ApplicationContext):
-        playlists = self.music.get_playlists(ctx.author.id)
+        music = self.players.get(ctx.guild.id)
+        playlists = await music.get_playlists(ctx.author.id)
         if playlists:
             desc = '\n'.join(f"- {name}" for name in playlists)
             embed = discord.Embed(title="Your Playlists", description=desc, color=0x1DB954)
@@ -430,7 +344,8 @@ class CommandsCog(commands.Cog):
 
     @discord.slash_command(description="Delete one of your playlists by name.")
     async def deleteplaylist(self, ctx: discord.ApplicationContext, name: str):
-        ok = self.music.delete_playlist(ctx.author.id, name)
+        music = self.players.get(ctx.guild.id)
+        ok = await music.delete_playlist(ctx.author.id, name)
         if ok:
             embed = discord.Embed(title="Playlist Deleted", description=f"Deleted playlist '{name}'.", color=0x1DB954)
         else:
@@ -439,47 +354,43 @@ class CommandsCog(commands.Cog):
 
     @discord.slash_command(description="Load a playlist into the queue.")
     async def loadplaylist(self, ctx: discord.ApplicationContext, name: str):
+        music = self.players.get(ctx.guild.id)
         await ctx.defer()
+        if not await self._lavalink_ready(ctx):
+            return
         try:
-            added_tracks = await self.music.load_playlist(ctx, name, return_tracks=True)
-            if added_tracks:
-                desc = "\n".join([self._song_line(t, show_length=True) for t in added_tracks])
-                embed = discord.Embed(title="Playlist Loaded", description=f"Loaded playlist '{name}':\n{desc}", color=0x1DB954)
-            else:
-                embed = discord.Embed(title="Playlist Loaded", description=f"Loaded playlist '{name}', but no tracks found.", color=0xED4245)
-            view = QueueControlsView(self.music, ctx)
-            await ctx.followup.send(embed=embed, view=view)
+            # Progress and the final summary are posted by load_playlist itself
+            added_tracks = await music.load_playlist(ctx, name, return_tracks=True)
+            if added_tracks is None:
+                embed = discord.Embed(title="Playlist Not Found", description=f"You have no playlist named '{name}'.", color=0xED4245)
+                await ctx.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             embed = discord.Embed(title="Playlist Load Failed", description=f"Failed to load playlist '{name}': {e}", color=0xED4245)
             await ctx.followup.send(embed=embed, ephemeral=True)
 
     @discord.slash_command(description="Search for tracks by name, artist, or album.")
     async def  search(self, ctx: discord.ApplicationContext, *, query: str):
+        music = self.players.get(ctx.guild.id)
         await ctx.defer()
+        if not await self._lavalink_ready(ctx):
+            return
         if not ctx.author.voice or not ctx.author.voice.channel:
             embed = discord.Embed(title="Not in Voice Channel", description="You must be in a voice channel to use this command!", color=0xED4245)
             await ctx.followup.send(embed=embed, ephemeral=True)
             return
         # If bot is not in a VC, join user's VC
-        if not self.music.vc or not self.music.vc.connected:
-            await self.music.join(ctx)
+        if not music.vc or not music.vc.connected:
+            await music.join(ctx)
 
 
         # Check hardcoded map first (case-insensitive, strip)
-        from core.config import HARDCODED_TRACK_MAP
-        q = query.lower().strip()
-        url = HARDCODED_TRACK_MAP.get(q)
-        if not url:
-            for k, v in HARDCODED_TRACK_MAP.items():
-                if k in q:
-                    url = v
-                    break
+        url = track_map_matcher.lookup(query)
         if url:
-            tracks = await self.music.search_tracks(url)
+            tracks = await music.search_tracks(url)
             if not tracks:
-                tracks = await self.music.search_tracks(query)
+                tracks = await music.search_tracks(query)
         else:
-            tracks = await self.music.search_tracks(query)
+            tracks = await music.search_tracks(query)
         if not tracks:
             embed = discord.Embed(title="No Results", description=f"No results for '{query}'.", color=0xED4245)
             await ctx.followup.send(embed=embed, ephemeral=True)
@@ -524,46 +435,43 @@ class CommandsCog(commands.Cog):
             async def select_callback(self, select, interaction):
                 idx = int(select.values[0])
                 track = self.tracks[idx]
-                # Play the selected track immediately
-                # Clear queue and stop current
-                if self.music.vc and self.music.vc.playing:
-                    await self.music.vc.stop()
-                self.music.queue.clear()
-                self.music.queue.insert(0, track)
-                await self.music.start_playback()
+                # Play the selected track immediately, replacing the queue
+                await self.music.play_now(track, clear_queue=True)
                 embed = self.ctx.cog._song_embed(track, title="Now Playing (from Search)")
                 await interaction.response.edit_message(embed=embed, view=None)
 
         desc = "\n".join([f"{i+1}. {format_track(t)}" for i, t in enumerate(tracks[:10])])
         embed = discord.Embed(title="Search Results", description=desc, color=0x1DB954)
-        view = SearchDropdown(self.music, ctx, tracks[:10])
+        view = SearchDropdown(music, ctx, tracks[:10])
         await ctx.followup.send(embed=embed, view=view, ephemeral=True)
 
 
     @discord.slash_command(description="Toggle autoplay (play random/recommended track after queue ends)")
     @option("mode", choices=["on", "off"])
     async def autoplay(self, ctx: discord.ApplicationContext, mode: str):
+        music = self.players.get(ctx.guild.id)
         mode = mode.lower()
-        self.music.autoplay_enabled = (mode == "on")
+        music.autoplay_enabled = (mode == "on")
         embed = discord.Embed(title="Autoplay", description=f"{'Enabled' if mode == 'on' else 'Disabled'}.", color=0x1DB954)
-        view = QueueControlsView(self.music, ctx)
+        view = QueueControlsView(music, ctx)
         await ctx.respond(embed=embed, view=view)
 
     @discord.slash_command(description="Show last X played songs and replay")
     async def history(self, ctx: discord.ApplicationContext, count: int = 10, replay: int = None):
+        music = self.players.get(ctx.guild.id)
         # Clamp count
         count = max(1, min(count, 20))
-        if not self.music.history:
+        if not music.history:
             embed = discord.Embed(title="Song History", description="No song history yet.", color=0xED4245)
             await ctx.respond(embed=embed, ephemeral=True)
             return
         if replay is not None:
-            idx = replay - 1
-            if 0 <= idx < len(self.music.history):
-                track = self.music.history[idx]
-                self.music.queue.insert(0, track)
+            # Numbers match the listing below: 1 is the most recently played song
+            if 1 <= replay <= len(music.history):
+                track = music.history[-replay]
+                music.queue.appendleft(track)
                 embed = discord.Embed(title="Replayed from History", description=f"Queued **{track.title}** to play next from history.", color=0x1DB954)
-                view = QueueControlsView(self.music, ctx)
+                view = QueueControlsView(music, ctx)
                 await ctx.respond(embed=embed, view=view, ephemeral=True)
                 return
             else:
@@ -572,27 +480,29 @@ class CommandsCog(commands.Cog):
                 return
         # Show history
         lines = []
-        for i, t in enumerate(self.music.history[-count:][::-1], 1):
+        for i, t in enumerate(music.history.recent(count), 1):
             lines.append(f"{i}. {t.title} [{t.author if hasattr(t, 'author') else ''}]")
         desc = "\n".join(lines)
         embed = discord.Embed(title="Last Played Songs", description=desc, color=0x1DB954)
-        view = QueueControlsView(self.music, ctx)
+        view = QueueControlsView(music, ctx)
         await ctx.respond(embed=embed, view=view, ephemeral=True)
 
     @discord.slash_command(description="Toggle nightcore effect on or off")
     @option("mode", choices=["on", "off"])
     async def nightcore(self, ctx: discord.ApplicationContext, mode: str):
+        music = self.players.get(ctx.guild.id)
         mode = mode.lower()
-        await self.music.set_nightcore(mode == "on")
+        await music.set_nightcore(mode == "on")
         embed = discord.Embed(title="Nightcore", description=f"{'Enabled' if mode == 'on' else 'Disabled'}.", color=0x1DB954)
-        view = QueueControlsView(self.music, ctx)
+        view = QueueControlsView(music, ctx)
         await ctx.respond(embed=embed, view=view)
 
     @discord.slash_command(description="Set default volume and turn off nightcore")
     async def normalize(self, ctx: discord.ApplicationContext):
-        await self.music.normalize()
+        music = self.players.get(ctx.guild.id)
+        await music.normalize()
         embed = discord.Embed(title="Normalized", description="Volume set to default (20%) and nightcore turned off.", color=0x1DB954)
-        view = QueueControlsView(self.music, ctx)
+        view = QueueControlsView(music, ctx)
         await ctx.respond(embed=embed, view=view)
 
 
@@ -608,11 +518,17 @@ class CommandsCog(commands.Cog):
 
     @discord.slash_command(description="Play a song or playlist from YouTube/SoundCloud etc.")
     async def play(self, ctx: discord.ApplicationContext, query: str):
-        await ctx.defer()
+        music = self.players.get(ctx.guild.id)
+        tracer.start("play", ctx.guild.id, ctx.interaction.created_at)
+        with span("defer"):
+            await ctx.defer()
+        with span("ready"):
+            if not await self._lavalink_ready(ctx):
+                return
         if not ctx.author.voice or not ctx.author.voice.channel:
             embed = discord.Embed(title="Not in Voice Channel", description="You need to be in a voice channel first!", color=0xED4245)
             return await ctx.followup.send(embed=embed, ephemeral=True)
-        track_or_playlist = await self.music.search_and_play(ctx, query, return_track=True)
+        track_or_playlist = await music.search_and_play(ctx, query, return_track=True)
         if track_or_playlist:
             if isinstance(track_or_playlist, list):
                 # Playlist
@@ -620,35 +536,52 @@ class CommandsCog(commands.Cog):
                 embed = discord.Embed(title="Playlist Added", description=desc, color=0x1DB954)
             else:
                 embed = self._song_embed(track_or_playlist, title="Now Playing")
-            view = QueueControlsView(self.music, ctx)
+            view = QueueControlsView(music, ctx)
             await ctx.followup.send(embed=embed, view=view)
 
+    @discord.slash_command(description="Show time-to-first-audio percentiles per stage (admin only).")
+    @option("command", choices=["all", "play", "playnext"], required=False)
+    async def ttfa(self, ctx: discord.ApplicationContext, command: str = "all"):
+        if not ctx.author.guild_permissions.administrator:
+            embed = discord.Embed(title="Permission Denied", description="Only server administrators can use this command!", color=0xED4245)
+            return await ctx.respond(embed=embed, ephemeral=True)
+        name = None if command == "all" else command
+        stats = tracer.percentiles(name)
+        count = sum(1 for t in tracer.finished if name is None or t.command == name)
+        if not stats:
+            embed = discord.Embed(title="Time to First Audio", description="No traces recorded yet.", color=0xED4245)
+            return await ctx.respond(embed=embed, ephemeral=True)
+        rows = [f"{'stage':<12}{'p50':>8}{'p95':>8}{'p99':>8}"]
+        for stage in STAGES + ("total",):
+            if stage in stats:
+                rows.append(f"{stage:<12}" + "".join(f"{v * 1000:>6.0f}ms" for v in stats[stage]))
+        embed = discord.Embed(title="Time to First Audio", description="```\n" + "\n".join(rows) + "\n```", color=0x1DB954)
+        embed.set_footer(text=f"{count} trace(s), /{command}")
+        await ctx.respond(embed=embed, ephemeral=True)
+
     @discord.slash_command(description="Skip the current song")
     async def skip(self, ctx: discord.ApplicationContext):
-        if self.music.vc and self.music.vc.playing:
-            old_song = self.music.get_nowplaying()
-            await self.music.vc.stop()
-            if self.music.queue:
-                await self.music.start_playback()
-                new_song = self.music.get_nowplaying()
-                if new_song:
-                    embed = discord.Embed(title="Skipped", description=f"Skipped **{getattr(old_song, 'title', 'Unknown')}**. Now playing: **{getattr(new_song, 'title', 'Unknown')}**.", color=0x1DB954)
-                else:
-                    embed = discord.Embed(title="Skipped", description=f"Skipped **{getattr(old_song, 'title', 'Unknown')}**. No more songs in queue.", color=0x1DB954)
+        music = self.players.get(ctx.guild.id)
+        old_song = music.get_nowplaying()
+        if await music.skip():
+            new_song = music.get_nowplaying()
+            if new_song:
+                embed = discord.Embed(title="Skipped", description=f"Skipped **{getattr(old_song, 'title', 'Unknown')}**. Now playing: **{getattr(new_song, 'title', 'Unknown')}**.", color=0x1DB954)
             else:
                 embed = discord.Embed(title="Skipped", description=f"Skipped **{getattr(old_song, 'title', 'Unknown')}**. No more songs in queue.", color=0x1DB954)
-            view = QueueControlsView(self.music, ctx)
+            view = QueueControlsView(music, ctx)
             return await ctx.respond(embed=embed, view=view)
         embed = discord.Embed(title="Skip Failed", description="Nothing is playing.", color=0xED4245)
         await ctx.respond(embed=embed, ephemeral=True)
 
     @discord.slash_command(description="Stop and disconnect")
     async def stop(self, ctx: discord.ApplicationContext):
-        if self.music.vc:
-            self.music.queue.clear()
-            await self.music.stop(ctx)
+        music = self.players.get(ctx.guild.id)
+        if music.vc:
+            music.queue.clear()
+            await music.stop(ctx)
             embed = discord.Embed(title="Stopped & Disconnected", color=0x1DB954)
-            view = QueueControlsView(self.music, ctx)
+            view = QueueControlsView(music, ctx)
             await ctx.respond(embed=embed, view=view)
         else:
             embed = discord.Embed(title="Not Connected", description="Not connected to a voice channel.", color=0xED4245)
@@ -656,37 +589,39 @@ class CommandsCog(commands.Cog):
 
     @discord.slash_command(description="Set volume (1–100)")
     async def volume(self, ctx: discord.ApplicationContext, level: int):
+        music = self.players.get(ctx.guild.id)
         if not (1 <= level <= 100):
             embed = discord.Embed(title="Invalid Volume", description="Volume must be between 1 and 100.", color=0xED4245)
             return await ctx.respond(embed=embed, ephemeral=True)
-        if not self.music.vc or not self.music.vc.playing:
+        if not music.vc or not music.vc.playing:
             embed = discord.Embed(title="Nothing Playing", description="Nothing is playing!", color=0xED4245)
             return await ctx.respond(embed=embed, ephemeral=True)
-        self.music.volume = level / 100
-        await self.music.vc.set_volume(level)
+        await music.set_volume(level)
         embed = discord.Embed(title="Volume Set", description=f"Volume set to {level}%", color=0x1DB954)
-        view = QueueControlsView(self.music, ctx)
+        view = QueueControlsView(music, ctx)
         await ctx.respond(embed=embed, view=view)
 
     @discord.slash_command(description="Loop song or queue")
     @option("mode", choices=["single", "queue", "off"])
     async def loop(self, ctx: discord.ApplicationContext, mode: str):
-        if not self.music.vc or not self.music.vc.connected: # Check connection
+        music = self.players.get(ctx.guild.id)
+        if not music.vc or not music.vc.connected: # Check connection
             embed = discord.Embed(title="Not Connected", description="I'm not connected to a voice channel!", color=0xED4245)
             return await ctx.respond(embed=embed, ephemeral=True)
-        if not self.music.vc.playing:
+        if not music.vc.playing:
             embed = discord.Embed(title="Nothing Playing", description="Nothing is currently playing!", color=0xED4245)
             return await ctx.respond(embed=embed, ephemeral=True)
 
-        self.music.loop_mode = mode
-        logger.info(f"Loop mode set to '{mode}' for MusicPlayer instance (ID: {id(self.music)})")
+        music.loop_mode = mode
+        logger.info(f"Loop mode set to '{mode}' for guild {ctx.guild.id}")
         embed = discord.Embed(title="Loop Mode Set", description=f"Loop mode set to `{mode}`.", color=0x1DB954)
         await ctx.respond(embed=embed)
 
     @discord.slash_command(description="Show the song queue")
     async def queue(self, ctx: discord.ApplicationContext):
-        nowplaying = self.music.get_nowplaying()
-        queue = self.music.queue
+        music = self.players.get(ctx.guild.id)
+        nowplaying = music.get_nowplaying()
+        queue = music.queue
         if not nowplaying and not queue:
             embed = discord.Embed(title="Queue", description="Queue is empty.", color=0xED4245)
             return await ctx.respond(embed=embed, ephemeral=True)
@@ -700,13 +635,13 @@ class CommandsCog(commands.Cog):
             desc += "\n".join(lines)
             if len(queue) > max_display:
                 desc += f"\n...and {len(queue) - max_display} more."
-            total_ms = sum(getattr(s, 'length', 0) or 0 for s in queue)
+            total_ms = queue.total_length
             if total_ms:
                 mins = total_ms // 60000
                 secs = (total_ms // 1000) % 60
                 desc += f"\n**Total remaining:** {mins}:{secs:02d}"
         embed = discord.Embed(title="Current Queue", description=desc, color=0x1DB954)
-        view = QueueControlsView(self.music, ctx)
+        view = QueueControlsView(music, ctx)
         await ctx.respond(embed=embed, view=view, ephemeral=True)
 
     @discord.slash_command(
@@ -719,7 +654,10 @@ class CommandsCog(commands.Cog):
         audio_file: discord.Attachment = option(name="audio_file", description="Upload an audio file to play", required=True)
     ):
         """Play a local audio file with drag-and-drop support."""
+        music = self.players.get(ctx.guild.id)
         await ctx.defer(ephemeral=True)
+        if not await self._lavalink_ready(ctx):
+            return
         
         # Validate voice channel
         if not ctx.author.voice or not ctx.author.voice.channel:
@@ -754,7 +692,7 @@ class CommandsCog(commands.Cog):
         
         try:
             # Join voice channel if not already connected
-            current_vc = await self.music.join(ctx)
+            current_vc = await music.join(ctx)
             if not current_vc:
                 embed = discord.Embed(
                     title="Failed to Connect",
@@ -764,10 +702,10 @@ class CommandsCog(commands.Cog):
                 await ctx.followup.send(embed=embed, ephemeral=True)
                 return
             
-            self.music.vc = current_vc
+            music.vc = current_vc
             
             # Download and add audio file to queue
-            track = await self.music.add_audio_file(audio_file, ctx)
+            track = await music.add_audio_file(audio_file, ctx)
             if not track:
                 embed = discord.Embed(
                     title="Error",
@@ -777,8 +715,8 @@ class CommandsCog(commands.Cog):
                 await ctx.followup.send(embed=embed, ephemeral=True)
                 return
             
-            if not self.music.vc.playing and not self.music.queue:
-                await self.music.start_playback()
+            if not music.vc.playing:
+                await music.start_playback()
             
             embed = discord.Embed(
                 title="🎵 Added to Queue",
@@ -1,53 +1,58 @@
 # cogs/events.py
 import discord
-import asyncio
 import logging
 from discord.ext import commands
 import wavelink
+from core.logs import kv
+from core.metrics import INTERACTION_LATENCY, TRACK_ENDS
+from core.recommend import recommender
+from core.tracing import tracer
+from core.tracks import TrackRef
 
 logger = logging.getLogger(__name__)
 
 class EventHandler(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        try:
-             self.music_player_instance = bot.music_player
-             self.music = self.music_player_instance
-        except AttributeError:
-             logger.error("Failed to access bot.music_player in EventHandler.__init__! Music features may fail.")
-             self.music = None
-             self.music_player_instance = None
+        self.players = bot.players
 
     @commands.Cog.listener()
     async def on_ready(self):
-        logger.info(f"EventHandler Cog ready. Bot: {self.bot.user}")
+        logger.info("EventHandler Cog ready. Bot: %s", self.bot.user)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
-        music_player = self.bot.music_player
+        self.players.occupancy.update(member, before, after)
+        music_player = self.players.peek(member.guild.id)
         if not music_player or not music_player.vc or not music_player.vc.connected:
             return
 
-        if music_player.vc.channel == before.channel and before.channel != after.channel:
-            human_members = [m for m in music_player.vc.channel.members if not m.bot]
-            if not human_members:
-                logger.info(f"Bot is alone in {music_player.vc.channel.name}, scheduling disconnect.")
-                await asyncio.sleep(60) 
-                if music_player.vc and music_player.vc.connected:
-                    human_members_recheck = [m for m in music_player.vc.channel.members if not m.bot]
-                    if not human_members_recheck:
-                         logger.info(f"Disconnecting from empty channel: {music_player.vc.channel.name}")
-                         await music_player.vc.disconnect()
-                         music_player.vc = None 
-                         music_player.queue.clear()
-                         music_player.loop_mode = "off"
-                         music_player.current_song = None
+        channel = music_player.vc.channel
+        if before.channel == after.channel or channel not in (before.channel, after.channel):
+            return
+        # Someone left or joined the bot's channel: (re)arm or cancel the alone timeout
+        if self.players.occupancy.humans(channel):
+            music_player.cancel_timeout("alone")
+        else:
+            logger.info("Bot is alone in %s, scheduling disconnect.", channel.name, extra=kv(guild=member.guild.id))
+            music_player.schedule_timeout("alone")
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild):
+        # The member cache was rebuilt; recount this guild's voice channels on next use
+        self.players.occupancy.forget(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.players.occupancy.forget(guild.id)
 
     # --- Wavelink Event Listeners ---
     @commands.Cog.listener("on_wavelink_node_ready")
     async def on_wavelink_node_ready(self, payload: wavelink.NodeReadyEventPayload):
-        """Log when Lavalink node connects."""
-        logger.info(f"✅ Wavelink Node '{payload.node.identifier}' is ready!")
+        """Log when Lavalink node connects and restore players left on it."""
+        logger.info("✅ Wavelink Node %r is ready!", payload.node.identifier, extra=kv(node=payload.node.identifier, resumed=payload.resumed))
+        self.players.nodes.refresh_ready()
+        await self.players.failover.on_node_ready(payload)
 
 
     @commands.Cog.listener("on_wavelink_track_start")
@@ -55,15 +60,20 @@ class EventHandler(commands.Cog):
         """Log when a track starts and update current_song."""
         player: wavelink.Player | None = payload.player
         track: wavelink.Playable | None = payload.track
-        music_player = self.bot.music_player
+        music_player = self.players.for_player(player)
         if not music_player: return
 
         if player and track:
-            logger.info(f"Track started in {player.guild.id}: {track.title}")
+            trace = tracer.track_started(player.guild.id)
+            logger.info("Track started", extra=kv(guild=player.guild.id, track=track.title,
+                                                  trace=trace.id if trace else None,
+                                                  ttfa_ms=round(trace.total * 1000) if trace else None))
+            self.players.sessions.track_started(player.guild.id)
             if music_player.vc == player:
                 music_player.current_song = track
             else:
-                logger.warning(f"TrackStart event received for player not matching managed VC. Event Player: {player.guild.id}, Managed VC: {music_player.vc.guild.id if music_player.vc else 'None'}")
+                logger.warning("TrackStart event received for player not matching managed VC", extra=kv(
+                    guild=player.guild.id, managed=music_player.vc.guild.id if music_player.vc else None))
 
 
 
@@ -72,42 +82,45 @@ class EventHandler(commands.Cog):
         player: wavelink.Player | None = payload.player
         track: wavelink.Playable | None = payload.track
         reason: str = payload.reason
+        TRACK_ENDS.inc(reason=reason.upper())
 
-        music_player = self.bot.music_player
+        music_player = self.players.for_player(player)
         if not music_player:
-            logger.error("Cannot process track_end: self.bot.music_player is not available!")
+            logger.warning("Track end event ignored: no MusicPlayer", extra=kv(guild=player.guild.id if player and player.guild else None))
             return
 
         if not player or not music_player.vc or player != music_player.vc:
-            logger.warning(f"Track end event ignored because player ({player.guild.id if player else 'N/A'}) does not match managed VC ({music_player.vc.guild.id if music_player.vc else 'N/A'}).")
+            logger.warning("Track end event ignored because the player does not match the managed VC", extra=kv(
+                guild=player.guild.id if player else None, managed=music_player.vc.guild.id if music_player.vc else None))
             return
 
-        logger.info(f"Track ended in Cog: {track.title if track else 'N/A'}. Reason: {reason}. Player Guild: {player.guild.id}")
+        logger.info("Track ended", extra=kv(guild=player.guild.id, track=track.title if track else None, reason=reason))
 
         ended_track = track
+        recommender.record(player.guild.id, ended_track, reason)
 
         if reason.upper() == "FINISHED":
             if music_player.loop_mode == "single" and ended_track:
-                logger.info(f"Attempting to loop single track: {ended_track.title}")
+                logger.debug("Looping single track", extra=kv(guild=player.guild.id, track=ended_track.title))
                 try:
-                    await player.play(ended_track)
+                    await music_player.replay(ended_track)
                 except Exception as e:
-                    logger.error(f"Error re-playing single loop {ended_track.title} via Cog: {e}", exc_info=True)
+                    logger.error("Error re-playing single loop %s via Cog: %s", ended_track.title, e, exc_info=True,
+                                 extra=kv(guild=player.guild.id))
                     music_player.current_song = None
                     if music_player.queue:
                         logger.info("Single loop failed, attempting next in queue.")
                         await music_player.start_playback()
             elif music_player.loop_mode == "queue" and ended_track:
-                logger.info(f"Attempting to loop queue. Adding back: {ended_track.title}")
-                music_player.queue.append(ended_track)
-                logger.debug(f"Queue size after append: {len(music_player.queue)}. Calling start_playback.")
+                logger.debug("Looping queue, re-adding track", extra=kv(guild=player.guild.id, track=ended_track.title))
+                music_player.queue.append(TrackRef.from_playable(ended_track))
                 await music_player.start_playback()
             elif music_player.queue:
-                logger.info("Playing next track in queue (loop mode off).")
                 await music_player.start_playback()
             else:
                 logger.info("Queue empty, not looping. Playback finished.")
                 music_player.current_song = None
+                music_player.schedule_timeout("idle")
                 if getattr(music_player, 'autoplay_enabled', False):
                     ctx = None
                     try:
@@ -121,7 +134,8 @@ class EventHandler(commands.Cog):
                         await music_player.start_playback()
 
         elif reason.upper() == "LOAD_FAILED":
-            logger.warning(f"Track '{track.title if track else 'N/A'}' failed to load (case-insensitive check).")
+            logger.warning("Track %r failed to load (case-insensitive check).", track.title if track else None,
+                           extra=kv(guild=player.guild.id))
             if music_player.current_song == track:
                 music_player.current_song = None
             if music_player.queue:
@@ -129,13 +143,21 @@ class EventHandler(commands.Cog):
                 await music_player.start_playback()
             else:
                 logger.info("Load failed and queue is empty.")
+                music_player.schedule_timeout("idle")
 
         else: 
-            logger.debug(f"Track end reason ({reason}) doesn't require starting next song (case-insensitive check).")
+            logger.debug("Track end needs no follow-up", extra=kv(guild=player.guild.id, reason=reason))
             if reason.upper() in ("STOPPED", "REPLACED") and music_player.loop_mode != "single":
                 if reason.upper() == "STOPPED":
-                    logger.debug(f"Clearing current_song due to STOPPED and not looping single.")
                     music_player.current_song = None
+                    if not music_player.queue:
+                        music_player.schedule_timeout("idle")
+
+    @commands.Cog.listener("on_application_command_completion")
+    async def on_application_command_completion(self, ctx: discord.ApplicationContext):
+        """Record how long the interaction took from creation to completion."""
+        elapsed = (discord.utils.utcnow() - ctx.interaction.created_at).total_seconds()
+        INTERACTION_LATENCY.observe(elapsed, command=ctx.command.qualified_name)
 
 def setup(bot):
     bot.add_cog(EventHandler(bot))
\ No newline at end of file
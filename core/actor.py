@@ -0,0 +1,84 @@
+# core/actor.py
+import asyncio
+import contextvars
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class Mailbox:
+    """Single-consumer queue that runs one guild's player operations in order.
+
+    Operations are coroutine functions submitted with an optional ``key``.
+    While an operation with the same key is still waiting in the mailbox,
+    submitting it again returns the pending future instead of queueing a
+    duplicate, so redundant transitions (two "start playback" requests, a
+    double-clicked skip) collapse into one. Each operation runs in a copy of
+    its submitter's context, so the trace of the command that asked for it
+    stays current. Calls made from inside a running operation execute
+    inline, so operations may call each other without deadlocking the mailbox.
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.coalesced = 0
+        self._ops: deque = deque()
+        self._pending: dict = {}
+        self._task: asyncio.Task | None = None
+        self._running: asyncio.Task | None = None
+
+    def __len__(self):
+        return len(self._ops)
+
+    def submit(self, fn, *args, key=None) -> asyncio.Future:
+        """Queue ``fn(*args)``; returns a future for its result."""
+        if key is not None and key in self._pending:
+            self.coalesced += 1
+            return self._pending[key]
+        fut = asyncio.get_running_loop().create_future()
+        self._ops.append((key, fn, args, fut, contextvars.copy_context()))
+        if key is not None:
+            self._pending[key] = fut
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return fut
+
+    async def call(self, fn, *args, key=None):
+        """Run ``fn(*args)`` through the mailbox and wait for its result."""
+        if self._running is not None and asyncio.current_task() is self._running:
+            return await fn(*args)
+        # Shielded: a caller giving up must not cancel an operation others may share
+        return await asyncio.shield(self.submit(fn, *args, key=key))
+
+    async def _run(self):
+        while self._ops:
+            key, fn, args, fut, context = self._ops.popleft()
+            if key is not None and self._pending.get(key) is fut:
+                del self._pending[key]
+            if fut.done():
+                continue
+            self._running = asyncio.create_task(fn(*args), context=context)
+            try:
+                result = await self._running
+            except asyncio.CancelledError:
+                self._running.cancel()
+                fut.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Player operation {getattr(fn, '__name__', fn)} failed in {self.name}: {e}", exc_info=True)
+                fut.set_exception(e)
+            else:
+                fut.set_result(result)
+            finally:
+                self._running = None
+
+    def close(self):
+        """Stop the consumer and cancel everything still queued."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        while self._ops:
+            fut = self._ops.popleft()[3]
+            fut.cancel()
+        self._pending.clear()
@@ -7,6 +7,93 @@ load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 LAVALINK_HOST = os.getenv("LAVALINK_HOST", "http://localhost:2333")
 LAVALINK_PASSWORD = os.getenv("LAVALINK_PASSWORD", "youshallnotpass")
+# Multiple Lavalink nodes, comma separated: "uri|password|region,uri|password|region"
+# Password and region are optional. Empty means a single node from LAVALINK_HOST/LAVALINK_PASSWORD.
+LAVALINK_NODES = os.getenv("LAVALINK_NODES", "")
+# How often (seconds) node stats are polled for player placement
+NODE_STATS_INTERVAL = float(os.getenv("NODE_STATS_INTERVAL", "30"))
+# Node health check period and how long a node may be down before its players are moved (seconds)
+NODE_HEALTH_INTERVAL = float(os.getenv("NODE_HEALTH_INTERVAL", "2"))
+NODE_FAILOVER_GRACE = float(os.getenv("NODE_FAILOVER_GRACE", "3"))
+# Lavalink reconnect backoff (seconds) and readiness gating for commands
+NODE_BACKOFF_BASE = float(os.getenv("NODE_BACKOFF_BASE", "1"))
+NODE_BACKOFF_MAX = float(os.getenv("NODE_BACKOFF_MAX", "60"))
+NODE_CONNECT_TIMEOUT = float(os.getenv("NODE_CONNECT_TIMEOUT", "15"))
+NODE_READY_TIMEOUT = float(os.getenv("NODE_READY_TIMEOUT", "10"))
+NODE_READY_MAX_WAITERS = int(os.getenv("NODE_READY_MAX_WAITERS", "50"))
+# Capacity of wavelink's own LFU cache of search results (0 disables it)
+TRACK_CACHE_CAPACITY = int(os.getenv("TRACK_CACHE_CAPACITY", "100"))
+
+# Per-guild players are dropped after being disconnected and empty for this long (seconds)
+PLAYER_IDLE_TIMEOUT = float(os.getenv("PLAYER_IDLE_TIMEOUT", "600"))
+PLAYER_REAP_INTERVAL = float(os.getenv("PLAYER_REAP_INTERVAL", "60"))
+# Voice disconnect timeouts (seconds, 0 disables): alone in channel, paused, nothing queued
+ALONE_TIMEOUT = float(os.getenv("ALONE_TIMEOUT", "60"))
+PAUSE_TIMEOUT = float(os.getenv("PAUSE_TIMEOUT", "900"))
+IDLE_DISCONNECT_TIMEOUT = float(os.getenv("IDLE_DISCONNECT_TIMEOUT", "300"))
+TIMER_TICK = float(os.getenv("TIMER_TICK", "1"))
+TIMER_SLOTS = int(os.getenv("TIMER_SLOTS", "512"))
+
+# Lavalink track resolution cache (entries, seconds)
+TRACK_CACHE_SIZE = int(os.getenv("TRACK_CACHE_SIZE", "2048"))
+TRACK_CACHE_TTL = float(os.getenv("TRACK_CACHE_TTL", "3600"))
+TRACK_CACHE_NEGATIVE_TTL = float(os.getenv("TRACK_CACHE_NEGATIVE_TTL", "120"))
+
+# How many upcoming unresolved queue entries to resolve ahead of playback
+PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "3"))
+# Playlist loading: parallel lookups and seconds between progress embed edits
+PLAYLIST_LOAD_CONCURRENCY = int(os.getenv("PLAYLIST_LOAD_CONCURRENCY", "8"))
+PLAYLIST_PROGRESS_INTERVAL = float(os.getenv("PLAYLIST_PROGRESS_INTERVAL", "1.5"))
+
+# Per-guild play history (entries kept in memory and on disk)
+HISTORY_DEPTH = int(os.getenv("HISTORY_DEPTH", "1000"))
+HISTORY_DIR = os.path.join("cache", "history")
+# SQLite database holding saved user playlists
+PLAYLIST_DB = os.path.join("cache", "playlists.db")
+# Autoplay won't pick any of the last N played tracks when it has alternatives
+AUTOPLAY_SKIP_RECENT = int(os.getenv("AUTOPLAY_SKIP_RECENT", "10"))
+# Autoplay recommendations: tracks linked per play, neighbours kept per track,
+# recent plays used as seeds, and how many top candidates are sampled from
+RECOMMEND_WINDOW = int(os.getenv("RECOMMEND_WINDOW", "3"))
+RECOMMEND_MAX_NEIGHBOURS = int(os.getenv("RECOMMEND_MAX_NEIGHBOURS", "50"))
+RECOMMEND_SEEDS = int(os.getenv("RECOMMEND_SEEDS", "5"))
+RECOMMEND_TOP = int(os.getenv("RECOMMEND_TOP", "5"))
+# Tracks kept in the recommendation index; the least recently played are dropped first
+RECOMMEND_MAX_TRACKS = int(os.getenv("RECOMMEND_MAX_TRACKS", "50000"))
+
+# Filter/volume changes within this window (seconds) are sent as one player update
+FILTER_DEBOUNCE = float(os.getenv("FILTER_DEBOUNCE", "0.15"))
+# Logging: level, and keep only every Nth DEBUG record per call site
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_DEBUG_SAMPLE = int(os.getenv("LOG_DEBUG_SAMPLE", "20"))
+LOG_DIR = os.path.join("cache", "logs")
+# Prometheus metrics endpoint (set METRICS_PORT=0 to disable)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+# Time-to-first-audio traces kept in memory; optional JSONL export path
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "1000"))
+TRACE_START_TIMEOUT = float(os.getenv("TRACE_START_TIMEOUT", "30"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+# Player session snapshots for warm restarts: file, seconds between snapshots,
+# oldest snapshot still restored (seconds) and voice channels rejoined at once
+SESSION_FILE = os.path.join("cache", "sessions.json.gz")
+SESSION_SNAPSHOT_INTERVAL = float(os.getenv("SESSION_SNAPSHOT_INTERVAL", "15"))
+SESSION_MAX_AGE = float(os.getenv("SESSION_MAX_AGE", "3600"))
+SESSION_RESTORE_CONCURRENCY = int(os.getenv("SESSION_RESTORE_CONCURRENCY", "5"))
+# /spotify_stalk polling (seconds): while playing (backs off up to the max while
+# nothing changes), paused, nothing playing, error backoff cap; shared HTTP client limits
+SPOTIFY_POLL_PLAYING = float(os.getenv("SPOTIFY_POLL_PLAYING", "3"))
+SPOTIFY_POLL_MAX = float(os.getenv("SPOTIFY_POLL_MAX", "10"))
+SPOTIFY_POLL_PAUSED = float(os.getenv("SPOTIFY_POLL_PAUSED", "6"))
+SPOTIFY_POLL_IDLE = float(os.getenv("SPOTIFY_POLL_IDLE", "8"))
+SPOTIFY_POLL_ERROR_MAX = float(os.getenv("SPOTIFY_POLL_ERROR_MAX", "60"))
+SPOTIFY_POLL_CONCURRENCY = int(os.getenv("SPOTIFY_POLL_CONCURRENCY", "16"))
+SPOTIFY_HTTP_TIMEOUT = float(os.getenv("SPOTIFY_HTTP_TIMEOUT", "10"))
+# Spotify access tokens are refreshed this many seconds before they expire;
+# refreshed tokens are written to disk at most once per flush delay (seconds)
+SPOTIFY_TOKEN_REFRESH_AHEAD = float(os.getenv("SPOTIFY_TOKEN_REFRESH_AHEAD", "300"))
+SPOTIFY_TOKEN_FLUSH_DELAY = float(os.getenv("SPOTIFY_TOKEN_FLUSH_DELAY", "2"))
 
 # Server IDs for slash command synchronization
 # Add server IDs here to sync slash commands only to specific servers for faster updates
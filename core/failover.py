@@ -0,0 +1,111 @@
+# core/failover.py
+import asyncio
+import logging
+import time
+
+import wavelink
+
+from core.config import NODE_HEALTH_INTERVAL, NODE_FAILOVER_GRACE
+from core.wavelink_compat import move_player
+
+logger = logging.getLogger(__name__)
+
+
+class FailoverMonitor:
+    """Moves players off Lavalink nodes that have gone away.
+
+    Node health is checked every ``interval`` seconds. When a node leaves the
+    CONNECTED state, the playback position of every affected guild is frozen;
+    if the node is still down after ``grace`` seconds, each affected player
+    is re-homed on the best healthy node: the Discord voice session is
+    re-sent and the current track restarted at the frozen position with the
+    player's volume, filters and paused state. Queues live on MusicPlayer and
+    are untouched. A node that comes back without resuming its session gets
+    the same treatment for players still pointing at it.
+    """
+
+    def __init__(self, manager, interval: float = NODE_HEALTH_INTERVAL, grace: float = NODE_FAILOVER_GRACE):
+        self.manager = manager
+        self.interval = interval
+        self.grace = grace
+        self._down_since: dict[str, float] = {}
+        self._positions: dict[int, int] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.check()
+                except Exception as e:
+                    logger.error(f"Node health check failed: {e}", exc_info=True)
+        except asyncio.CancelledError:
+            pass
+
+    def _affected(self, node: wavelink.Node) -> list:
+        return [mp for mp in self.manager if mp.vc and mp.vc.node is node]
+
+    async def check(self):
+        now = time.monotonic()
+        for node in list(wavelink.Pool.nodes.values()):
+            if node.status is wavelink.NodeStatus.CONNECTED:
+                self._down_since.pop(node.identifier, None)
+                continue
+            if node.identifier not in self._down_since:
+                self._down_since[node.identifier] = now
+                affected = self._affected(node)
+                for mp in affected:
+                    self._positions[mp.guild_id] = mp.vc.position
+                logger.warning(f"Lavalink node {node.identifier} is {node.status.name}; {len(affected)} player(s) affected.")
+            elif now - self._down_since[node.identifier] >= self.grace:
+                await self.migrate_from(node, self._down_since[node.identifier])
+
+    async def migrate_from(self, node: wavelink.Node, detected_at: float | None = None):
+        affected = self._affected(node)
+        if not affected:
+            return
+        if not self.manager.nodes.connected_nodes():
+            logger.error(f"No healthy Lavalink node to move {len(affected)} player(s) from {node.identifier} to.")
+            return
+
+        detected_at = detected_at or time.monotonic()
+        results = await asyncio.gather(*(self.migrate(mp) for mp in affected), return_exceptions=True)
+        recovered = sum(1 for r in results if r is True)
+        elapsed = time.monotonic() - detected_at
+        logger.info(f"Failover from node {node.identifier}: recovered {recovered}/{len(affected)} player(s) in {elapsed:.2f}s since detection.")
+
+    async def migrate(self, mp) -> bool:
+        player: wavelink.Player = mp.vc
+        started = time.monotonic()
+        old = player.node
+        channel = player.channel
+        region = getattr(channel, 'rtc_region', None)
+        target = self.manager.nodes.best_node(str(region) if region else None)
+
+        position = self._positions.pop(mp.guild_id, player.position)
+        track = player.current or mp.current_song
+
+        try:
+            await move_player(player, target)
+            if track:
+                await player.play(track, start=position, paused=player.paused, add_history=False)
+            else:
+                await mp.filters.apply(player, force=True)
+        except Exception as e:
+            logger.error(f"Failed to move guild {mp.guild_id} from node {old.identifier} to {target.identifier}: {e}", exc_info=True)
+            return False
+
+        logger.info(f"Moved guild {mp.guild_id} from node {old.identifier} to {target.identifier} at {position}ms in {(time.monotonic() - started) * 1000:.0f}ms.")
+        return True
+
+    async def on_node_ready(self, payload: wavelink.NodeReadyEventPayload):
+        """Restore players left on a node whose session was not resumed."""
+        self._down_since.pop(payload.node.identifier, None)
+        if payload.resumed:
+            return
+        await self.migrate_from(payload.node)
@@ -0,0 +1,81 @@
+# core/filters.py
+import asyncio
+import logging
+
+import wavelink
+
+from core.config import FILTER_DEBOUNCE
+from core.wavelink_compat import update_filters_and_volume
+
+logger = logging.getLogger(__name__)
+
+
+class FilterState:
+    """Desired bassboost / nightcore / volume for one guild's player.
+
+    Commands record changes here instead of talking to Lavalink directly.
+    Changes made within ``debounce`` seconds of each other are merged and sent
+    as a single player PATCH carrying both ``filters`` and ``volume``; if the
+    merged state equals what was last sent, nothing is sent at all.
+    """
+
+    def __init__(self, debounce: float = FILTER_DEBOUNCE, volume: int = 20):
+        self.debounce = debounce
+        self.bassboost = 0  # 0 (off) or 1-100
+        self.nightcore = False
+        self.volume = volume  # percent, 0-1000
+        self._applied: tuple | None = None
+        self._player: wavelink.Player | None = None
+        self._pending: asyncio.Future | None = None
+
+    def signature(self) -> tuple:
+        return (self.bassboost, self.nightcore, self.volume)
+
+    def build_filters(self) -> wavelink.Filters:
+        filters = wavelink.Filters()
+        if self.bassboost:
+            boost = (self.bassboost / 100) * 0.5
+            bands = [{"band": i, "gain": boost if i < 7 else 0.0} for i in range(15)]
+            filters.equalizer.set(bands=bands)
+        if self.nightcore:
+            # Nightcore: speed up and pitch up
+            filters.timescale.set(pitch=1.2, speed=1.1, rate=1)
+        return filters
+
+    async def update(self, player: wavelink.Player | None, **changes) -> bool:
+        """Record changes and wait for the coalesced update that carries them."""
+        for name, value in changes.items():
+            setattr(self, name, value)
+        if not player or not player.connected:
+            # Nothing to send yet; apply(force=True) pushes the state on connect
+            return True
+        self._player = player
+        if self._pending is None:
+            self._pending = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self._flush_after_delay(self._pending))
+        return await asyncio.shield(self._pending)
+
+    async def _flush_after_delay(self, fut: asyncio.Future):
+        await asyncio.sleep(self.debounce)
+        self._pending = None
+        try:
+            ok = await self.apply(self._player)
+        except Exception as e:
+            logger.error(f"Failed to apply filters: {e}", exc_info=True)
+            ok = False
+        if not fut.done():
+            fut.set_result(ok)
+
+    async def apply(self, player: wavelink.Player | None, *, force: bool = False) -> bool:
+        """Send the current state in one player update, unless it is unchanged."""
+        if not player or not player.connected:
+            return False
+        sig = self.signature()
+        if not force and sig == self._applied:
+            logger.debug(f"Filter state unchanged for guild {player.guild.id}, skipping update.")
+            return True
+
+        filters = self.build_filters()
+        await update_filters_and_volume(player, filters, self.volume)
+        self._applied = sig
+        return True
@@ -0,0 +1,193 @@
+# core/history.py
+import asyncio
+import json
+import logging
+import os
+import random
+from collections import deque
+
+from core.config import HISTORY_DEPTH, HISTORY_DIR
+from core.tracks import TrackRef
+
+logger = logging.getLogger(__name__)
+
+
+def track_key(track) -> str:
+    return getattr(track, 'identifier', None) or getattr(track, 'encoded', None) or getattr(track, 'title', '')
+
+
+class PlayHistory:
+    """Fixed-capacity ring buffer of played tracks for one guild.
+
+    Indexing is chronological like a list (``history[-1]`` is the latest
+    play); ``recent(n)`` walks newest-first without copying the buffer. A
+    per-identifier counter answers "played recently?" in O(1).
+
+    New plays are buffered and appended to ``cache/history/<guild>.jsonl`` by
+    flush(); the file is compacted to the live window once it grows past
+    twice the capacity. load_async()/flush_async() do the file I/O on a
+    worker thread; the blocking load()/flush() are for shutdown and scripts.
+    """
+
+    def __init__(self, guild_id: int, capacity: int = HISTORY_DEPTH, directory: str = HISTORY_DIR):
+        self.capacity = max(1, capacity)
+        self.path = os.path.join(directory, f"{guild_id}.jsonl")
+        self._items: list[TrackRef | None] = [None] * self.capacity
+        self._start = 0
+        self._len = 0
+        self._counts: dict[str, int] = {}
+        self._pending: list[TrackRef] = []
+        self._lines_on_disk = 0
+        self.loaded = False
+        self._flushing = False
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def __getitem__(self, index: int) -> TrackRef:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("PlayHistory index out of range")
+        return self._items[(self._start + index) % self.capacity]
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self._items[(self._start + i) % self.capacity]
+
+    def __contains__(self, track) -> bool:
+        return self._counts.get(track_key(track), 0) > 0
+
+    def recent(self, count: int):
+        """Yield up to ``count`` tracks, newest first."""
+        for i in range(1, min(count, self._len) + 1):
+            yield self._items[(self._start + self._len - i) % self.capacity]
+
+    def _push(self, track: TrackRef):
+        if self._len == self.capacity:
+            old = self._items[self._start]
+            key = track_key(old)
+            remaining = self._counts.get(key, 0) - 1
+            if remaining > 0:
+                self._counts[key] = remaining
+            else:
+                self._counts.pop(key, None)
+            self._items[self._start] = track
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._items[(self._start + self._len) % self.capacity] = track
+            self._len += 1
+        key = track_key(track)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def append(self, track):
+        ref = TrackRef.from_playable(track)
+        self._push(ref)
+        self._pending.append(ref)
+
+    def random_choice(self, skip_recent: int = 0):
+        """Pick a random track, avoiding the ``skip_recent`` newest ones when possible."""
+        if not self._len:
+            return None
+        pool = self._len - skip_recent if self._len > skip_recent else self._len
+        return self[random.randrange(pool)]
+
+    # --- persistence ---
+    def _read(self) -> tuple[list[TrackRef], int]:
+        """Return the newest ``capacity`` entries on disk and the file's line count (blocking)."""
+        if not os.path.exists(self.path):
+            return [], 0
+        refs: deque = deque(maxlen=self.capacity)
+        lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        refs.append(TrackRef.from_dict(json.loads(line)))
+                    except (ValueError, TypeError, KeyError):
+                        continue
+        except OSError as e:
+            logger.warning(f"Could not load history from {self.path}: {e}")
+        return list(refs), lines
+
+    def _apply(self, refs: list[TrackRef], lines: int):
+        # Plays appended while the file was being read stay the newest entries
+        live = list(self)
+        self._items = [None] * self.capacity
+        self._start = self._len = 0
+        self._counts = {}
+        for ref in (*refs, *live):
+            self._push(ref)
+        self._lines_on_disk = lines
+        self.loaded = True
+
+    def load(self):
+        """Load the newest ``capacity`` entries from disk."""
+        self._apply(*self._read())
+
+    async def load_async(self):
+        self._apply(*await asyncio.to_thread(self._read))
+
+    def _take_pending(self):
+        """Detach buffered plays, plus the full window when the file is due for compaction."""
+        pending, self._pending = self._pending, []
+        # Never compact before load: the window would not yet hold the plays already on disk
+        due = self.loaded and self._lines_on_disk + len(pending) > self.capacity * 2
+        compact = list(self) if due else None
+        return pending, compact
+
+    def _write(self, pending: list[TrackRef], compact: list[TrackRef] | None):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if compact is not None:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for ref in compact:
+                    f.write(json.dumps(ref.to_dict(), separators=(",", ":")) + "\n")
+            os.replace(tmp, self.path)
+        else:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for ref in pending:
+                    f.write(json.dumps(ref.to_dict(), separators=(",", ":")) + "\n")
+
+    def _written(self, pending: list[TrackRef], compact: list[TrackRef] | None):
+        self._lines_on_disk = len(compact) if compact is not None else self._lines_on_disk + len(pending)
+
+    def _write_failed(self, pending: list[TrackRef], error: OSError):
+        logger.warning(f"Could not persist history to {self.path}: {error}")
+        self._pending = pending + self._pending
+
+    def flush(self):
+        """Append buffered plays to disk, compacting the file when it grows too large."""
+        if not self._pending:
+            return
+        pending, compact = self._take_pending()
+        try:
+            self._write(pending, compact)
+        except OSError as e:
+            self._write_failed(pending, e)
+        else:
+            self._written(pending, compact)
+
+    @property
+    def dirty(self) -> bool:
+        """True while some plays have not been written to disk."""
+        return bool(self._pending)
+
+    async def flush_async(self):
+        # Skipped until load_async() has read the file, so nothing is read back twice
+        if not self._pending or not self.loaded or self._flushing:
+            return
+        self._flushing = True
+        pending, compact = self._take_pending()
+        try:
+            await asyncio.to_thread(self._write, pending, compact)
+        except OSError as e:
+            self._write_failed(pending, e)
+        else:
+            self._written(pending, compact)
+        finally:
+            self._flushing = False
@@ -0,0 +1,117 @@
+# core/loader.py
+import asyncio
+import logging
+import time
+
+from core.config import PLAYLIST_LOAD_CONCURRENCY, PLAYLIST_PROGRESS_INTERVAL
+from core.tracks import PendingTrack, TrackRef
+
+logger = logging.getLogger(__name__)
+
+
+def _bounded_resolvers(entries: list, limit: int) -> dict[int, asyncio.Task]:
+    """Start resolving every unresolved PendingTrack, at most ``limit`` at a time.
+
+    Tasks are created in list order and the semaphore wakes waiters in FIFO
+    order, so earlier entries are resolved first.
+    """
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def resolve(entry: PendingTrack):
+        async with sem:
+            return await entry.resolve()
+
+    return {i: asyncio.create_task(resolve(e)) for i, e in enumerate(entries)
+            if isinstance(e, PendingTrack) and not e.done}
+
+
+async def resolve_all(entries: list, limit: int = PLAYLIST_LOAD_CONCURRENCY) -> list[TrackRef]:
+    """Resolve entries with bounded parallelism; unresolvable ones are dropped."""
+    tasks = _bounded_resolvers(entries, limit)
+    if tasks:
+        await asyncio.gather(*tasks.values())
+    refs = []
+    for entry in entries:
+        if isinstance(entry, PendingTrack):
+            entry = entry.resolved
+        if entry is not None:
+            refs.append(TrackRef.from_playable(entry))
+    return refs
+
+
+class PlaylistLoader:
+    """Queues a playlist in order while its entries are still resolving.
+
+    Ready entries (TrackRefs) are appended straight away. PendingTrack
+    entries are resolved ``concurrency`` at a time, and each run of
+    consecutive ready entries is appended as soon as the one before it is
+    done. Playback starts with the first track that is queued, not after
+    the whole batch. While loading, ``on_progress(loaded, failed, total)``
+    is awaited at most once per ``progress_interval`` seconds; loads that
+    finish within the first interval never report progress.
+    """
+
+    def __init__(self, music, entries: list, *, concurrency: int = PLAYLIST_LOAD_CONCURRENCY,
+                 on_progress=None, progress_interval: float = PLAYLIST_PROGRESS_INTERVAL):
+        self.music = music
+        self.entries = entries
+        self.concurrency = concurrency
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.loaded: list[TrackRef] = []
+        self.failed = 0
+        self._last_progress = time.monotonic()
+
+    async def _progress(self):
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        if now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        try:
+            await self.on_progress(len(self.loaded), self.failed, len(self.entries))
+        except Exception as e:
+            logger.warning(f"Playlist progress update failed: {e}")
+
+    async def _enqueue(self, batch: list[TrackRef]):
+        music = self.music
+        music.queue.extend(batch)
+        self.loaded.extend(batch)
+        music.prefetcher.poke()
+        if music.vc and not music.vc.playing:
+            await music.start_playback()
+        await self._progress()
+
+    async def run(self) -> list[TrackRef]:
+        tasks = _bounded_resolvers(self.entries, self.concurrency)
+        batch: list[TrackRef] = []
+        try:
+            for i, entry in enumerate(self.entries):
+                if not self.music.vc:
+                    logger.info(f"Playlist load for guild {self.music.guild_id} stopped: player disconnected")
+                    break
+                if i in tasks:
+                    if batch:
+                        await self._enqueue(batch)
+                        batch = []
+                    ref = await tasks[i]
+                elif isinstance(entry, PendingTrack):
+                    ref = entry.resolved
+                else:
+                    ref = TrackRef.from_playable(entry)
+
+                if ref is None:
+                    self.failed += 1
+                    continue
+                batch.append(ref)
+                if not self.loaded:
+                    # Get the first track playing before queueing the rest
+                    await self._enqueue(batch)
+                    batch = []
+            if batch:
+                await self._enqueue(batch)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        return self.loaded
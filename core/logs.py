@@ -0,0 +1,114 @@
+# core/logs.py
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+from core.config import LOG_LEVEL, LOG_DEBUG_SAMPLE, LOG_DIR, TRACE_EXPORT_PATH
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def kv(**fields) -> dict:
+    """``extra=`` payload for structured fields: logger.info("msg", extra=kv(guild=1))."""
+    return {"fields": fields}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Standard formatter that appends ``key=value`` pairs from ``extra=kv(...)``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            pairs = " ".join(f"{k}={v!r}" if isinstance(v, str) and " " in v else f"{k}={v}" for k, v in fields.items())
+            text = f"{text} | {pairs}"
+        return text
+
+
+class DebugSampler(logging.Filter):
+    """Pass only every ``rate``-th DEBUG record per call site; other levels always pass."""
+
+    def __init__(self, rate: int = LOG_DEBUG_SAMPLE):
+        super().__init__()
+        self.rate = max(1, rate)
+        self._seen: dict[tuple, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.rate == 1:
+            return True
+        key = (record.pathname, record.lineno)
+        count = self._seen.get(key, 0)
+        self._seen[key] = count + 1
+        return count % self.rate == 0
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+
+    The stock prepare() renders ``msg % args`` on the calling thread, which
+    here is the event loop. Records stay in-process, so they can be handed
+    over as-is.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level: str = LOG_LEVEL, directory: str = LOG_DIR) -> logging.handlers.QueueListener:
+    """Route all logging through a queue drained by a background thread.
+
+    Handlers that touch the disk (bot.log, spotify.log for the Spotify sync
+    logger, and the optional trace export) run only on the listener thread;
+    the event loop just enqueues records. Call stop_logging() on shutdown to
+    drain the queue.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    os.makedirs(directory, exist_ok=True)
+    formatter = KeyValueFormatter("%(asctime)s - %(levelname)s - %(message)s")
+
+    bot_file = logging.FileHandler(os.path.join(directory, "bot.log"), mode="w", encoding="utf-8")
+    bot_file.setFormatter(formatter)
+
+    spotify_file = logging.FileHandler(os.path.join(directory, "spotify.log"), mode="w", encoding="utf-8")
+    spotify_file.setFormatter(KeyValueFormatter("%(asctime)s - %(message)s"))
+    spotify_file.addFilter(logging.Filter("spotify_logger"))
+    bot_file.addFilter(lambda record: not record.name.startswith(("spotify_logger", "bot.traces")))
+    handlers = [bot_file, spotify_file]
+
+    traces = logging.getLogger("bot.traces")
+    if TRACE_EXPORT_PATH:
+        trace_file = logging.FileHandler(TRACE_EXPORT_PATH, encoding="utf-8")
+        trace_file.setFormatter(logging.Formatter("%(message)s"))
+        trace_file.addFilter(logging.Filter("bot.traces"))
+        handlers.append(trace_file)
+        traces.setLevel(logging.INFO)
+    else:
+        traces.setLevel(logging.WARNING)
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+
+    handler = _DeferredQueueHandler(records)
+    handler.addFilter(DebugSampler())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+
+    logging.getLogger("spotify_logger").setLevel(logging.INFO)
+
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
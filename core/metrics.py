@@ -0,0 +1,217 @@
+# core/metrics.py
+import asyncio
+import bisect
+import logging
+import time
+
+from core.config import METRICS_HOST, METRICS_PORT, LOOP_LAG_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans cache-speed lookups up to slow Lavalink searches
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def samples(self):
+        """Yield (suffix, label string, value) tuples."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_fmt(value)}")
+        return "\n".join(lines)
+
+
+class _Value(_Metric):
+    """Counter/gauge storage; ``collect`` computes the values at scrape time instead.
+
+    ``collect`` returns either a number or a {label tuple: value} dict.
+    """
+
+    def __init__(self, name, help, labelnames=(), collect=None):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+        self.collect = collect
+
+    def samples(self):
+        values = self._values
+        if self.collect is not None:
+            collected = self.collect()
+            values = collected if isinstance(collected, dict) else {(): collected}
+        for key, value in values.items():
+            yield "", _label_str(self.labelnames, key), value
+
+
+class Counter(_Value):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Value):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        row = self._values.get(key)
+        if row is None:
+            row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        for key, row in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row):
+                cumulative += count
+                yield "_bucket", _label_str(self.labelnames, key, f'le="{_fmt(bound)}"'), cumulative
+            yield "_sum", _label_str(self.labelnames, key), row[-1]
+            yield "_count", _label_str(self.labelnames, key), cumulative
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric; registering an existing name replaces the old one."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        out = []
+        for metric in self._metrics.values():
+            try:
+                out.append(metric.render())
+            except Exception as e:
+                logger.warning(f"Could not collect metric {metric.name}: {e}")
+        return "\n".join(out) + "\n"
+
+
+registry = Registry()
+
+SEARCH_LATENCY = registry.register(Histogram(
+    "bot_search_seconds", "Lavalink track lookups that missed the track cache.", ("kind",)))
+TRACK_ENDS = registry.register(Counter(
+    "bot_track_end_total", "Track end events by reason.", ("reason",)))
+INTERACTION_LATENCY = registry.register(Histogram(
+    "bot_interaction_seconds", "Time from interaction creation to command completion.", ("command",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 15.0)))
+LOOP_LAG = registry.register(Histogram(
+    "bot_event_loop_lag_seconds", "How late the event loop woke a periodic timer.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)))
+
+
+async def _watch_loop_lag(interval: float):
+    try:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            LOOP_LAG.observe(max(0.0, time.perf_counter() - start - interval))
+    except asyncio.CancelledError:
+        pass
+
+
+class MetricsServer:
+    """Serves ``registry`` in Prometheus text format at ``/metrics``."""
+
+    def __init__(self, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        self.host = host
+        self.port = port
+        self._runner = None
+        self._lag_task: asyncio.Task | None = None
+
+    async def start(self):
+        if self._runner is not None or not self.port:
+            return
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(body=registry.render().encode("utf-8"),
+                                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            logger.error(f"Could not start metrics server on {self.host}:{self.port}: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        self._lag_task = asyncio.create_task(_watch_loop_lag(LOOP_LAG_INTERVAL))
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._lag_task:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
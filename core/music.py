@@ -3,33 +3,246 @@ import discord
 import wavelink
 import asyncio
 import logging
-from core.config import LAVALINK_HOST, LAVALINK_PASSWORD
+import os
+import time
+from collections import OrderedDict
+from core.actor import Mailbox
+from core.config import (
+    TRACK_CACHE_SIZE, TRACK_CACHE_TTL, TRACK_CACHE_NEGATIVE_TTL, AUTOPLAY_SKIP_RECENT, RECOMMEND_SEEDS,
+    ALONE_TIMEOUT, PAUSE_TIMEOUT, IDLE_DISCONNECT_TIMEOUT,
+)
+from core.filters import FilterState
+from core.history import PlayHistory, track_key
+from core.loader import PlaylistLoader, resolve_all
+from core.logs import kv
+from core.playlists import playlist_store
+from core.metrics import SEARCH_LATENCY, Counter, Gauge, registry
+from core.prefetch import Prefetcher
+from core.recommend import recommender
+from core.track_map import track_map_matcher
+from core.tracing import current_trace, span, tracer
+from core.track_queue import TrackQueue
+from core.tracks import PendingTrack, PlaylistRef, TrackRef, compact_search
 
 logger = logging.getLogger(__name__)
 
+
+class TrackCache:
+    """TTL + LRU cache of Lavalink search results keyed on the normalized query.
+
+    Empty results are cached too, but only for ``negative_ttl`` seconds so a
+    typo doesn't hit Lavalink again immediately while real misses recover fast.
+    """
+
+    def __init__(self, maxsize: int = TRACK_CACHE_SIZE, ttl: float = TRACK_CACHE_TTL, negative_ttl: float = TRACK_CACHE_NEGATIVE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        query = query.strip()
+        # URLs and file paths can be case-sensitive, plain searches can't
+        if "://" in query or os.path.isabs(query):
+            return query
+        return " ".join(query.lower().split())
+
+    def get(self, key: str):
+        """Return (found, result) for a normalized key."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return False, None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return True, result
+
+    def put(self, key: str, result):
+        ttl = self.ttl if result else self.negative_ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, result)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, query: str):
+        self._data.pop(self.normalize(query), None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+track_cache = TrackCache()
+_inflight_searches: dict[str, asyncio.Task] = {}
+
+registry.register(Counter(
+    "bot_track_cache_lookups_total", "Track cache lookups by result.", ("result",),
+    collect=lambda: {("hit",): track_cache.hits, ("miss",): track_cache.misses, ("coalesced",): track_cache.coalesced}))
+registry.register(Gauge("bot_track_cache_entries", "Entries in the track cache.", collect=lambda: len(track_cache)))
+
+
+async def _search_and_cache(query: str, key: str) -> list[TrackRef] | PlaylistRef:
+    if os.path.isabs(query):
+        # Local files go to Lavalink's local source as-is, without a search prefix
+        with SEARCH_LATENCY.time(kind="local"):
+            result = await wavelink.Pool.fetch_tracks(query)
+    else:
+        with SEARCH_LATENCY.time(kind="url" if "://" in query else "search"):
+            result = await wavelink.Playable.search(query)
+    result = compact_search(result)
+    track_cache.put(key, result)
+    return result
+
+
+async def resolve_tracks(query: str) -> list[TrackRef] | PlaylistRef:
+    """Resolve a query or URL through the shared track cache.
+
+    Results come back as compact TrackRef lists or a PlaylistRef; the cache,
+    queues and history all share the same TrackRef objects.
+
+    Concurrent misses for the same key share a single Lavalink request; every
+    caller awaits the same task (shielded, so one caller cancelling doesn't
+    cancel it for the rest) and gets the result or exception re-raised to it.
+    """
+    key = TrackCache.normalize(query)
+    found, result = track_cache.get(key)
+    if found:
+        return result
+
+    task = _inflight_searches.get(key)
+    if task is None:
+        task = asyncio.create_task(_search_and_cache(query, key))
+        _inflight_searches[key] = task
+
+        def _done(t, key=key):
+            if _inflight_searches.get(key) is t:
+                del _inflight_searches[key]
+        task.add_done_callback(_done)
+    else:
+        track_cache.coalesced += 1
+    return await asyncio.shield(task)
+
+
+# Voice disconnect timeouts by kind; see MusicPlayer.schedule_timeout
+VOICE_TIMEOUTS = {"alone": ALONE_TIMEOUT, "paused": PAUSE_TIMEOUT, "idle": IDLE_DISCONNECT_TIMEOUT}
+
+
 class MusicPlayer:
 
-    def __init__(self, bot):
+    def __init__(self, bot, guild_id: int):
         self.bot = bot
-        self.queue = []
+        self.guild_id = guild_id
+        self.last_active = time.monotonic()
+        self.queue = TrackQueue()
         self.vc: wavelink.Player | None = None
-        self.volume = 0.2
+        self.filters = FilterState()
         self.loop_mode = "off" #'off', 'single', 'queue'
         self.current_song: wavelink.Playable | None = None
-        self.nightcore_enabled = False
-        self.history = [] 
+        self.history = PlayHistory(guild_id)
+        # Read on a worker thread; plays made meanwhile are kept as the newest entries
+        self._history_load = asyncio.create_task(self.history.load_async())
         self.autoplay_enabled = False
-        
+        self.prefetcher = Prefetcher(self.queue)
+        # Every playback transition for this guild goes through one mailbox
+        self.actor = Mailbox(f"guild {guild_id}")
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def is_idle(self) -> bool:
+        """True when this guild's player holds nothing worth keeping in memory."""
+        return not (self.vc and self.vc.connected) and not self.queue and self.current_song is None
+
+    def close(self):
+        """Release background tasks before the player is dropped; PlayerManager persists its history."""
+        self.cancel_timeout()
+        self.actor.close()
+        self.prefetcher.stop()
+
+    # --- voice timeouts ---
+    def schedule_timeout(self, kind: str):
+        """Arm (or re-arm) the ``kind`` disconnect timeout: "alone", "paused" or "idle"."""
+        delay = VOICE_TIMEOUTS[kind]
+        if delay > 0:
+            self.bot.players.timers.schedule((self.guild_id, kind), delay, lambda: self._on_timeout(kind))
+
+    def cancel_timeout(self, *kinds: str):
+        """Cancel the given timeouts, or all of them."""
+        for kind in kinds or VOICE_TIMEOUTS:
+            self.bot.players.timers.cancel((self.guild_id, kind))
+
+    def _timeout_applies(self, kind: str) -> bool:
+        if kind == "alone":
+            return self.bot.players.occupancy.humans(self.vc.channel) == 0
+        if kind == "paused":
+            return self.vc.paused
+        return not self.vc.playing and not self.queue
+
+    async def _on_timeout(self, kind: str):
+        # Re-check: the condition may have cleared without the timer being cancelled
+        if not self.vc or not self.vc.connected or not self._timeout_applies(kind):
+            return
+        logger.info("Disconnecting from %s: %s timeout", self.vc.channel.name, kind, extra=kv(guild=self.guild_id))
+        await self.actor.call(self.disconnect, key="disconnect")
+
+    async def disconnect(self):
+        """Leave voice and reset playback state."""
+        self.cancel_timeout()
+        self.queue.clear()
+        self.loop_mode = "off"
+        self.current_song = None
+        if self.vc:
+            await self.vc.disconnect()
+            self.vc = None
+
+    async def set_paused(self, paused: bool):
+        await self.vc.pause(paused)
+        if paused:
+            self.schedule_timeout("paused")
+        else:
+            self.cancel_timeout("paused")
+
+    @property
+    def volume(self) -> float:
+        return self.filters.volume / 100
+
+    async def set_volume(self, level: int) -> bool:
+        """Set volume in percent; merged with any pending filter change."""
+        return await self.filters.update(self.vc, volume=level)
+
     async def set_bassboost(self, value: int | str):
         """Set bassboost filter. Value: 1-100 or 'off'."""
         if not self.vc or not self.vc.connected:
             return False
 
-        filters: wavelink.Filters = self.vc.filters if hasattr(self.vc, 'filters') else wavelink.Filters()
         if value == 'off' or value == 0:
-            filters.equalizer.reset()
-            await self.vc.set_filters(filters)
-            return True
+            return await self.filters.update(self.vc, bassboost=0)
 
         try:
             value = int(value)
@@ -38,51 +251,46 @@ class MusicPlayer:
         except Exception:
             return False
 
-        # Bassboost
-        boost = (value / 100) * 0.5
-        bands = [{"band": i, "gain": boost if i < 7 else 0.0} for i in range(15)]
-        filters.equalizer.set(bands=bands)
-        await self.vc.set_filters(filters)
-        return True
-            
-    async def play_next(self, ctx, query):
-        """Add a track to the front of the queue and play if nothing is playing."""
-        from core.config import HARDCODED_TRACK_MAP
-        current_vc = await self.join(ctx)
+        return await self.filters.update(self.vc, bassboost=value)
+
+    async def play_next(self, ctx, query, replace: bool = False):
+        """Add a track to the front of the queue and play if nothing is playing.
+
+        With ``replace``, the queue is dropped and the track replaces whatever is playing.
+        """
+        with span("join"):
+            current_vc = await self.join(ctx)
         if not current_vc:
             return None
         self.vc = current_vc
         try:
             # Check hardcoded map first (case-insensitive, strip)
-            q = query.lower().strip()
-            url = HARDCODED_TRACK_MAP.get(q)
-            if not url:
-                for k, v in HARDCODED_TRACK_MAP.items():
-                    if k in q:
-                        url = v
-                        break
-            if url:
-                tracks = await wavelink.Playable.search(url)
-            else:
-                tracks = await wavelink.Playable.search(query)
+            url = track_map_matcher.lookup(query)
+            with span("resolve"):
+                tracks = await resolve_tracks(url or query)
             if not tracks:
                 embed = discord.Embed(title="No Results", description=f"Couldn't find any tracks for '{query}'.", color=0xED4245)
                 await ctx.followup.send(embed=embed, ephemeral=True)
                 return None
             track = tracks[0]
-            self.queue.insert(0, track)
+            if replace:
+                await self.play_now(track, clear_queue=True)
+                return track
+            self.queue.appendleft(track)
+            self.prefetcher.poke()
             if not self.vc.playing:
                 await self.start_playback()
+            else:
+                tracer.discard()
             return track
         except Exception as e:
-            logger.error(f"Error during play_next: {e}", exc_info=True)
+            logger.error("Error during play_next: %s", e, exc_info=True, extra=kv(guild=self.guild_id))
             embed = discord.Embed(title="Error", description="An error occurred while adding the song to the front of the queue.", color=0xED4245)
             await ctx.followup.send(embed=embed, ephemeral=True)
             return None
 
     def shuffle_queue(self):
-        import random
-        random.shuffle(self.queue)
+        self.queue.shuffle()
 
     def clear_queue(self):
         self.queue.clear()
@@ -96,60 +304,98 @@ class MusicPlayer:
             return True
         return False
 
+    # --- saved playlists ---
+    async def save_playlist(self, user_id: int, name: str, include_nowplaying: bool = False) -> bool:
+        """Save the queue (optionally led by the current song) as a user playlist."""
+        entries = list(self.queue)
+        if include_nowplaying and self.current_song:
+            entries.insert(0, self.current_song)
+        # Store encoded tracks only, so loading never needs a search
+        tracks = await resolve_all(entries)
+        if not tracks:
+            return False
+        count = await playlist_store.save(user_id, name, tracks)
+        logger.info("Saved playlist %r", name, extra=kv(user=user_id, tracks=count))
+        return True
+
+    async def get_playlists(self, user_id: int) -> list[str]:
+        return [name for name, _ in await playlist_store.names(user_id)]
+
+    async def delete_playlist(self, user_id: int, name: str) -> bool:
+        return await playlist_store.delete(user_id, name)
+
+    async def load_playlist(self, ctx, name: str, return_tracks: bool = False):
+        """Queue a saved playlist of the invoking user and start playback if idle.
+
+        With ``return_tracks``, returns None if the user has no such playlist.
+        """
+        tracks = await playlist_store.load(ctx.author.id, name)
+        if tracks is None:
+            return None
+        current_vc = await self.join(ctx)
+        if not current_vc:
+            return [] if return_tracks else None
+        self.vc = current_vc
+
+        added = await self.queue_playlist(ctx, name, tracks, title="Playlist Loaded")
+        return added if return_tracks else None
+
+    async def queue_playlist(self, ctx, name: str, entries: list, title: str = "Playlist Added") -> list[TrackRef]:
+        """Queue playlist entries progressively, keeping one progress embed up to date."""
+        message = None
+
+        async def progress(loaded, failed, total):
+            nonlocal message
+            note = f", {failed} unavailable" if failed else ""
+            embed = discord.Embed(title="Loading Playlist", description=f"**{name}**: {loaded}/{total} tracks queued{note}...", color=0x1DB954)
+            if message is None:
+                message = await ctx.followup.send(embed=embed, wait=True)
+            else:
+                await message.edit(embed=embed)
+
+        loader = PlaylistLoader(self, entries, on_progress=progress)
+        added = await loader.run()
+        logger.info("Queued playlist %r", name, extra=kv(guild=self.guild_id, added=len(added), unavailable=loader.failed))
+
+        note = f" ({loader.failed} unavailable)" if loader.failed else ""
+        if added:
+            embed = discord.Embed(title=title, description=f"Added playlist **{name}** ({len(added)} songs) to the queue.{note}", color=0x1DB954)
+        else:
+            embed = discord.Embed(title=title, description=f"No playable tracks in playlist **{name}**.{note}", color=0xED4245)
+        if message is None:
+            await ctx.followup.send(embed=embed)
+        else:
+            await message.edit(embed=embed)
+        return added
+
     async def search_tracks(self, query):
         try:
-            tracks = await wavelink.Playable.search(query)
+            tracks = await resolve_tracks(query)
             return tracks
         except Exception as e:
-            logger.error(f"Error during search_tracks: {e}", exc_info=True)
+            logger.error("Error during search_tracks: %s", e, exc_info=True, extra=kv(guild=self.guild_id))
             return []
         
     async def autoplay_random(self, ctx=None):
-        # Pick a random song from history
-        import random
-        if self.history:
-            track = random.choice(self.history)
+        # Prefer a track that co-occurs with recent plays; fall back to a random one from history
+        recent = {track_key(t) for t in self.history.recent(AUTOPLAY_SKIP_RECENT)}
+        track = recommender.recommend(self.history.recent(RECOMMEND_SEEDS), exclude=recent)
+        kind = "recommended"
+        if track is None:
+            track = self.history.random_choice(skip_recent=AUTOPLAY_SKIP_RECENT)
+            kind = "random"
+        if track:
             self.queue.append(track)
             if ctx:
-                await ctx.send(f"Autoplay: Queued random track **{track.title}**.")
+                await ctx.send(f"Autoplay: Queued {kind} track **{track.title}**.")
             return track
         return None
 
     async def set_nightcore(self, enabled: bool):
-        self.nightcore_enabled = enabled
-
-        if self.vc and self.vc.connected:
-            filters: wavelink.Filters = self.vc.filters if hasattr(self.vc, 'filters') else wavelink.Filters()
-            if enabled:
-                # Nightcore: speed up and pitch up
-                filters.timescale.set(pitch=1.2, speed=1.1, rate=1)
-            else:
-                filters.timescale.reset()
-            await self.vc.set_filters(filters)
+        return await self.filters.update(self.vc, nightcore=enabled)
 
     async def normalize(self):
-        self.volume = 0.2
-        await self.set_nightcore(False)
-        
-        if self.vc and self.vc.connected:
-            await self.vc.set_volume(int(self.volume * 100))
-
-    async def connect_nodes(self):
-        if wavelink.Pool.nodes:
-             logger.info("Lavalink nodes already connected or connection attempt in progress. Skipping new connection.")
-             return
-
-        logger.info("Attempting to connect to Lavalink node...")
-        await self.bot.wait_until_ready()
-
-        try:
-            node = wavelink.Node(
-                uri=LAVALINK_HOST,
-                password=LAVALINK_PASSWORD,
-            )
-            await wavelink.Pool.connect(nodes=[node], client=self.bot, cache_capacity=100)
-        except Exception as e:
-            logger.error(f"❌ Lavalink connection failed: {e}", exc_info=True)
+        return await self.filters.update(self.vc, volume=20, nightcore=False)
 
     async def join(self, ctx):
         if not ctx.author.voice or not ctx.author.voice.channel:
@@ -161,21 +407,22 @@ class MusicPlayer:
         if self.vc and self.vc.connected and self.vc.channel == channel:
              return self.vc
         elif self.vc and self.vc.connected and self.vc.channel != channel:
-             logger.info(f"Moving from {self.vc.channel.name} to {channel.name}")
+             logger.info("Moving from %s to %s", self.vc.channel.name, channel.name, extra=kv(guild=self.guild_id))
              await self.vc.move_to(channel)
              return self.vc
 
         try:
-            self.vc = await channel.connect(cls=wavelink.Player)
-            await self.vc.set_volume(int(self.volume * 100)) 
-            logger.info(f"Connected to voice channel: {channel.name}")
+            self.vc = await channel.connect(cls=self.bot.players.nodes.player_factory(channel))
+            await self.filters.apply(self.vc, force=True)
+            logger.info("Connected to voice channel: %s", channel.name, extra=kv(guild=self.guild_id))
             return self.vc
         except discord.ClientException: 
-            logger.warning(f"Bot is already connected to a voice channel (Guild: {ctx.guild.me.voice.channel.guild.id if ctx.guild.me.voice else 'N/A'}, Channel: {ctx.guild.me.voice.channel.name if ctx.guild.me.voice else 'N/A'}). Trying to retrieve.")
+            logger.warning("Bot is already connected to a voice channel (%s). Trying to retrieve.",
+                           ctx.guild.me.voice.channel.name if ctx.guild.me.voice else 'N/A', extra=kv(guild=self.guild_id))
             if ctx.voice_client and isinstance(ctx.voice_client, wavelink.Player):
                 self.vc = ctx.voice_client
                 if self.vc.channel != channel:
-                     logger.info(f"Found existing connection, moving to {channel.name}")
+                     logger.info("Found existing connection, moving to %s", channel.name, extra=kv(guild=self.guild_id))
                      await self.vc.move_to(channel)
                 return self.vc
             else: 
@@ -183,55 +430,49 @@ class MusicPlayer:
                  await response_method("I seem to be connected elsewhere or stuck. Try disconnecting me manually.", ephemeral=True)
                  return None
         except Exception as e:
-            logger.error(f"Error joining voice channel: {e}", exc_info=True)
+            logger.error("Error joining voice channel: %s", e, exc_info=True, extra=kv(guild=self.guild_id))
             response_method = ctx.followup.send if ctx.interaction.response.is_done() else ctx.respond
             await response_method("Couldn't join the voice channel due to an error.", ephemeral=True)
             return None
 
     async def search_and_play(self, ctx, query, return_track=False):
-        from core.config import HARDCODED_TRACK_MAP
-        current_vc = await self.join(ctx) 
+        with span("join"):
+            current_vc = await self.join(ctx)
         if not current_vc:
             return None if return_track else None
         self.vc = current_vc 
 
         try:
             # Check hardcoded map first (case-insensitive, strip)
-            q = query.lower().strip()
-            url = HARDCODED_TRACK_MAP.get(q)
-            if not url:
-                for k, v in HARDCODED_TRACK_MAP.items():
-                    if k in q:
-                        url = v
-                        break
-            if url:
-                tracks = await wavelink.Playable.search(url)
-            else:
-                tracks = await wavelink.Playable.search(query)
+            url = track_map_matcher.lookup(query)
+            with span("resolve"):
+                tracks = await resolve_tracks(url or query)
 
             if not tracks:
                 embed = discord.Embed(title="No Results", description=f"Couldn't find any tracks for '{query}'.", color=0xED4245)
                 await ctx.followup.send(embed=embed, ephemeral=True)
                 return None if return_track else None
 
-            if isinstance(tracks, wavelink.Playlist):
-                added = len(tracks.tracks)
-                self.queue.extend(tracks.tracks) 
-                logger.info(f"Added playlist '{tracks.name}' ({added} songs) to queue.")
-                embed = discord.Embed(title="Playlist Added", description=f"Added playlist **{tracks.name}** ({added} songs) to the queue.", color=0x1DB954)
-                first_track = tracks.tracks[0] if added > 0 else None
+            if isinstance(tracks, PlaylistRef):
+                if self.vc.playing:
+                    tracer.discard()
+                added = await self.queue_playlist(ctx, tracks.name, tracks.tracks)
+                return added[0] if return_track and added else None
             else:
-                track: wavelink.Playable = tracks[0]
+                track: TrackRef = tracks[0]
                 self.queue.append(track)
-                logger.info(f"Added to queue: {track.title}")
+                logger.info("Added to queue: %s", track.title, extra=kv(guild=self.guild_id))
                 embed = discord.Embed(title="Track Added", description=f"Added to queue: **{track.title}**", color=0x1DB954)
                 first_track = track
 
+            self.prefetcher.poke()
             if not self.vc.playing:
                 logger.info("VC is not playing, calling start_playback.")
                 await self.start_playback() 
             else:
-                logger.info(f"VC is already playing '{self.current_song.title if self.current_song else 'something'}', song/playlist added to queue.")
+                logger.info("VC is already playing %r, song/playlist added to queue.",
+                            self.current_song.title if self.current_song else 'something', extra=kv(guild=self.guild_id))
+                tracer.discard()
 
             await ctx.followup.send(embed=embed)
 
@@ -240,94 +481,155 @@ class MusicPlayer:
             return None
 
         except Exception as e:
-            logger.error(f"Error during search_and_play: {e}", exc_info=True)
+            logger.error("Error during search_and_play: %s", e, exc_info=True, extra=kv(guild=self.guild_id))
             embed = discord.Embed(title="Error", description="An error occurred while searching or adding the song.", color=0xED4245)
             await ctx.followup.send(embed=embed, ephemeral=True)
             return None if return_track else None
 
+    # --- playback transitions (serialized through self.actor) ---
     async def start_playback(self):
-        logger.debug(f"[MusicPlayer] start_playback called. Queue: {[getattr(t, 'title', None) for t in self.queue]}, current_song={getattr(self.current_song, 'title', None)}, vc={self.vc}, vc.connected={getattr(self.vc, 'connected', None)}")
-        logger.info("Attempting start_playback.")
+        """Play the next queued track unless something is already playing.
+
+        Requests that arrive while one is still pending are coalesced, so a
+        command and a TrackEnd event racing each other start one track, not two.
+        """
+        await self.actor.call(self._ensure_playing, key="start")
+
+    async def skip(self) -> bool:
+        """Skip the current track; returns False if there was nothing to skip."""
+        current = self.current_song
+        return await self.actor.call(self._skip, current, key=("skip", getattr(current, 'encoded', None)))
+
+    async def play_now(self, track, clear_queue: bool = False):
+        """Replace whatever is playing with ``track``, optionally dropping the queue."""
+        await self.actor.call(self._play_now, track, clear_queue, key=("play_now", getattr(track, 'encoded', None)))
+
+    async def replay(self, track):
+        """Restart ``track`` (single-track loop)."""
+        await self.actor.call(self._replay, track, key="replay")
+
+    async def _ensure_playing(self):
+        if self.vc and self.vc.connected and self.vc.playing:
+            return
+        await self._start_playback()
+
+    async def _skip(self, expected) -> bool:
+        # A skip queued behind another one for the same song is stale once that song changed
+        if getattr(self.current_song, 'encoded', None) != getattr(expected, 'encoded', None):
+            return False
+        if not self.vc or not self.vc.connected or not self.vc.playing:
+            return False
+        if self.queue:
+            # play() replaces the current track in one update (TrackEnd "replaced"),
+            # so the end event does not start another track
+            await self._start_playback()
+            if self.current_song is not None:
+                return True
+        await self.vc.stop()
+        self.current_song = None
+        self.schedule_timeout("idle")
+        return True
+
+    async def _play_now(self, track, clear_queue: bool):
+        if clear_queue:
+            self.queue.clear()
+        self.queue.appendleft(track)
+        self.prefetcher.poke()
+        await self._start_playback()
+
+    async def _replay(self, track):
+        if self.vc and self.vc.connected:
+            await self.vc.play(track)
+
+    async def _start_playback(self):
+        started = time.perf_counter()
+        logger.debug("start_playback called", extra=kv(guild=self.guild_id, queue=len(self.queue),
+                                                        connected=getattr(self.vc, 'connected', None)))
 
         if not self.queue:
-            logger.info("start_playback: Queue is empty. Playback stopped.")
-            logger.debug(f"[MusicPlayer] No tracks left in queue. Setting current_song=None.")
+            logger.info("start_playback: queue is empty, playback stopped", extra=kv(guild=self.guild_id))
             self.current_song = None
             return
 
         if not self.vc or not self.vc.connected:
-            logger.warning("start_playback: VC is not valid or connected. Attempting to reconnect to last used channel.")
+            logger.warning("start_playback: voice client not connected, reconnecting", extra=kv(guild=self.guild_id))
             channel = None
             try:
-                if self.current_song and hasattr(self.current_song, 'guild') and self.current_song.guild:
-                    guild = self.current_song.guild
-                    if guild and guild.me and guild.me.voice and guild.me.voice.channel:
-                        channel = guild.me.voice.channel
-                if not channel and hasattr(self.bot, 'voice_clients'):
-                    for vc in self.bot.voice_clients:
-                        if vc and vc.channel:
-                            channel = vc.channel
-                            break
+                guild = self.bot.get_guild(self.guild_id)
+                if guild and guild.me and guild.me.voice and guild.me.voice.channel:
+                    channel = guild.me.voice.channel
+                if not channel and guild and guild.voice_client and guild.voice_client.channel:
+                    channel = guild.voice_client.channel
                 if not channel:
-                    logger.error("start_playback: Could not determine channel to reconnect. Aborting playback.")
+                    logger.error("start_playback: no channel to reconnect to, aborting", extra=kv(guild=self.guild_id))
                     self.current_song = None
                     return
-                self.vc = await channel.connect(cls=wavelink.Player)
-                await self.vc.set_volume(int(self.volume * 100))
-                logger.info(f"Reconnected to voice channel: {channel.name}")
+                self.vc = await channel.connect(cls=self.bot.players.nodes.player_factory(channel))
+                await self.filters.apply(self.vc, force=True)
+                logger.info("Reconnected to voice channel %s", channel.name, extra=kv(guild=self.guild_id))
             except Exception as e:
-                logger.error(f"start_playback: Failed to reconnect VC: {e}", exc_info=True)
+                logger.error("start_playback: failed to reconnect: %s", e, exc_info=True, extra=kv(guild=self.guild_id))
                 self.current_song = None
                 return
 
-        track = self.queue.pop(0)
-        logger.info(f"start_playback: Popped track '{getattr(track, 'title', repr(track))}'. Queue size now: {len(self.queue)}")
-
-        # Debug: Check track fields
-        logger.info(f"Track debug: title={getattr(track, 'title', None)}, uri={getattr(track, 'uri', None)}, source={getattr(track, 'source', None)}, album={getattr(track, 'album', None)}")
-        logger.info(f"VC debug: connected={self.vc.connected}, channel={getattr(self.vc, 'channel', None)}, player={repr(self.vc)}")
-
-        # Extra: Check Lavalink node state
-        try:
-            node = getattr(self.vc, 'node', None)
-            if node:
-                logger.info(f"Lavalink node state: connected={getattr(node, 'connected', None)}, stats={getattr(node, 'stats', None)}")
-        except Exception as e:
-            logger.warning(f"Could not log Lavalink node state: {e}")
+        track = None
+        skipped = 0
+        while self.queue:
+            entry = self.queue.popleft()
+            if isinstance(entry, PendingTrack):
+                with span("resolve"):
+                    entry = await entry.resolve()
+                if entry is None:
+                    skipped += 1
+                    continue
+            # Queue and history hold compact refs; only the track about to play becomes a Playable
+            track = entry.to_playable() if isinstance(entry, TrackRef) else entry
+            break
+        self.prefetcher.poke()
+        if skipped:
+            logger.warning("start_playback: skipped unresolvable queue entries", extra=kv(guild=self.guild_id, skipped=skipped))
+        if track is None:
+            logger.info("start_playback: no playable tracks left in queue", extra=kv(guild=self.guild_id))
+            self.current_song = None
+            return
 
+        title = getattr(track, 'title', None)
         try:
-            logger.info("Calling self.vc.play(track)...")
-            await self.vc.play(track)
-            logger.info("self.vc.play(track) completed without exception.")
+            with span("play"):
+                await self.vc.play(track)
+            tracer.awaiting_start()
             self.current_song = track
-            logger.info(f"start_playback: vc.play called for '{getattr(track, 'title', repr(track))}'")
-
+            self.cancel_timeout("idle", "paused")
             self.history.append(track)
-            if len(self.history) > 20:
-                self.history = self.history[-20:]
         except Exception as e:
-            logger.error(f"start_playback: Error during vc.play for '{getattr(track, 'title', repr(track))}': {e}", exc_info=True)
-            logger.debug(f"[MusicPlayer] Playback failed. Setting current_song=None.")
+            logger.error("start_playback: play failed: %s", e, exc_info=True, extra=kv(guild=self.guild_id, track=title))
             self.current_song = None
+            return
+
+        logger.info("Playing track", extra=kv(
+            guild=self.guild_id, track=title, source=getattr(track, 'source', None),
+            node=self.vc.node.identifier, queue=len(self.queue), trace=getattr(current_trace.get(), 'id', None),
+            latency_ms=round((time.perf_counter() - started) * 1000, 1),
+        ))
 
     async def stop(self, ctx):
         response_method = ctx.followup.send if ctx.interaction.response.is_done() else ctx.respond
 
         if self.vc and self.vc.connected:
-            logger.info(f"Stop command issued in {ctx.guild.name}")
-            self.queue.clear()
-            self.loop_mode = "off"
-            await self.vc.stop()
-            await self.vc.disconnect() 
-            self.current_song = None
-            self.vc = None 
+            logger.info("Stop command issued in %s", ctx.guild.name, extra=kv(guild=self.guild_id))
+            await self.actor.call(self._stop, key="stop")
         else:
             embed = discord.Embed(title="Not Connected", description="Not connected to a voice channel or already disconnected.", color=0xED4245)
             await response_method(embed=embed, ephemeral=True)
 
-    async def add_audio_file(self, attachment: discord.Attachment, ctx) -> wavelink.Playable | None:
-        """Download and convert a Discord attachment to a playable audio file."""
-        import os
+    async def _stop(self):
+        self.queue.clear()
+        if self.vc:
+            await self.vc.stop()
+        await self.disconnect()
+
+    async def add_audio_file(self, attachment: discord.Attachment, ctx) -> PendingTrack | None:
+        """Download a Discord attachment and queue it as a local file track."""
         import aiohttp
         
         try:
@@ -339,33 +641,21 @@ class MusicPlayer:
             async with aiohttp.ClientSession() as session:
                 async with session.get(attachment.url) as resp:
                     if resp.status != 200:
-                        logger.error(f"Failed to download attachment: {resp.status}")
+                        logger.error("Failed to download attachment: HTTP %s", resp.status, extra=kv(guild=self.guild_id))
                         return None
                     with open(filepath, 'wb') as f:
                         f.write(await resp.read())
             
-            logger.info(f"Downloaded audio file: {filepath}")
-            
-            # Create a wavelink Playable from the local file
-            # Use file:// URI for local files
-            file_uri = f"file:///{os.path.abspath(filepath).replace(os.sep, '/')}"
+            logger.info("Downloaded audio file: %s", filepath, extra=kv(guild=self.guild_id))
             
-            # Create a custom Playable object for local files
-            playable = wavelink.Playable(
-                source=filepath,
-                identifier=filepath,
-                isSeekable=True,
-                author="Local File",
-                length=0,
-                isStream=False,
-                title=filename,
-                uri=file_uri
-            )
+            # Resolve lazily through Lavalink's local source (absolute path as identifier)
+            playable = PendingTrack(os.path.abspath(filepath), title=filename, author="Local File")
             
             self.queue.append(playable)
-            logger.info(f"Added audio file to queue: {filename}")
+            self.prefetcher.poke()
+            logger.info("Added audio file to queue: %s", filename, extra=kv(guild=self.guild_id))
             return playable
             
         except Exception as e:
-            logger.error(f"Error adding audio file: {e}", exc_info=True)
+            logger.error("Error adding audio file: %s", e, exc_info=True, extra=kv(guild=self.guild_id))
             return None
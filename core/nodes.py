@@ -0,0 +1,208 @@
+# core/nodes.py
+import asyncio
+import logging
+import random
+
+import wavelink
+
+from core.config import (
+    LAVALINK_HOST, LAVALINK_PASSWORD, LAVALINK_NODES, NODE_STATS_INTERVAL, NODE_HEALTH_INTERVAL,
+    NODE_BACKOFF_BASE, NODE_BACKOFF_MAX, NODE_CONNECT_TIMEOUT, NODE_READY_TIMEOUT, NODE_READY_MAX_WAITERS,
+    TRACK_CACHE_CAPACITY,
+)
+from core.wavelink_compat import reconnect_node
+
+logger = logging.getLogger(__name__)
+
+
+class NodeSpec:
+    """One configured Lavalink node: uri, password and an optional region tag."""
+
+    __slots__ = ("identifier", "uri", "password", "region")
+
+    def __init__(self, identifier: str, uri: str, password: str, region: str | None = None):
+        self.identifier = identifier
+        self.uri = uri
+        self.password = password
+        self.region = region
+
+    def __repr__(self):
+        return f"<NodeSpec {self.identifier} uri={self.uri} region={self.region}>"
+
+
+def parse_node_specs(value: str) -> list[NodeSpec]:
+    """Parse LAVALINK_NODES ("uri|password|region,...") into NodeSpecs."""
+    specs = []
+    for entry in value.split(","):
+        parts = [p.strip() for p in entry.split("|")]
+        if not parts[0]:
+            continue
+        password = parts[1] if len(parts) > 1 and parts[1] else LAVALINK_PASSWORD
+        region = parts[2] if len(parts) > 2 and parts[2] else None
+        specs.append(NodeSpec(f"node-{len(specs) + 1}", parts[0], password, region))
+    return specs or [NodeSpec("node-1", LAVALINK_HOST, LAVALINK_PASSWORD)]
+
+
+def penalty(node: wavelink.Node, stats: wavelink.StatsResponsePayload | None) -> float:
+    """Load penalty for placing a new player on ``node`` (lower is better).
+
+    Follows the usual Lavalink client heuristic: playing players, an
+    exponential CPU term, and exponential terms for deficit/nulled frames per
+    minute, plus a memory term once the JVM heap starts filling up. Players
+    we placed since the last stats poll are counted from node.players.
+    """
+    players = len(node.players)
+    if stats is None:
+        return float(players)
+
+    playing = max(stats.playing, players)
+    cpu = 1.05 ** (100 * stats.cpu.system_load) * 10 - 10
+    frames = 0.0
+    if stats.frames is not None:
+        frames += 1.03 ** (500 * (stats.frames.deficit / 3000)) * 600 - 600
+        frames += (1.03 ** (500 * (stats.frames.nulled / 3000)) * 300 - 300) * 2
+    memory = 0.0
+    if stats.memory.reservable:
+        memory = 1.02 ** (100 * stats.memory.used / stats.memory.reservable) * 10 - 10
+    return playing + cpu + frames + memory
+
+
+def backoff_delay(attempt: int, base: float = NODE_BACKOFF_BASE, maximum: float = NODE_BACKOFF_MAX) -> float:
+    """Exponential backoff with equal jitter: half fixed, half random."""
+    delay = min(maximum, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class NodePool:
+    """Configured Lavalink nodes, their connection supervisors and live stats.
+
+    Every configured node gets a supervisor task that (re)connects it with
+    jittered exponential backoff whenever it is disconnected; wavelink's own
+    retry loop is disabled (``retries=0``) so there is exactly one retry
+    policy. ``ready`` is set while at least one node is connected, and
+    wait_ready() lets commands arriving during startup or a reconnect wait
+    briefly for it, with a cap on how many may wait at once.
+    """
+
+    def __init__(self, bot, specs: list[NodeSpec] | None = None, stats_interval: float = NODE_STATS_INTERVAL):
+        self.bot = bot
+        self.specs = specs or parse_node_specs(LAVALINK_NODES)
+        self.regions = {spec.identifier: spec.region for spec in self.specs}
+        self.stats: dict[str, wavelink.StatsResponsePayload] = {}
+        self.stats_interval = stats_interval
+        self.ready = asyncio.Event()
+        self._nodes: dict[str, wavelink.Node] = {}
+        self._supervisors: dict[str, asyncio.Task] = {}
+        self._stats_task: asyncio.Task | None = None
+        self._waiters = 0
+
+    def connected_nodes(self) -> list[wavelink.Node]:
+        return [n for n in wavelink.Pool.nodes.values() if n.status is wavelink.NodeStatus.CONNECTED]
+
+    def refresh_ready(self):
+        if self.connected_nodes():
+            if not self.ready.is_set():
+                logger.info("Lavalink is ready.")
+                self.ready.set()
+        elif self.ready.is_set():
+            logger.warning("No Lavalink node connected; holding new music commands until one is.")
+            self.ready.clear()
+
+    async def wait_ready(self, timeout: float = NODE_READY_TIMEOUT) -> bool:
+        """Wait up to ``timeout`` for a connected node. False if full or timed out."""
+        if self.ready.is_set():
+            return True
+        if self._waiters >= NODE_READY_MAX_WAITERS:
+            return False
+        self._waiters += 1
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiters -= 1
+
+    async def connect(self, timeout: float = NODE_CONNECT_TIMEOUT):
+        """Start node supervisors and wait (bounded) for the first node to come up."""
+        if self._supervisors:
+            logger.info("Lavalink supervisors already running. Skipping new connection.")
+            return
+
+        logger.info(f"Attempting to connect to {len(self.specs)} Lavalink node(s)...")
+        await self.bot.wait_until_ready()
+
+        for spec in self.specs:
+            self._supervisors[spec.identifier] = asyncio.create_task(self._supervise(spec))
+        if self._stats_task is None or self._stats_task.done():
+            self._stats_task = asyncio.create_task(self._poll_stats())
+
+        if not await self.wait_ready(timeout):
+            logger.error(f"❌ No Lavalink node connected within {timeout}s; still retrying in the background.")
+
+    async def _supervise(self, spec: NodeSpec):
+        attempt = 0
+        try:
+            while True:
+                node = self._nodes.get(spec.identifier)
+                status = node.status if node else wavelink.NodeStatus.DISCONNECTED
+                self.refresh_ready()
+
+                if status is wavelink.NodeStatus.CONNECTED:
+                    attempt = 0
+                    await asyncio.sleep(NODE_HEALTH_INTERVAL)
+                    continue
+                if status is wavelink.NodeStatus.CONNECTING:
+                    await asyncio.sleep(0.5)
+                    continue
+
+                if attempt:
+                    delay = backoff_delay(attempt - 1)
+                    logger.info(f"Reconnecting Lavalink node {spec.identifier} in {delay:.1f}s (attempt {attempt + 1}).")
+                    await asyncio.sleep(delay)
+                attempt += 1
+
+                try:
+                    if node is None:
+                        node = wavelink.Node(identifier=spec.identifier, uri=spec.uri, password=spec.password, retries=0)
+                        self._nodes[spec.identifier] = node
+                    if spec.identifier in wavelink.Pool.nodes:
+                        await reconnect_node(node, self.bot)
+                    else:
+                        # Each connect() with a capacity starts a new cache, so only the first node sets it
+                        capacity = TRACK_CACHE_CAPACITY if TRACK_CACHE_CAPACITY > 0 and not wavelink.Pool.has_cache() else None
+                        await wavelink.Pool.connect(nodes=[node], client=self.bot, cache_capacity=capacity)
+                except Exception as e:
+                    logger.error(f"❌ Lavalink connection to {spec.identifier} failed: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    async def _poll_stats(self):
+        try:
+            while True:
+                for node in self.connected_nodes():
+                    try:
+                        self.stats[node.identifier] = await node.fetch_stats()
+                    except Exception as e:
+                        logger.warning(f"Could not fetch stats for node {node.identifier}: {e}")
+                        self.stats.pop(node.identifier, None)
+                await asyncio.sleep(self.stats_interval)
+        except asyncio.CancelledError:
+            pass
+
+    def best_node(self, region: str | None = None) -> wavelink.Node:
+        """Pick the least loaded connected node, preferring ones tagged with ``region``."""
+        nodes = self.connected_nodes()
+        if not nodes:
+            raise wavelink.InvalidNodeException("No Lavalink nodes are currently connected.")
+        if region:
+            local = [n for n in nodes if self.regions.get(n.identifier) == region]
+            nodes = local or nodes
+        return min(nodes, key=lambda n: penalty(n, self.stats.get(n.identifier)))
+
+    def player_factory(self, channel):
+        """Return a ``cls=`` callable for channel.connect that places the player on the best node."""
+        region = getattr(channel, 'rtc_region', None)
+        node = self.best_node(str(region) if region else None)
+        logger.info(f"Placing player for guild {channel.guild.id} on node {node.identifier}")
+        return lambda client, ch: wavelink.Player(client, ch, nodes=[node])
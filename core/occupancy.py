@@ -0,0 +1,64 @@
+# core/occupancy.py
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceOccupancy:
+    """Human and bot counts per voice channel, maintained from voice state deltas.
+
+    A guild is counted once, from its channel member lists, the first time it
+    is queried or sends a voice update. After that every on_voice_state_update
+    is a constant-time move between two counters, and humans()/bots() are
+    dict lookups. forget() drops a guild so it is recounted on next use, e.g.
+    after the gateway reconnects and the member cache may have changed.
+    """
+
+    def __init__(self):
+        self._counts: dict[int, list[int]] = {}  # channel id -> [humans, bots]
+        self._where: dict[int, dict[int, int]] = {}  # guild id -> member id -> channel id
+
+    def _ensure(self, guild) -> bool:
+        """Count ``guild`` if it isn't tracked yet; True if it was just counted."""
+        if guild.id in self._where:
+            return False
+        where = self._where[guild.id] = {}
+        for channel in (*getattr(guild, 'voice_channels', ()), *getattr(guild, 'stage_channels', ())):
+            for member in channel.members:
+                where[member.id] = channel.id
+                self._counts.setdefault(channel.id, [0, 0])[1 if member.bot else 0] += 1
+        return True
+
+    def update(self, member, before, after):
+        """Apply one voice state change (call from on_voice_state_update)."""
+        # A fresh count already reflects this event: the cache is updated before dispatch
+        if self._ensure(member.guild):
+            return
+        old = before.channel.id if before.channel else None
+        new = after.channel.id if after.channel else None
+        if old == new:
+            return
+        where = self._where[member.guild.id]
+        index = 1 if member.bot else 0
+        tracked = where.pop(member.id, None)
+        if tracked is not None:
+            counts = self._counts.get(tracked)
+            if counts:
+                counts[index] = max(0, counts[index] - 1)
+                if not any(counts):
+                    del self._counts[tracked]
+        if new is not None:
+            where[member.id] = new
+            self._counts.setdefault(new, [0, 0])[index] += 1
+
+    def humans(self, channel) -> int:
+        self._ensure(channel.guild)
+        return self._counts.get(channel.id, (0, 0))[0]
+
+    def bots(self, channel) -> int:
+        self._ensure(channel.guild)
+        return self._counts.get(channel.id, (0, 0))[1]
+
+    def forget(self, guild_id: int):
+        for channel_id in set(self._where.pop(guild_id, {}).values()):
+            self._counts.pop(channel_id, None)
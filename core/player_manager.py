@@ -0,0 +1,153 @@
+# core/player_manager.py
+import asyncio
+import logging
+import time
+
+import wavelink
+
+from core.config import PLAYER_IDLE_TIMEOUT, PLAYER_REAP_INTERVAL
+from core.failover import FailoverMonitor
+from core.history import PlayHistory
+from core.metrics import Gauge, registry
+from core.music import MusicPlayer
+from core.nodes import NodePool
+from core.occupancy import VoiceOccupancy
+from core.recommend import recommender
+from core.sessions import SessionStore
+from core.timers import TimerWheel
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerManager:
+    """Guild-keyed registry of MusicPlayer instances.
+
+    Players are created lazily on first use and evicted by a background reaper
+    once they have been disconnected and empty for PLAYER_IDLE_TIMEOUT seconds.
+    Every guild owns its own MusicPlayer, so no mutable playback state is shared
+    between guilds.
+    """
+
+    def __init__(self, bot, idle_timeout: float = PLAYER_IDLE_TIMEOUT, reap_interval: float = PLAYER_REAP_INTERVAL):
+        self.bot = bot
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self.players: dict[int, MusicPlayer] = {}
+        # Histories of evicted players, written out on the next flush
+        self._retired: list[PlayHistory] = []
+        self.nodes = NodePool(bot)
+        self.failover = FailoverMonitor(self)
+        # Per-guild voice timeouts, keyed (guild_id, kind); see MusicPlayer.schedule_timeout
+        self.timers = TimerWheel()
+        # Humans/bots per voice channel, kept current by EventHandler.on_voice_state_update
+        self.occupancy = VoiceOccupancy()
+        self.sessions = SessionStore(self)
+        self._restore_task: asyncio.Task | None = None
+        self._reaper_task: asyncio.Task | None = None
+        self._index_task: asyncio.Task | None = None
+        registry.register(Gauge("bot_players", "MusicPlayer instances by state.", ("state",), collect=self._player_counts))
+        registry.register(Gauge("bot_queue_depth", "Queued entries per guild with a non-empty queue.", ("guild",),
+                                collect=lambda: {(str(gid),): len(p.queue) for gid, p in self.players.items() if p.queue}))
+
+    def _player_counts(self) -> dict:
+        connected = sum(1 for p in self.players.values() if p.vc and p.vc.connected)
+        playing = sum(1 for p in self.players.values() if p.vc and p.vc.playing)
+        return {("total",): len(self.players), ("connected",): connected, ("playing",): playing}
+
+    def get(self, guild_id: int) -> MusicPlayer:
+        """Return the player for a guild, creating it if needed."""
+        player = self.players.get(guild_id)
+        if player is None:
+            player = MusicPlayer(self.bot, guild_id)
+            self.players[guild_id] = player
+            logger.debug(f"Created MusicPlayer for guild {guild_id}")
+        player.touch()
+        return player
+
+    def peek(self, guild_id: int) -> MusicPlayer | None:
+        """Return the player for a guild without creating one."""
+        return self.players.get(guild_id)
+
+    def for_player(self, player: wavelink.Player | None) -> MusicPlayer | None:
+        """Map a wavelink player (e.g. from an event payload) to its MusicPlayer."""
+        if not player or not player.guild:
+            return None
+        return self.players.get(player.guild.id)
+
+    def remove(self, guild_id: int) -> MusicPlayer | None:
+        player = self.players.pop(guild_id, None)
+        if player:
+            player.close()
+            self._retired.append(player.history)
+        return player
+
+    def __len__(self):
+        return len(self.players)
+
+    def __iter__(self):
+        return iter(list(self.players.values()))
+
+    def start(self):
+        """Build the recommendation index, start the idle reaper and node failover monitor. Safe to call more than once."""
+        if self._index_task is None:
+            self._index_task = asyncio.create_task(recommender.build())
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+        self.failover.start()
+
+    async def _reap_loop(self):
+        try:
+            # History files must not grow before the index has read them, or new plays would count twice
+            await recommender.ready.wait()
+            while True:
+                await asyncio.sleep(self.reap_interval)
+                self.reap_idle()
+                await self.flush_histories_async()
+        except asyncio.CancelledError:
+            pass
+
+    def reap_idle(self) -> int:
+        """Evict players that have been idle longer than idle_timeout."""
+        now = time.monotonic()
+        evicted = 0
+        for guild_id, player in list(self.players.items()):
+            if player.is_idle() and now - player.last_active > self.idle_timeout:
+                del self.players[guild_id]
+                player.close()
+                self._retired.append(player.history)
+                evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} idle players. Active players: {len(self.players)}")
+        return evicted
+
+    def flush_histories(self):
+        """Append buffered play history of every player to disk (blocking; used on shutdown)."""
+        retired, self._retired = self._retired, []
+        for history in retired + [player.history for player in self.players.values()]:
+            history.flush()
+
+    async def flush_histories_async(self):
+        retired, self._retired = self._retired, []
+        for history in retired:
+            await history.flush_async()
+            # An evicted player's history is retried until it is on disk
+            if history.dirty:
+                self._retired.append(history)
+        for player in list(self.players.values()):
+            await player.history.flush_async()
+
+    async def connect_nodes(self):
+        await self.nodes.connect()
+
+    def restore_sessions(self):
+        """Once Lavalink is ready, resume the sessions saved by the previous run, then start snapshotting."""
+        if self._restore_task is None:
+            self._restore_task = asyncio.create_task(self._restore_sessions())
+
+    async def _restore_sessions(self):
+        await self.nodes.ready.wait()
+        try:
+            await self.sessions.restore()
+        except Exception as e:
+            logger.error(f"Session restore failed: {e}", exc_info=True)
+        self.sessions.start()
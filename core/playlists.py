@@ -0,0 +1,135 @@
+# core/playlists.py
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from core.config import PLAYLIST_DB
+from core.tracks import TrackRef
+
+logger = logging.getLogger(__name__)
+
+_TRACK_COLUMNS = ("encoded", "identifier", "title", "author", "length", "uri", "artwork", "source", "is_stream", "is_seekable")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    id INTEGER PRIMARY KEY,
+    owner_id INTEGER NOT NULL,
+    name TEXT NOT NULL COLLATE NOCASE,
+    created_at REAL NOT NULL,
+    track_count INTEGER NOT NULL,
+    UNIQUE (owner_id, name)
+);
+CREATE TABLE IF NOT EXISTS playlist_tracks (
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    encoded TEXT NOT NULL,
+    identifier TEXT,
+    title TEXT,
+    author TEXT,
+    length INTEGER NOT NULL DEFAULT 0,
+    uri TEXT,
+    artwork TEXT,
+    source TEXT,
+    is_stream INTEGER NOT NULL DEFAULT 0,
+    is_seekable INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (playlist_id, position)
+) WITHOUT ROWID;
+"""
+
+
+class PlaylistStore:
+    """Saved user playlists in SQLite (WAL mode).
+
+    Tracks are stored as Lavalink encoded strings plus their display fields,
+    so loading a playlist is one primary-key range read that turns straight
+    into TrackRefs, with no search. Listing is served by the
+    (owner_id, name) unique index. Queries run on a worker thread through
+    asyncio.to_thread, serialized by a lock around the single connection.
+    """
+
+    def __init__(self, path: str = PLAYLIST_DB):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _run(self, func, *args):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return func(conn, *args)
+
+    # --- blocking implementations (worker thread) ---
+    @staticmethod
+    def _save(conn, owner_id: int, name: str, tracks: list[TrackRef]) -> int:
+        conn.execute("DELETE FROM playlists WHERE owner_id = ? AND name = ?", (owner_id, name))
+        cur = conn.execute(
+            "INSERT INTO playlists (owner_id, name, created_at, track_count) VALUES (?, ?, ?, ?)",
+            (owner_id, name, time.time(), len(tracks)),
+        )
+        playlist_id = cur.lastrowid
+        conn.executemany(
+            f"INSERT INTO playlist_tracks (playlist_id, position, {', '.join(_TRACK_COLUMNS)}) "
+            f"VALUES (?, ?, {', '.join('?' * len(_TRACK_COLUMNS))})",
+            ((playlist_id, i, *(getattr(t, c) for c in _TRACK_COLUMNS)) for i, t in enumerate(tracks)),
+        )
+        return len(tracks)
+
+    @staticmethod
+    def _names(conn, owner_id: int) -> list[tuple[str, int]]:
+        return conn.execute(
+            "SELECT name, track_count FROM playlists WHERE owner_id = ? ORDER BY name", (owner_id,)
+        ).fetchall()
+
+    @staticmethod
+    def _delete(conn, owner_id: int, name: str) -> bool:
+        return conn.execute("DELETE FROM playlists WHERE owner_id = ? AND name = ?", (owner_id, name)).rowcount > 0
+
+    @staticmethod
+    def _load(conn, owner_id: int, name: str) -> list[TrackRef] | None:
+        row = conn.execute("SELECT id FROM playlists WHERE owner_id = ? AND name = ?", (owner_id, name)).fetchone()
+        if row is None:
+            return None
+        rows = conn.execute(
+            f"SELECT {', '.join(_TRACK_COLUMNS)} FROM playlist_tracks WHERE playlist_id = ? ORDER BY position", (row[0],)
+        ).fetchall()
+        return [TrackRef(enc, ident, title, author, length, uri, artwork, source or "", bool(stream), bool(seekable))
+                for enc, ident, title, author, length, uri, artwork, source, stream, seekable in rows]
+
+    # --- async API ---
+    async def save(self, owner_id: int, name: str, tracks: list[TrackRef]) -> int:
+        """Create or replace ``name`` for ``owner_id``; returns the number of tracks stored."""
+        return await asyncio.to_thread(self._run, self._save, owner_id, name, tracks)
+
+    async def names(self, owner_id: int) -> list[tuple[str, int]]:
+        """(name, track count) pairs for an owner, sorted by name."""
+        return await asyncio.to_thread(self._run, self._names, owner_id)
+
+    async def delete(self, owner_id: int, name: str) -> bool:
+        return await asyncio.to_thread(self._run, self._delete, owner_id, name)
+
+    async def load(self, owner_id: int, name: str) -> list[TrackRef] | None:
+        """Tracks of a playlist in order, or None if it doesn't exist."""
+        return await asyncio.to_thread(self._run, self._load, owner_id, name)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+playlist_store = PlaylistStore()
@@ -0,0 +1,47 @@
+# core/prefetch.py
+import asyncio
+import logging
+
+from core.config import PREFETCH_DEPTH
+from core.tracks import PendingTrack
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Resolves the next few PendingTrack entries of a queue in the background.
+
+    MusicPlayer pokes it whenever the head of the queue may have changed; the
+    worker then resolves up to ``depth`` unresolved entries concurrently, so
+    start_playback usually finds the next track already resolved.
+    """
+
+    def __init__(self, queue, depth: int = PREFETCH_DEPTH):
+        self.queue = queue
+        self.depth = depth
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def poke(self):
+        if self.depth <= 0:
+            return
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                pending = [e for e in self.queue.peek(self.depth) if isinstance(e, PendingTrack) and not e.done]
+                if pending:
+                    await asyncio.gather(*(e.resolve() for e in pending))
+                    logger.debug(f"Prefetched {len(pending)} upcoming tracks")
+        except asyncio.CancelledError:
+            pass
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,162 @@
+# core/recommend.py
+import asyncio
+import heapq
+import json
+import logging
+import math
+import os
+import random
+from collections import deque
+
+from core.config import HISTORY_DIR, RECOMMEND_WINDOW, RECOMMEND_MAX_NEIGHBOURS, RECOMMEND_TOP, RECOMMEND_MAX_TRACKS
+from core.history import track_key
+from core.tracks import TrackRef
+
+logger = logging.getLogger(__name__)
+
+# Weight of one co-occurrence by how the earlier track ended; skips count less
+_END_WEIGHTS = {"finished": 1.0, "replaced": 0.5, "stopped": 0.5}
+# Plays recorded while the index is still being built, replayed once it is ready
+_MAX_BACKLOG = 10000
+
+
+class CooccurrenceIndex:
+    """Track-to-track co-occurrence counts across every guild's play history.
+
+    The matrix is sparse: each track keeps a dict of neighbour -> weight,
+    capped at ``max_neighbours`` entries (the weakest is dropped). When a
+    track ends, it is linked to the last ``window`` tracks that ended in the
+    same guild, weighted 1/distance. Scores are normalized by each track's
+    total weight so that globally popular tracks don't win every lookup.
+
+    The index is built once from the history files by build(), on a worker
+    thread, and kept up to date in memory afterwards; no separate file is
+    written. Plays recorded while it builds are queued and applied once it is
+    ready. The files are only read before this process flushes any history
+    (PlayerManager waits for ``ready``), so no play is counted twice. At most
+    ``max_tracks`` tracks are kept; the least recently played is dropped first.
+    """
+
+    def __init__(self, window: int = RECOMMEND_WINDOW, max_neighbours: int = RECOMMEND_MAX_NEIGHBOURS,
+                 directory: str = HISTORY_DIR, max_tracks: int = RECOMMEND_MAX_TRACKS):
+        self.window = max(1, window)
+        self.max_neighbours = max(1, max_neighbours)
+        self.max_tracks = max(1, max_tracks)
+        self.directory = directory
+        self.tracks: dict[str, TrackRef] = {}  # insertion order is play recency
+        self._neighbours: dict[str, dict[str, float]] = {}
+        self._strength: dict[str, float] = {}
+        self._recent: dict[int, deque] = {}
+        self._backlog: deque = deque(maxlen=_MAX_BACKLOG)
+        self._building = False
+        self.ready = asyncio.Event()
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def _link(self, a: str, b: str, weight: float):
+        for src, dst in ((a, b), (b, a)):
+            row = self._neighbours.setdefault(src, {})
+            row[dst] = row.get(dst, 0.0) + weight
+            self._strength[src] = self._strength.get(src, 0.0) + weight
+            if len(row) > self.max_neighbours:
+                weakest = min(row, key=row.get)
+                self._strength[src] -= row.pop(weakest)
+
+    def _evict(self, key: str):
+        del self.tracks[key]
+        self._strength.pop(key, None)
+        for other in self._neighbours.pop(key, {}):
+            row = self._neighbours.get(other)
+            if row and key in row:
+                self._strength[other] -= row.pop(key)
+
+    def _add(self, guild_id: int, ref: TrackRef, weight: float):
+        key = track_key(ref)
+        if not key:
+            return
+        self.tracks.pop(key, None)
+        self.tracks[key] = ref
+        recent = self._recent.setdefault(guild_id, deque(maxlen=self.window))
+        for distance, other in enumerate(reversed(recent), 1):
+            if other != key and other in self.tracks:
+                self._link(key, other, weight / distance)
+        recent.append(key)
+        while len(self.tracks) > self.max_tracks:
+            self._evict(next(iter(self.tracks)))
+
+    def _load(self):
+        """Index every guild's history file (blocking; runs on a worker thread)."""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if not name.endswith(".jsonl"):
+                continue
+            try:
+                guild_id = int(name[:-len(".jsonl")])
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            self._add(guild_id, TrackRef.from_dict(json.loads(line)), 1.0)
+                        except (ValueError, TypeError, KeyError):
+                            continue
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not index history file {name}: {e}")
+
+    async def build(self):
+        """Build the index from the history files off the event loop. Safe to call more than once."""
+        if self._building or self.ready.is_set():
+            return
+        self._building = True
+        # Built into a separate index so lookups on the loop never see it half-done
+        fresh = CooccurrenceIndex(self.window, self.max_neighbours, self.directory, self.max_tracks)
+        try:
+            await asyncio.to_thread(fresh._load)
+            self.tracks, self._neighbours, self._strength = fresh.tracks, fresh._neighbours, fresh._strength
+            self._recent = fresh._recent
+        except Exception as e:
+            logger.error(f"Could not build recommendation index: {e}", exc_info=True)
+        finally:
+            self._building = False
+            self.ready.set()
+        backlog, self._backlog = self._backlog, deque()
+        for guild_id, ref, weight in backlog:
+            self._add(guild_id, ref, weight)
+        logger.info(f"Recommendation index built: {len(self.tracks)} tracks")
+
+    def record(self, guild_id: int, track, reason: str = "finished"):
+        """Add a track that just ended in ``guild_id``."""
+        weight = _END_WEIGHTS.get(reason.lower())
+        if weight is None or track is None:
+            return
+        ref = TrackRef.from_playable(track)
+        if not self.ready.is_set():
+            self._backlog.append((guild_id, ref, weight))
+            return
+        self._add(guild_id, ref, weight)
+
+    def recommend(self, seeds, exclude=(), top: int = RECOMMEND_TOP) -> TrackRef | None:
+        """Pick a track related to ``seeds`` (newest first), skipping keys in ``exclude``.
+
+        Newer seeds count more. One of the ``top`` best scores is chosen at
+        random, weighted by score, so autoplay doesn't settle into a fixed loop.
+        """
+        scores: dict[str, float] = {}
+        for rank, seed in enumerate(seeds):
+            key = track_key(seed)
+            row = self._neighbours.get(key)
+            if not row:
+                continue
+            seed_weight = 1.0 / ((rank + 1) * math.sqrt(max(self._strength.get(key, 0.0), 1e-9)))
+            for other, weight in row.items():
+                if other in exclude or other not in self.tracks:
+                    continue
+                scores[other] = scores.get(other, 0.0) + seed_weight * weight / math.sqrt(max(self._strength.get(other, 0.0), 1e-9))
+        if not scores:
+            return None
+        best = heapq.nlargest(max(1, top), scores.items(), key=lambda item: item[1])
+        key = random.choices([k for k, _ in best], weights=[s for _, s in best])[0]
+        return self.tracks.get(key)
+
+
+recommender = CooccurrenceIndex()
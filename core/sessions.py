@@ -0,0 +1,248 @@
+# core/sessions.py
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+
+from core.config import SESSION_FILE, SESSION_SNAPSHOT_INTERVAL, SESSION_MAX_AGE, SESSION_RESTORE_CONCURRENCY
+from core.metrics import Gauge, registry
+from core.tracks import PendingTrack, TrackRef
+
+logger = logging.getLogger(__name__)
+
+# Close enough to process start: main.py imports this module before connecting
+_PROCESS_STARTED = time.monotonic()
+_VERSION = 1
+
+WARM_RESTART_SECONDS = registry.register(Gauge(
+    "bot_warm_restart_seconds", "Seconds from process start until restored sessions were playing again."))
+
+
+def _encode_entry(entry):
+    if isinstance(entry, PendingTrack):
+        if entry.resolved is None:
+            return {"q": entry.query, "t": entry.title, "a": entry.author, "l": entry.length, "u": entry.uri}
+        entry = entry.resolved
+    ref = TrackRef.from_playable(entry)
+    return [getattr(ref, name) for name in TrackRef.__slots__]
+
+
+def _decode_entry(data):
+    if isinstance(data, dict):
+        return PendingTrack(data["q"], title=data.get("t"), author=data.get("a"), length=data.get("l", 0), uri=data.get("u"))
+    return TrackRef(*data)
+
+
+class SessionStore:
+    """Periodic, crash-safe snapshots of every active player, restored on startup.
+
+    A snapshot holds, per guild: voice channel, current track and position,
+    paused flag, loop/autoplay modes, filter state and the queue. Tracks are
+    stored as bare field lists (PendingTracks as their query), the whole
+    document is gzipped JSON, and it is written to a temporary file, fsynced
+    and renamed over the previous one, so a crash mid-write leaves the last
+    good snapshot in place.
+
+    Snapshots only start once restore() has run, so an early crash can never
+    overwrite the sessions it was about to restore.
+    """
+
+    def __init__(self, manager, path: str = SESSION_FILE, interval: float = SESSION_SNAPSHOT_INTERVAL,
+                 max_age: float = SESSION_MAX_AGE):
+        self.manager = manager
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self.restored = False
+        self._task: asyncio.Task | None = None
+        self._resuming: set[int] = set()
+        self._resume_started: float | None = None
+        self._first_audio: float | None = None
+
+    # --- snapshots ---
+    def snapshot(self) -> dict:
+        sessions = []
+        for mp in self.manager:
+            vc = mp.vc
+            if not vc or not vc.connected or not (mp.current_song or mp.queue):
+                continue
+            sessions.append({
+                "guild": mp.guild_id,
+                "channel": vc.channel.id,
+                "track": _encode_entry(mp.current_song) if mp.current_song else None,
+                "position": int(vc.position) if mp.current_song else 0,
+                "paused": bool(vc.paused),
+                "loop": mp.loop_mode,
+                "autoplay": mp.autoplay_enabled,
+                "filters": list(mp.filters.signature()),
+                "queue": [_encode_entry(e) for e in mp.queue],
+            })
+        return {"version": _VERSION, "saved_at": time.time(), "sessions": sessions}
+
+    def _write(self, data: dict):
+        raw = gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), compresslevel=5)
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def save(self):
+        """Write a snapshot now (blocking; used on shutdown).
+
+        An empty capture is not written: once voice clients are torn down
+        every player looks disconnected, and the last periodic snapshot is
+        the better record of what was playing.
+        """
+        if not self.restored:
+            return
+        data = self.snapshot()
+        if not data["sessions"]:
+            logger.info("No connected players at shutdown; keeping the previous session snapshot.")
+            return
+        try:
+            self._write(data)
+        except OSError as e:
+            logger.warning(f"Could not write session snapshot to {self.path}: {e}")
+
+    async def save_async(self):
+        # State is captured on the loop; encoding and disk I/O run on a worker thread
+        data = self.snapshot()
+        try:
+            await asyncio.to_thread(self._write, data)
+        except OSError as e:
+            logger.warning(f"Could not write session snapshot to {self.path}: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                await self.save_async()
+        except asyncio.CancelledError:
+            pass
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    # --- warm restart ---
+    def _read(self) -> list[dict]:
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, "rb") as f:
+                data = json.loads(gzip.decompress(f.read()))
+        except (OSError, ValueError, EOFError) as e:
+            logger.warning(f"Ignoring unreadable session snapshot {self.path}: {e}")
+            return []
+        if data.get("version") != _VERSION:
+            return []
+        age = time.time() - data.get("saved_at", 0)
+        if age > self.max_age:
+            logger.info(f"Session snapshot is {age:.0f}s old; not restoring.")
+            return []
+        return data.get("sessions", [])
+
+    async def restore(self) -> int:
+        """Rejoin saved voice channels and resume each track at its saved position."""
+        if self.restored:
+            return 0
+        self.restored = True
+        sessions = await asyncio.to_thread(self._read)
+        if not sessions:
+            return 0
+        self._resume_started = time.monotonic()
+        sem = asyncio.Semaphore(max(1, SESSION_RESTORE_CONCURRENCY))
+
+        async def one(entry):
+            async with sem:
+                try:
+                    return await self._resume(entry)
+                except Exception as e:
+                    logger.error(f"Could not restore session for guild {entry.get('guild')}: {e}", exc_info=True)
+                    return False
+
+        results = await asyncio.gather(*(one(e) for e in sessions))
+        restored = sum(1 for r in results if r)
+        logger.info(f"Restored {restored}/{len(sessions)} session(s) in {time.monotonic() - self._resume_started:.2f}s; "
+                    f"waiting for audio in {len(self._resuming)} guild(s).")
+        return restored
+
+    async def _resume(self, entry: dict) -> bool:
+        manager = self.manager
+        guild = manager.bot.get_guild(entry["guild"])
+        channel = guild.get_channel(entry["channel"]) if guild else None
+        if channel is None:
+            logger.info(f"Not restoring guild {entry['guild']}: voice channel is gone.")
+            return False
+        if manager.occupancy.humans(channel) == 0:
+            logger.info(f"Not restoring guild {guild.id}: nobody is in {channel.name}.")
+            return False
+
+        mp = manager.get(guild.id)
+        try:
+            mp.vc = await channel.connect(cls=manager.nodes.player_factory(channel))
+        except Exception:
+            # Don't leave an empty player behind; the reaper would get it, but only after the idle timeout
+            if mp.is_idle():
+                manager.remove(guild.id)
+            raise
+        # Filled only once connected, so a failed connect never strands a queue without a voice client
+        mp.loop_mode = entry.get("loop", "off")
+        mp.autoplay_enabled = entry.get("autoplay", False)
+        mp.filters.bassboost, mp.filters.nightcore, mp.filters.volume = entry["filters"]
+        mp.queue.extend(_decode_entry(e) for e in entry.get("queue", ()))
+        mp.prefetcher.poke()
+        await mp.filters.apply(mp.vc, force=True)
+        self._resuming.add(guild.id)
+        if entry.get("track"):
+            track = _decode_entry(entry["track"])
+            await mp.actor.call(self._play_saved, mp, track, entry.get("position", 0), entry.get("paused", False), key="start")
+        else:
+            await mp.start_playback()
+        if not mp.current_song:
+            self._resuming.discard(guild.id)
+            return False
+        logger.info(f"Restored session in guild {guild.id}: {getattr(mp.current_song, 'title', None)} at "
+                    f"{entry.get('position', 0)}ms, {len(mp.queue)} queued.")
+        return True
+
+    @staticmethod
+    async def _play_saved(mp, track: TrackRef, position: int, paused: bool):
+        playable = track.to_playable()
+        start = position if track.is_seekable and 0 < position < track.length else 0
+        await mp.vc.play(playable, start=start, paused=paused, add_history=False)
+        mp.current_song = playable
+        if paused:
+            mp.schedule_timeout("paused")
+
+    def track_started(self, guild_id: int):
+        """Called on TrackStart; reports warm-restart timing once every restored guild has audio."""
+        if guild_id not in self._resuming:
+            return
+        self._resuming.discard(guild_id)
+        now = time.monotonic()
+        if self._first_audio is None:
+            self._first_audio = now
+            logger.info(f"Warm restart: first audio resumed {now - _PROCESS_STARTED:.2f}s after process start.")
+        if not self._resuming:
+            total = now - _PROCESS_STARTED
+            WARM_RESTART_SECONDS.set(total)
+            logger.info(f"Warm restart: all restored sessions playing {total:.2f}s after process start "
+                        f"({now - self._resume_started:.2f}s after restore began).")
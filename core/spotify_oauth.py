@@ -1,12 +1,16 @@
 # core/spotify_oauth.py
 import os
 import json
+import asyncio
+import logging
 import threading
-import webbrowser
+import time
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import requests
 
+from core.config import SPOTIFY_TOKEN_REFRESH_AHEAD, SPOTIFY_TOKEN_FLUSH_DELAY, SPOTIFY_HTTP_TIMEOUT, SPOTIFY_POLL_CONCURRENCY
+
 if __name__ == "__main__":
     print("[Spotify OAuth] Starting test server on http://localhost:8888 ... (Ctrl+C to stop)")
     class StandaloneHandler(BaseHTTPRequestHandler):
@@ -41,10 +45,31 @@ SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET") or "YOUR_CLIENT_SECRE
 SPOTIFY_REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI") or "YOUR_URL:PORT/callback"
 SCOPE = "user-read-currently-playing user-read-playback-state"
 TOKEN_FILE = os.path.join("cache", "spotify_tokens.json")
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+logger = logging.getLogger(__name__)
+# Guards SpotifyOAuthHandler.tokens; only ever held to change or copy the dict,
+# so the event loop never waits on disk I/O for it
+_tokens_lock = threading.Lock()
+# Serializes writers of the token file (worker threads and the OAuth thread only)
+_file_lock = threading.Lock()
+
+
+def _write_tokens_file(raw: str):
+    """Replace the token file atomically (temp file, fsync, rename)."""
+    os.makedirs(os.path.dirname(TOKEN_FILE), exist_ok=True)
+    tmp = TOKEN_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, TOKEN_FILE)
 
 class SpotifyOAuthHandler:
     def __init__(self):
         self.tokens = self._load_tokens()
+        self._version = 0  # bumped on every change to tokens
+        self._saved_version = 0
 
     def _load_tokens(self):
         if os.path.exists(TOKEN_FILE):
@@ -52,9 +77,36 @@ class SpotifyOAuthHandler:
                 return json.load(f)
         return {}
 
+    def set_token(self, user_id, token_info: dict):
+        with _tokens_lock:
+            self.tokens[str(user_id)] = token_info
+            self._version += 1
+
+    def update_token(self, user_id, refresh_token: str, fields: dict) -> dict | None:
+        """Merge ``fields`` into the user's token unless it no longer uses ``refresh_token``.
+
+        Returns the merged token, or None if the user re-authorized (or was
+        removed) while the refresh was in flight, in which case the newer
+        entry is left alone.
+        """
+        with _tokens_lock:
+            current = self.tokens.get(str(user_id))
+            if not current or current.get("refresh_token") != refresh_token:
+                return None
+            updated = self.tokens[str(user_id)] = dict(current, **fields)
+            self._version += 1
+            return updated
+
     def _save_tokens(self):
-        with open(TOKEN_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.tokens, f)
+        """Serialize and write the current tokens (blocking; run off the event loop)."""
+        with _file_lock:
+            # The copy is taken after any earlier writer finished, so the file never goes backwards
+            with _tokens_lock:
+                if self._version == self._saved_version:
+                    return
+                tokens, version = dict(self.tokens), self._version
+            _write_tokens_file(json.dumps(tokens))
+            self._saved_version = version
 
     def get_auth_url(self, user_id):
         params = {
@@ -68,7 +120,6 @@ class SpotifyOAuthHandler:
         return url
 
     def start_local_http_server(self, user_id):
-        import logging
         code_holder = {}
         class Handler(BaseHTTPRequestHandler):
             def do_GET(self):
@@ -120,34 +171,6 @@ class SpotifyOAuthHandler:
             return resp.json()
         return None
 
-    def refresh_token(self, refresh_token):
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": refresh_token,
-            "client_id": SPOTIFY_CLIENT_ID,
-            "client_secret": SPOTIFY_CLIENT_SECRET
-        }
-        resp = requests.post("https://accounts.spotify.com/api/token", data=data)
-        if resp.status_code == 200:
-            return resp.json()
-        return None
-
-    def get_access_token(self, user_id):
-        user_id = str(user_id)
-        if user_id in self.tokens:
-            token_info = self.tokens[user_id]
-            if token_info.get("expires_at", 0) > int(__import__('time').time()):
-                return token_info["access_token"]
-            # Refresh
-            refreshed = self.refresh_token(token_info["refresh_token"])
-            if refreshed and "access_token" in refreshed:
-                token_info["access_token"] = refreshed["access_token"]
-                token_info["expires_at"] = int(__import__('time').time()) + refreshed.get("expires_in", 3600)
-                self.tokens[user_id] = token_info
-                self._save_tokens()
-                return token_info["access_token"]
-        return None
-
     def authorize_user(self, user_id, send_link_callback=None, timeout=120):
         url = self.get_auth_url(user_id)
         if send_link_callback:
@@ -158,20 +181,136 @@ class SpotifyOAuthHandler:
             return False
         token_info = self.exchange_code(code)
         if token_info and "access_token" in token_info:
-            token_info["expires_at"] = int(__import__('time').time()) + token_info.get("expires_in", 86400)
-            self.tokens[str(user_id)] = token_info
+            token_info["expires_at"] = int(time.time()) + token_info.get("expires_in", 86400)
+            self.set_token(user_id, token_info)
             self._save_tokens()
             return True
         return False
 
-    def get_currently_playing(self, user_id):
-        access_token = self.get_access_token(user_id)
-        if not access_token:
+
+class SpotifyTokenManager:
+    """Async access tokens for the Spotify poller, refreshed ahead of expiry.
+
+    get() returns the cached token while it has more than ``refresh_ahead``
+    seconds left. Inside that window it still returns the cached token and
+    starts a background refresh; only an already expired token makes the
+    caller wait. Concurrent refreshes for one user share a single request.
+    Refreshed tokens are written to the shared token dict at once and to
+    disk in one atomic write per ``flush_delay`` seconds.
+    """
+
+    def __init__(self, handler: SpotifyOAuthHandler, refresh_ahead: float = SPOTIFY_TOKEN_REFRESH_AHEAD,
+                 flush_delay: float = SPOTIFY_TOKEN_FLUSH_DELAY, retry_after: float = 30):
+        self.handler = handler
+        self.refresh_ahead = refresh_ahead
+        self.flush_delay = flush_delay
+        self.retry_after = retry_after
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._failed_at: dict[str, float] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._http = None
+
+    @property
+    def tokens(self) -> dict:
+        return self.handler.tokens
+
+    async def get(self, user_id) -> str | None:
+        user_id = str(user_id)
+        info = self.tokens.get(user_id)
+        if not info:
             return None
-        headers = {"Authorization": f"Bearer {access_token}"}
-        resp = requests.get("https://api.spotify.com/v1/me/player/currently-playing", headers=headers)
-        if resp.status_code == 200:
-            return resp.json()
-        return None
+        remaining = info.get("expires_at", 0) - time.time()
+        if remaining > self.refresh_ahead:
+            return info["access_token"]
+        if remaining > 0:
+            self.refresh(user_id)
+            return info["access_token"]
+        task = self.refresh(user_id)
+        return await asyncio.shield(task) if task else None
+
+    def refresh(self, user_id: str) -> asyncio.Task | None:
+        """Start (or join) a refresh for ``user_id``; None while backing off after a failure."""
+        task = self._refreshing.get(user_id)
+        if task is not None:
+            return task
+        if time.monotonic() - self._failed_at.get(user_id, -self.retry_after) < self.retry_after:
+            return None
+        task = self._refreshing[user_id] = asyncio.create_task(self._refresh(user_id))
+        task.add_done_callback(lambda t: self._refreshing.pop(user_id, None))
+        return task
+
+    async def session(self):
+        """The one pooled HTTP session for every Spotify request (token refreshes and the poller)."""
+        if self._http is None or self._http.closed:
+            import aiohttp
+            self._http = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=SPOTIFY_HTTP_TIMEOUT),
+                connector=aiohttp.TCPConnector(limit=max(1, SPOTIFY_POLL_CONCURRENCY), ttl_dns_cache=300),
+            )
+        return self._http
+
+    async def _refresh(self, user_id: str) -> str | None:
+        info = self.tokens.get(user_id)
+        if not info or not info.get("refresh_token"):
+            return None
+        data = {
+            "grant_type": "refresh_token",
+            "refresh_token": info["refresh_token"],
+            "client_id": SPOTIFY_CLIENT_ID,
+            "client_secret": SPOTIFY_CLIENT_SECRET
+        }
+        try:
+            session = await self.session()
+            async with session.post(TOKEN_URL, data=data) as resp:
+                body = await resp.json(content_type=None) if resp.status == 200 else None
+                status = resp.status
+        except Exception as e:
+            logger.warning(f"Spotify token refresh failed for user_id={user_id}: {e!r}")
+            body, status = None, None
+        if not body or "access_token" not in body:
+            logger.warning(f"Spotify token refresh for user_id={user_id} was rejected (HTTP {status}).")
+            self._failed_at[user_id] = time.monotonic()
+            return None
+
+        self._failed_at.pop(user_id, None)
+        fields = {"access_token": body["access_token"], "expires_at": int(time.time()) + body.get("expires_in", 3600)}
+        if body.get("refresh_token"):
+            fields["refresh_token"] = body["refresh_token"]
+        # Re-read after the request: a re-authorization that landed meanwhile wins
+        updated = self.handler.update_token(user_id, info["refresh_token"], fields)
+        if updated is None:
+            current = self.tokens.get(user_id)
+            return current.get("access_token") if current else None
+        self._mark_dirty()
+        logger.debug(f"Refreshed Spotify token for user_id={user_id}")
+        return updated["access_token"]
+
+    def _mark_dirty(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_delay)
+        try:
+            await asyncio.to_thread(self.handler._save_tokens)
+        except OSError as e:
+            logger.warning(f"Could not save Spotify tokens: {e}")
+
+    async def close(self):
+        """Write any pending token changes and close the HTTP session."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await asyncio.to_thread(self.handler._save_tokens)
+            except OSError as e:
+                logger.warning(f"Could not save Spotify tokens: {e}")
+        self._flush_task = None
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
 
 spotify_oauth = SpotifyOAuthHandler()
+token_manager = SpotifyTokenManager(spotify_oauth)
@@ -0,0 +1,227 @@
+# core/spotify_poller.py
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from core.config import (
+    SPOTIFY_POLL_PLAYING, SPOTIFY_POLL_MAX, SPOTIFY_POLL_PAUSED, SPOTIFY_POLL_IDLE, SPOTIFY_POLL_ERROR_MAX,
+    SPOTIFY_POLL_CONCURRENCY,
+)
+
+# Written to spotify.log by the queue listener set up in core.logs
+spotify_logger = logging.getLogger('spotify_logger')
+
+CURRENTLY_PLAYING_URL = "https://api.spotify.com/v1/me/player/currently-playing"
+MAX_ERRORS = 5
+# Seek slightly ahead of Spotify to make up for the time spent loading the track
+SEEK_OFFSET_MS = 1000
+SEEK_TOLERANCE_MS = 1800
+
+
+class _Stalker:
+    __slots__ = ("user_id", "guild_id", "ctx", "token", "last_track_id", "last_is_playing", "errors", "quiet")
+
+    def __init__(self, user_id: str, guild_id: int, ctx):
+        self.user_id = user_id
+        # The MusicPlayer is looked up on every poll: the manager may have replaced it
+        self.guild_id = guild_id
+        self.ctx = ctx
+        self.token = None  # sequence number of this user's live heap entry
+        self.last_track_id = None
+        self.last_is_playing = None
+        self.errors = 0
+        self.quiet = 0  # polls in a row that needed no action
+
+
+class SpotifyPoller:
+    """One scheduler for every /spotify_stalk user.
+
+    Each stalked user has a single entry in a min-heap of next-poll
+    deadlines. The scheduler sleeps until the earliest deadline (or until a
+    user is added), then polls every due user through the aiohttp session
+    owned by the token manager, at most ``concurrency`` requests at a time. The next poll is
+    scheduled from what Spotify returned: soon after the current track is
+    due to end, backing off while nothing changes, slower while paused or
+    idle, and exponentially on errors or rate limiting.
+    """
+
+    def __init__(self, concurrency: int = SPOTIFY_POLL_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._stalkers: dict[str, _Stalker] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self._task: asyncio.Task | None = None
+        self._polls: set[asyncio.Task] = set()
+
+    def __contains__(self, user_id) -> bool:
+        return str(user_id) in self._stalkers
+
+    def __len__(self):
+        return len(self._stalkers)
+
+    def add(self, user_id, guild_id: int, ctx) -> bool:
+        """Start stalking ``user_id`` into ``guild_id``'s player; False if already stalked."""
+        user_id = str(user_id)
+        if user_id in self._stalkers:
+            return False
+        stalker = self._stalkers[user_id] = _Stalker(user_id, guild_id, ctx)
+        self._schedule(stalker, 0)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return True
+
+    def remove(self, user_id) -> bool:
+        # The heap entry is left in place and skipped when it comes due
+        return self._stalkers.pop(str(user_id), None) is not None
+
+    def _schedule(self, stalker: _Stalker, delay: float):
+        stalker.token = next(self._seq)
+        heapq.heappush(self._heap, (time.monotonic() + delay, stalker.token, stalker.user_id))
+        self._wakeup.set()
+
+    async def _run(self):
+        try:
+            while self._stalkers:
+                self._wakeup.clear()
+                if not self._heap:
+                    await self._wakeup.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                _, token, user_id = heapq.heappop(self._heap)
+                stalker = self._stalkers.get(user_id)
+                if stalker is None or stalker.token != token:
+                    continue
+                task = asyncio.create_task(self._poll(stalker))
+                self._polls.add(task)
+                task.add_done_callback(self._polls.discard)
+        except asyncio.CancelledError:
+            pass
+
+    # --- HTTP ---
+    async def _fetch(self, stalker: _Stalker):
+        """Return (status, json or None, retry_after)."""
+        from core.spotify_oauth import token_manager
+        token = await token_manager.get(stalker.user_id)
+        if not token:
+            return 401, None, None
+        # Shared with token refreshes; token_manager.close() closes it
+        session = await token_manager.session()
+        async with self._sem:
+            async with session.get(CURRENTLY_PLAYING_URL, headers={"Authorization": f"Bearer {token}"}) as resp:
+                retry_after = resp.headers.get("Retry-After")
+                data = await resp.json(content_type=None) if resp.status == 200 else None
+                return resp.status, data, float(retry_after) if retry_after else None
+
+    # --- per-user poll ---
+    async def _poll(self, stalker: _Stalker):
+        if stalker.user_id not in self._stalkers:
+            return
+        try:
+            delay = await self._poll_once(stalker)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            spotify_logger.error(f"[SpotifyStalk] Spotify API error for user_id={stalker.user_id}: {e!r}")
+            delay = self._on_error(stalker)
+        if delay is None:
+            await self._give_up(stalker)
+        elif self._stalkers.get(stalker.user_id) is stalker:
+            self._schedule(stalker, delay)
+
+    def _on_error(self, stalker: _Stalker) -> float | None:
+        stalker.errors += 1
+        if stalker.errors > MAX_ERRORS:
+            return None
+        return min(SPOTIFY_POLL_ERROR_MAX, SPOTIFY_POLL_IDLE * 2 ** (stalker.errors - 1))
+
+    async def _give_up(self, stalker: _Stalker):
+        if self._stalkers.get(stalker.user_id) is not stalker:
+            return
+        self.remove(stalker.user_id)
+        spotify_logger.warning(f"[SpotifyStalk] Stopped for user_id={stalker.user_id} after {stalker.errors} errors in a row.")
+        try:
+            await stalker.ctx.followup.send("Spotify stalk stopped due to repeated errors.", ephemeral=True)
+        except Exception as e:
+            spotify_logger.warning(f"[SpotifyStalk] Could not notify user_id={stalker.user_id}: {e}")
+
+    async def _poll_once(self, stalker: _Stalker) -> float | None:
+        """Poll Spotify once and sync playback; returns seconds until the next poll."""
+        status, data, retry_after = await self._fetch(stalker)
+        user_id = stalker.user_id
+        if status == 429:
+            spotify_logger.warning(f"[SpotifyStalk] Rate limited for user_id={user_id}, retry after {retry_after}s")
+            return max(retry_after or 0, SPOTIFY_POLL_IDLE)
+        if status == 401:
+            spotify_logger.warning(f"[SpotifyStalk] No valid access token for user_id={user_id}. The token is invalid or expired.")
+            return self._on_error(stalker)
+        if status >= 400:
+            spotify_logger.warning(f"[SpotifyStalk] Spotify API error for user_id={user_id}: HTTP {status}")
+            return self._on_error(stalker)
+        stalker.errors = 0
+        if status == 204 or not data or not data.get("item"):
+            spotify_logger.debug(f"[SpotifyStalk] No track playing for user_id={user_id}")
+            return SPOTIFY_POLL_IDLE
+
+        item = data["item"]
+        # get() also marks the player active, so the reaper keeps it while it is stalked
+        music = stalker.ctx.bot.players.get(stalker.guild_id)
+        track_id = item.get("id")
+        track_name = item.get("name")
+        artists = ", ".join([a["name"] for a in item.get("artists", [])])
+        is_playing = data.get("is_playing", False)
+        position_ms = data.get("progress_ms") or 0
+        duration_ms = item.get("duration_ms") or 0
+        seek_ms = max(0, position_ms + SEEK_OFFSET_MS)
+        changed = False
+
+        if track_id != stalker.last_track_id:
+            author = item["artists"][0]["name"] if item.get("artists") else ""
+            query = f"{track_name} {artists} {author}".strip()
+            spotify_logger.info(f"[SpotifyStalk] New track for user_id={user_id}. Query: {query}")
+            track = await music.play_next(stalker.ctx, query, replace=True)
+            spotify_logger.info(f"[SpotifyStalk] play_next returned: {track}")
+            await asyncio.sleep(0.5)
+            await music.seek(seek_ms)
+            stalker.last_track_id = track_id
+            stalker.last_is_playing = is_playing
+            changed = True
+        else:
+            # Seek when play/pause flipped or our playback drifted away from Spotify's
+            ours = music.vc.position if music.vc and music.vc.playing else None
+            if is_playing != stalker.last_is_playing or (ours is not None and abs(ours - seek_ms) > SEEK_TOLERANCE_MS):
+                changed = True
+                spotify_logger.info(f"[SpotifyStalk] Seeking to {seek_ms}")
+                await music.seek(seek_ms)
+            if is_playing != stalker.last_is_playing:
+                if music.vc and music.vc.connected:
+                    spotify_logger.info(f"[SpotifyStalk] Pausing/Resuming: {not is_playing}")
+                    await music.set_paused(not is_playing)
+                stalker.last_is_playing = is_playing
+
+        stalker.quiet = 0 if changed else stalker.quiet + 1
+        if not is_playing:
+            return SPOTIFY_POLL_PAUSED
+        # Back off while nothing changes, but always check right after the track should have ended
+        interval = min(SPOTIFY_POLL_MAX, SPOTIFY_POLL_PLAYING * 1.5 ** stalker.quiet)
+        remaining = (duration_ms - position_ms) / 1000 if duration_ms else interval
+        return max(0.5, min(interval, remaining + 0.5))
+
+    async def close(self):
+        self._stalkers.clear()
+        for task in (self._task, *self._polls):
+            if task:
+                task.cancel()
+        self._task = None
+
+
+spotify_poller = SpotifyPoller()
@@ -0,0 +1,119 @@
+# core/timers.py
+import asyncio
+import inspect
+import logging
+import math
+
+from core.config import TIMER_TICK, TIMER_SLOTS
+
+logger = logging.getLogger(__name__)
+
+
+class _Timer:
+    __slots__ = ("key", "callback", "slot", "rounds")
+
+    def __init__(self, key, callback, slot: int, rounds: int):
+        self.key = key
+        self.callback = callback
+        self.slot = slot
+        self.rounds = rounds
+
+
+class TimerWheel:
+    """Hashed timer wheel for keyed, cancellable timeouts.
+
+    Deadlines are rounded up to ``tick`` seconds and hashed into one of
+    ``slots`` buckets; longer delays wrap around with a round counter.
+    schedule() and cancel() are O(1) dict operations, and scheduling a key
+    that is already pending replaces it, so repeated events for the same
+    key never pile up. One driver task advances the wheel while any timer
+    is pending; callbacks may be plain functions or coroutine functions.
+    With ``drive=False`` no task is started and the caller moves the wheel
+    with advance(), e.g. in tests.
+    """
+
+    def __init__(self, tick: float = TIMER_TICK, slots: int = TIMER_SLOTS, drive: bool = True):
+        self.tick = tick
+        self.drive = drive
+        self._slots: list[dict] = [{} for _ in range(max(1, slots))]
+        self._timers: dict = {}
+        self._cursor = 0
+        self._task: asyncio.Task | None = None
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key) -> bool:
+        return key in self._timers
+
+    def schedule(self, key, delay: float, callback):
+        """Run ``callback()`` after ``delay`` seconds, replacing any timer under ``key``."""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        size = len(self._slots)
+        timer = _Timer(key, callback, (self._cursor + ticks) % size, (ticks - 1) // size)
+        self._slots[timer.slot][key] = timer
+        self._timers[key] = timer
+        if self.drive and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    def cancel(self, key) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        self._slots[timer.slot].pop(key, None)
+        return True
+
+    def _advance(self) -> list[_Timer]:
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        slot = self._slots[self._cursor]
+        due = []
+        for key, timer in list(slot.items()):
+            if timer.rounds:
+                timer.rounds -= 1
+                continue
+            del slot[key]
+            del self._timers[key]
+            due.append(timer)
+        return due
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.tick
+        try:
+            while self._timers:
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+                # Catch up on ticks missed while the loop was busy
+                while next_tick <= loop.time() and self._timers:
+                    next_tick += self.tick
+                    self.advance()
+        except asyncio.CancelledError:
+            pass
+
+    def advance(self, ticks: int = 1) -> int:
+        """Move the wheel on by ``ticks`` and run every timer that came due; returns how many ran."""
+        fired = 0
+        for _ in range(ticks):
+            for timer in self._advance():
+                self._fire(timer)
+                fired += 1
+        return fired
+
+    def _fire(self, timer: _Timer):
+        try:
+            result = timer.callback()
+            if inspect.isawaitable(result):
+                task = asyncio.ensure_future(result)
+                task.add_done_callback(lambda t, key=timer.key: self._log_failure(t, key))
+        except Exception as e:
+            logger.error(f"Timer {timer.key!r} failed: {e}", exc_info=True)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task, key):
+        if not task.cancelled() and task.exception():
+            logger.error(f"Timer {key!r} failed: {task.exception()}", exc_info=task.exception())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
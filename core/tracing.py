@@ -0,0 +1,128 @@
+# core/tracing.py
+import contextvars
+import itertools
+import json
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from core.config import TRACE_BUFFER_SIZE, TRACE_START_TIMEOUT
+
+logger = logging.getLogger(__name__)
+# Finished traces as JSON lines; core.logs sends this logger to TRACE_EXPORT_PATH if set
+export_logger = logging.getLogger("bot.traces")
+
+STAGES = ("dispatch", "defer", "ready", "join", "resolve", "play", "track_start")
+
+current_trace: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("current_trace", default=None)
+_ids = itertools.count(1)
+
+
+class Trace:
+    """Stage timings of one command, from interaction to the first audio.
+
+    Stages are recorded as (name, seconds); ``dispatch`` is the gap between
+    Discord creating the interaction and the command handler running.
+    """
+
+    __slots__ = ("id", "command", "guild_id", "started", "spans", "total", "_play_returned")
+
+    def __init__(self, command: str, guild_id: int, dispatch: float | None = None):
+        self.id = f"{guild_id}-{next(_ids)}"
+        self.command = command
+        self.guild_id = guild_id
+        self.started = time.perf_counter()
+        self.spans: list[tuple[str, float]] = []
+        self.total: float | None = None
+        self._play_returned: float | None = None
+        if dispatch is not None:
+            self.spans.append(("dispatch", max(0.0, dispatch)))
+
+    def record(self, stage: str, seconds: float):
+        self.spans.append((stage, seconds))
+
+    def stage(self, name: str) -> float:
+        return sum(s for n, s in self.spans if n == name)
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "command": self.command, "guild": self.guild_id, "total": self.total,
+                "spans": [[n, round(s, 6)] for n, s in self.spans]}
+
+
+class Tracer:
+    """Keeps open traces until their TrackStart arrives and a ring of finished ones."""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE, start_timeout: float = TRACE_START_TIMEOUT):
+        self.finished: deque[Trace] = deque(maxlen=size)
+        self.start_timeout = start_timeout
+        # guild id -> trace whose vc.play() returned and is waiting for TrackStart
+        self._awaiting_start: dict[int, Trace] = {}
+
+    def start(self, command: str, guild_id: int, created_at=None) -> Trace:
+        """Begin a trace and make it current for this task (and tasks it spawns)."""
+        dispatch = None
+        if created_at is not None:
+            import discord
+            dispatch = (discord.utils.utcnow() - created_at).total_seconds()
+        trace = Trace(command, guild_id, dispatch)
+        current_trace.set(trace)
+        return trace
+
+    def awaiting_start(self):
+        """Called after vc.play() returns: the trace now waits for the TrackStart event."""
+        trace = current_trace.get()
+        if trace is None or trace.total is not None:
+            return
+        trace._play_returned = time.perf_counter()
+        self._awaiting_start[trace.guild_id] = trace
+
+    def discard(self):
+        """Drop the current trace, e.g. when the track was only queued."""
+        trace = current_trace.get()
+        if trace is not None:
+            self._awaiting_start.pop(trace.guild_id, None)
+            current_trace.set(None)
+
+    def track_started(self, guild_id: int) -> Trace | None:
+        trace = self._awaiting_start.pop(guild_id, None)
+        if trace is None:
+            return None
+        now = time.perf_counter()
+        if now - trace._play_returned > self.start_timeout:
+            return None
+        trace.record("track_start", now - trace._play_returned)
+        trace.total = trace.stage("dispatch") + now - trace.started
+        self.finished.append(trace)
+        if export_logger.isEnabledFor(logging.INFO):
+            export_logger.info("%s", json.dumps(trace.to_dict(), separators=(",", ":")))
+        logger.debug(f"Trace {trace.id} finished: time to first audio {trace.total * 1000:.0f}ms")
+        return trace
+
+    def percentiles(self, command: str | None = None, quantiles=(0.5, 0.95, 0.99)) -> dict[str, list[float]]:
+        """Per-stage and total quantiles (seconds) over the finished traces."""
+        traces = [t for t in self.finished if command is None or t.command == command]
+        result = {}
+        for stage in STAGES + ("total",):
+            values = sorted(t.total if stage == "total" else t.stage(stage) for t in traces
+                            if stage == "total" or any(n == stage for n, _ in t.spans))
+            if values:
+                result[stage] = [values[min(len(values) - 1, int(q * len(values)))] for q in quantiles]
+        return result
+
+
+tracer = Tracer()
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block as ``stage`` of the current trace; a no-op outside a trace."""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(stage, time.perf_counter() - start)
@@ -0,0 +1,101 @@
+# core/track_map.py
+from collections import deque
+
+from core.config import HARDCODED_TRACK_MAP
+
+
+class TrackMapMatcher:
+    """Aho-Corasick matcher over the keys of a query -> URL override map.
+
+    A lookup scans the normalized query once, so its cost depends only on the
+    query length, not on how many overrides exist. When several keys occur in
+    the query, the longest one wins; ties go to the leftmost occurrence. An
+    exact match is always the longest possible match, so it still takes
+    precedence as before.
+
+    The automaton is rebuilt lazily when a different map object is assigned or
+    the number of keys changes. Use set_override/remove_override (or call
+    rebuild() after editing the dict in place) to keep it in sync otherwise.
+    """
+
+    def __init__(self, mapping: dict[str, str]):
+        self.mapping = mapping
+        self._built_from = None
+        self._built_size = -1
+        self.rebuild()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return text.lower().strip()
+
+    def rebuild(self):
+        goto: list[dict[str, int]] = [{}]
+        best: list[tuple[int, str] | None] = [None]
+
+        for key, url in self.mapping.items():
+            key = self.normalize(key)
+            if not key:
+                continue
+            node = 0
+            for ch in key:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    best.append(None)
+                node = nxt
+            best[node] = (len(key), url)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            # Longest key ending at this node: its own key, else the best of its fail target
+            if best[node] is None:
+                best[node] = best[fail[node]]
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+        self._built_from = self.mapping
+        self._built_size = len(self.mapping)
+
+    def _ensure_current(self):
+        if self._built_from is not self.mapping or self._built_size != len(self.mapping):
+            self.rebuild()
+
+    def lookup(self, query: str) -> str | None:
+        """Return the override URL for the longest key contained in query."""
+        self._ensure_current()
+        goto, fail, best = self._goto, self._fail, self._best
+        node = 0
+        match_len = 0
+        match_url = None
+        for ch in self.normalize(query):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = best[node]
+            if hit and hit[0] > match_len:
+                match_len, match_url = hit
+        return match_url
+
+    def set_override(self, key: str, url: str):
+        self.mapping[key] = url
+        self.rebuild()
+
+    def remove_override(self, key: str) -> bool:
+        if self.mapping.pop(key, None) is None:
+            return False
+        self.rebuild()
+        return True
+
+
+track_map_matcher = TrackMapMatcher(HARDCODED_TRACK_MAP)
@@ -0,0 +1,257 @@
+# core/track_queue.py
+import random
+from collections import deque
+from itertools import islice
+
+
+def _track_length(track) -> int:
+    return getattr(track, 'length', 0) or 0
+
+
+class TrackQueue:
+    """Chunked play queue.
+
+    Tracks live in a list of deques ("chunks") of at most ``2 * chunk_size``
+    entries. A Fenwick tree over the chunk sizes maps a position to its chunk
+    in O(log n), and is updated in O(log n) when a chunk grows or shrinks:
+
+    - append / popleft / pop() are O(1) amortized, appendleft O(log n),
+    - __getitem__ is O(log n),
+    - insert / pop(i) / move are O(log n) plus a shift inside one chunk
+      (at most ``2 * chunk_size`` entries),
+    - remove(track) is O(n): it searches by identity.
+
+    Structural changes (splitting a full chunk, merging an underfull one into
+    its neighbour, dropping an empty one) rebuild the tree in O(n / chunk_size).
+    Each needs on the order of ``chunk_size`` operations on that chunk first,
+    so their amortized cost is O(n / chunk_size**2), and merging keeps the
+    queue from fragmenting after many deletions. extend appends whole chunks
+    at once for large playlists.
+
+    A running ``total_length`` (ms) is maintained so callers never re-sum it.
+    """
+
+    def __init__(self, tracks=(), chunk_size: int = 512):
+        self.chunk_size = max(1, chunk_size)
+        self._chunks: list[deque] = []
+        self._tree: list[int] = [0]  # 1-based Fenwick tree over len(chunk)
+        self._len = 0
+        self.total_length = 0
+        self.extend(tracks)
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __repr__(self):
+        return f"<TrackQueue len={self._len} total_length={self.total_length}>"
+
+    # --- chunk index ---
+    def _rebuild(self):
+        tree = [0] * (len(self._chunks) + 1)
+        for i, chunk in enumerate(self._chunks, 1):
+            tree[i] += len(chunk)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _prefix(self, count: int) -> int:
+        """Number of tracks in the first ``count`` chunks."""
+        total = 0
+        while count:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def _resize(self, k: int, delta: int):
+        i = k + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _push_chunk(self, chunk: deque):
+        i = len(self._chunks) + 1
+        self._chunks.append(chunk)
+        self._tree.append(len(chunk) + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+
+    def _drop_chunk(self, k: int):
+        del self._chunks[k]
+        if k == len(self._chunks):
+            self._tree.pop()  # no other node covers the last chunk
+        else:
+            self._rebuild()
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("TrackQueue index out of range")
+        tree, k = self._tree, 0
+        step = 1 << (len(self._chunks).bit_length() - 1)
+        while step:
+            nxt = k + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                k = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return k, index
+
+    def _iter_from(self, index: int):
+        if index >= self._len:
+            return
+        k, local = self._locate(index)
+        yield from islice(self._chunks[k], local, None)
+        for chunk in self._chunks[k + 1:]:
+            yield from chunk
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step == 1:
+                return list(islice(self._iter_from(start), max(0, stop - start)))
+            return list(self)[index]
+        k, local = self._locate(index)
+        return self._chunks[k][local]
+
+    def peek(self, count: int) -> list:
+        """Return the next ``count`` tracks without removing them."""
+        return list(islice(iter(self), count))
+
+    # --- end operations ---
+    def append(self, track):
+        if not self._chunks or len(self._chunks[-1]) >= self.chunk_size * 2:
+            self._push_chunk(deque())
+        self._chunks[-1].append(track)
+        self._resize(len(self._chunks) - 1, 1)
+        self._len += 1
+        self.total_length += _track_length(track)
+
+    def appendleft(self, track):
+        if not self._chunks:
+            self._push_chunk(deque())
+        elif len(self._chunks[0]) >= self.chunk_size * 2:
+            # Splitting rather than opening a one-track chunk means popleft can't undo it straight away
+            self._split(0)
+        self._chunks[0].appendleft(track)
+        self._resize(0, 1)
+        self._len += 1
+        self.total_length += _track_length(track)
+
+    def extend(self, tracks):
+        """Append many tracks, filling whole chunks at a time."""
+        tracks = list(tracks)
+        if not tracks:
+            return
+        pos = 0
+        if self._chunks:
+            room = self.chunk_size * 2 - len(self._chunks[-1])
+            if room > 0:
+                self._chunks[-1].extend(tracks[:room])
+                pos = min(room, len(tracks))
+                self._resize(len(self._chunks) - 1, pos)
+        while pos < len(tracks):
+            self._push_chunk(deque(tracks[pos:pos + self.chunk_size]))
+            pos += self.chunk_size
+        self._len += len(tracks)
+        self.total_length += sum(_track_length(t) for t in tracks)
+
+    def popleft(self):
+        if not self._len:
+            raise IndexError("pop from an empty TrackQueue")
+        track = self._chunks[0].popleft()
+        self._resize(0, -1)
+        if not self._chunks[0]:
+            self._drop_chunk(0)
+        self._len -= 1
+        self.total_length -= _track_length(track)
+        return track
+
+    # --- positional operations ---
+    def pop(self, index: int = -1):
+        if not self._len:
+            raise IndexError("pop from an empty TrackQueue")
+        if index in (0, -self._len):
+            return self.popleft()
+        k, local = self._locate(index)
+        chunk = self._chunks[k]
+        if local == len(chunk) - 1:
+            track = chunk.pop()
+        else:
+            track = chunk[local]
+            del chunk[local]
+        self._resize(k, -1)
+        if not chunk:
+            self._drop_chunk(k)
+        elif len(chunk) * 2 < self.chunk_size and k < len(self._chunks) - 1:
+            # The last chunk may stay small: it is where appends land
+            self._merge(k)
+        self._len -= 1
+        self.total_length -= _track_length(track)
+        return track
+
+    def insert(self, index: int, track):
+        if index < 0:
+            index = max(0, index + self._len)
+        if index == 0:
+            return self.appendleft(track)
+        if index >= self._len:
+            return self.append(track)
+        k, local = self._locate(index)
+        chunk = self._chunks[k]
+        chunk.insert(local, track)
+        self._resize(k, 1)
+        if len(chunk) > self.chunk_size * 2:
+            self._split(k)
+        self._len += 1
+        self.total_length += _track_length(track)
+
+    def _split(self, k: int):
+        chunk = self._chunks[k]
+        tail = deque()
+        for _ in range(len(chunk) - self.chunk_size):
+            tail.appendleft(chunk.pop())
+        self._chunks.insert(k + 1, tail)
+        self._rebuild()
+
+    def _merge(self, k: int):
+        """Fold chunk ``k`` into the next one, re-splitting if the result is too large."""
+        chunk = self._chunks[k]
+        chunk.extend(self._chunks.pop(k + 1))
+        if len(chunk) > self.chunk_size * 2:
+            half = len(chunk) // 2
+            tail = deque()
+            for _ in range(len(chunk) - half):
+                tail.appendleft(chunk.pop())
+            self._chunks.insert(k + 1, tail)
+        self._rebuild()
+
+    def move(self, src: int, dest: int):
+        """Move the track at ``src`` to position ``dest``."""
+        track = self.pop(src)
+        self.insert(dest, track)
+        return track
+
+    def remove(self, track):
+        for i, t in enumerate(self):
+            if t is track:
+                return self.pop(i)
+        raise ValueError("track not in TrackQueue")
+
+    def clear(self):
+        self._chunks.clear()
+        self._tree = [0]
+        self._len = 0
+        self.total_length = 0
+
+    def shuffle(self):
+        tracks = list(self)
+        random.shuffle(tracks)
+        self.clear()
+        self.extend(tracks)
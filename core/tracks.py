@@ -0,0 +1,166 @@
+# core/tracks.py
+import asyncio
+import logging
+import os
+
+import wavelink
+
+logger = logging.getLogger(__name__)
+
+
+class TrackRef:
+    """Compact, immutable reference to a resolved Lavalink track.
+
+    Holds the encoded track string plus the handful of fields the bot displays,
+    instead of a full wavelink.Playable with its raw payload, plugin info and
+    extras. Queues, history and the track cache store these; a Playable is
+    only rebuilt (without a Lavalink round trip) right before playing.
+    """
+
+    __slots__ = ("encoded", "identifier", "title", "author", "length", "uri", "artwork", "source", "is_stream", "is_seekable")
+
+    def __init__(self, encoded: str, identifier: str, title: str, author: str, length: int, uri: str | None = None,
+                 artwork: str | None = None, source: str = "", is_stream: bool = False, is_seekable: bool = True):
+        self.encoded = encoded
+        self.identifier = identifier
+        self.title = title
+        self.author = author
+        self.length = length
+        self.uri = uri
+        self.artwork = artwork
+        self.source = source
+        self.is_stream = is_stream
+        self.is_seekable = is_seekable
+
+    def __repr__(self):
+        return f"<TrackRef title={self.title!r} identifier={self.identifier!r}>"
+
+    def __eq__(self, other):
+        return isinstance(other, TrackRef) and other.encoded == self.encoded
+
+    def __hash__(self):
+        return hash(self.encoded)
+
+    @property
+    def artwork_url(self) -> str | None:
+        return self.artwork
+
+    @classmethod
+    def from_playable(cls, track: wavelink.Playable) -> "TrackRef":
+        if isinstance(track, TrackRef):
+            return track
+        return cls(
+            track.encoded, track.identifier, track.title, track.author, track.length, track.uri,
+            track.artwork, track.source, track.is_stream, track.is_seekable,
+        )
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TrackRef":
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+    def to_playable(self) -> wavelink.Playable:
+        return wavelink.Playable({
+            "encoded": self.encoded,
+            "info": {
+                "identifier": self.identifier,
+                "isSeekable": self.is_seekable,
+                "author": self.author,
+                "length": self.length,
+                "isStream": self.is_stream,
+                "position": 0,
+                "title": self.title,
+                "uri": self.uri,
+                "artworkUrl": self.artwork,
+                "isrc": None,
+                "sourceName": self.source,
+            },
+            "pluginInfo": {},
+            "userData": {},
+        })
+
+
+class PlaylistRef:
+    """Compact stand-in for wavelink.Playlist holding TrackRef entries."""
+
+    __slots__ = ("name", "tracks")
+
+    def __init__(self, name: str, tracks: list[TrackRef]):
+        self.name = name
+        self.tracks = tracks
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __iter__(self):
+        return iter(self.tracks)
+
+    def __getitem__(self, index):
+        return self.tracks[index]
+
+
+def compact_search(result: wavelink.Search) -> list[TrackRef] | PlaylistRef:
+    """Convert a wavelink search result into TrackRef/PlaylistRef form."""
+    if isinstance(result, wavelink.Playlist):
+        return PlaylistRef(result.name, [TrackRef.from_playable(t) for t in result.tracks])
+    return [TrackRef.from_playable(t) for t in result or ()]
+
+
+class PendingTrack:
+    """Queue entry that still needs a Lavalink lookup before it can be played.
+
+    Used for raw queries, Spotify metadata, saved-playlist rows and local
+    files. ``title``/``author``/``length`` are display hints known up front;
+    ``length`` is never changed after creation so TrackQueue's running total
+    stays consistent. The resolved TrackRef is stored on ``resolved``.
+    """
+
+    __slots__ = ("query", "title", "author", "length", "uri", "resolved", "failed", "_task")
+
+    def __init__(self, query: str, *, title: str | None = None, author: str | None = None, length: int = 0, uri: str | None = None):
+        self.query = query
+        self.title = title or query
+        self.author = author
+        self.length = length
+        self.uri = uri
+        self.resolved: TrackRef | None = None
+        self.failed = False
+        self._task: asyncio.Task | None = None
+
+    def __repr__(self):
+        return f"<PendingTrack query={self.query!r} resolved={self.resolved is not None}>"
+
+    @property
+    def done(self) -> bool:
+        return self.resolved is not None or self.failed
+
+    async def resolve(self) -> TrackRef | None:
+        """Resolve to a TrackRef, sharing one lookup between concurrent callers."""
+        if self.done:
+            return self.resolved
+        if self._task is None:
+            self._task = asyncio.create_task(self._lookup())
+        return await asyncio.shield(self._task)
+
+    async def _lookup(self) -> TrackRef | None:
+        from core.music import resolve_tracks
+        from core.track_map import track_map_matcher
+
+        try:
+            url = None if os.path.isabs(self.query) else track_map_matcher.lookup(self.query)
+            tracks = await resolve_tracks(url or self.query)
+        except Exception as e:
+            logger.warning(f"Failed to resolve pending track '{self.query}': {e}")
+            self.failed = True
+            return None
+
+        if isinstance(tracks, PlaylistRef):
+            tracks = tracks.tracks
+        if not tracks:
+            logger.info(f"No results for pending track '{self.query}'")
+            self.failed = True
+            return None
+        self.resolved = tracks[0]
+        return self.resolved
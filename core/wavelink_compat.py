@@ -0,0 +1,39 @@
+# core/wavelink_compat.py
+"""The wavelink internals this bot depends on, kept in one place.
+
+wavelink 3.4 has no public call to move a player to another node, to
+reconnect a single node that is already pooled, or to send filters and
+volume in one player update. Every private attribute used for that lives
+here, behind a version check, so an upgrade fails loudly at import time
+instead of misbehaving at runtime. requirements.txt pins the matching
+release line.
+"""
+import wavelink
+
+SUPPORTED_VERSION = (3, 4)
+
+_version = tuple(int(part) for part in wavelink.__version__.split(".")[:2])
+if _version != SUPPORTED_VERSION:
+    raise ImportError(
+        f"wavelink {wavelink.__version__} is not supported; core.wavelink_compat targets "
+        f"{'.'.join(map(str, SUPPORTED_VERSION))}.x. Review the helpers there before upgrading.")
+
+
+async def move_player(player: wavelink.Player, target: wavelink.Node):
+    """Re-home ``player`` on ``target`` and re-send its Discord voice session there."""
+    player.node._players.pop(player.guild.id, None)
+    player._node = target
+    target._players[player.guild.id] = player
+    await player._dispatch_voice_update()
+
+
+async def reconnect_node(node: wavelink.Node, client):
+    """Open a new websocket for a node that is already in wavelink.Pool."""
+    await node._connect(client=client)
+
+
+async def update_filters_and_volume(player: wavelink.Player, filters: wavelink.Filters, volume: int):
+    """Send filters and volume to Lavalink in a single PATCH, keeping the player's cached state in sync."""
+    await player.node._update_player(player.guild.id, data={"filters": filters(), "volume": volume})
+    player._filters = filters
+    player._volume = volume
@@ -4,24 +4,17 @@ from discord.ext import commands
 from discord import Intents
 import logging
 import asyncio
+import signal
 
 from core.config import DISCORD_TOKEN, DISCORD_GUILD_IDS
-from core.music import MusicPlayer
+from core.logs import setup_logging, stop_logging
+from core.metrics import MetricsServer
+from core.player_manager import PlayerManager
+from core.spotify_oauth import token_manager
+from core.spotify_poller import spotify_poller
 
 
-
-import os
-os.makedirs('cache/logs', exist_ok=True)
-spotify_log_path = os.path.join('cache/logs', 'spotify.log')
-with open(spotify_log_path, 'w', encoding='utf-8'):
-    pass
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    filename=os.path.join('cache/logs', 'bot.log'),
-    filemode="w",
-    encoding='utf-8',
-)
+setup_logging()
 logger = logging.getLogger("bot")
 
 # Setup bot with required intents
@@ -33,7 +26,8 @@ intents.messages = True
 
 bot = commands.Bot(command_prefix="!", intents=intents, debug_guilds=DISCORD_GUILD_IDS if DISCORD_GUILD_IDS else None)
 
-bot.music_player = MusicPlayer(bot)
+bot.players = PlayerManager(bot)
+bot.metrics = MetricsServer()
 
 # Register cogs
 async def load_cogs():
@@ -46,12 +40,17 @@ async def on_ready():
     logger.info(f"Bot connected as {bot.user}")
     logger.info(f"Guild IDs configured: {DISCORD_GUILD_IDS}")
     
+    bot.players.start()
+    await bot.metrics.start()
+
     # Connect Wavelink nodes
     try:
-        await bot.music_player.connect_nodes()
+        await bot.players.connect_nodes()
         logger.info("Wavelink nodes connected.")
     except Exception as e:
         logger.error(f"Failed to connect Wavelink nodes: {e}", exc_info=True)
+    # Resume the previous run's sessions as soon as a node is ready
+    bot.players.restore_sessions()
     
     # Sync commands
     logger.info("Starting application command sync...")
@@ -61,10 +60,36 @@ async def on_ready():
     except Exception as e:
         logger.error(f"Error syncing commands: {e}", exc_info=True)
 
+async def shutdown(sig: signal.Signals):
+    """Snapshot sessions while voice is still connected, then close the bot."""
+    if bot.is_closed():
+        return
+    logger.info(f"Received {sig.name}, shutting down.")
+    bot.players.sessions.save()
+    await bot.close()
+
+def install_signal_handlers():
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, lambda sig=sig: asyncio.create_task(shutdown(sig)))
+        except NotImplementedError:
+            # Windows event loops don't support signal handlers; Ctrl+C still ends bot.start()
+            pass
+
 async def main():
     async with bot:
         await load_cogs()
-        await bot.start(DISCORD_TOKEN)
+        install_signal_handlers()
+        try:
+            await bot.start(DISCORD_TOKEN)
+        finally:
+            bot.players.sessions.save()
+            bot.players.flush_histories()
+            await spotify_poller.close()
+            await token_manager.close()
+            await bot.metrics.stop()
+            stop_logging()
 
 if __name__ == "__main__":
     asyncio.run(main())
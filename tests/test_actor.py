@@ -0,0 +1,120 @@
+# tests/test_actor.py
+import asyncio
+import contextvars
+
+import pytest
+
+from core.actor import Mailbox
+
+
+def test_duplicate_keys_run_once_in_submission_order():
+    async def run():
+        mailbox = Mailbox("test")
+        ran = []
+
+        async def op(name):
+            ran.append(name)
+            await asyncio.sleep(0)
+            return name
+
+        futures = [
+            mailbox.submit(op, "skip", key="skip"),
+            mailbox.submit(op, "start", key="start"),
+            mailbox.submit(op, "skip again", key="skip"),
+            mailbox.submit(op, "unkeyed"),
+            mailbox.submit(op, "start again", key="start"),
+            mailbox.submit(op, "unkeyed"),
+        ]
+        results = await asyncio.gather(*futures)
+        assert ran == ["skip", "start", "unkeyed", "unkeyed"]
+        # Coalesced submissions share the first one's future and result
+        assert results == ["skip", "start", "skip", "unkeyed", "start", "unkeyed"]
+        assert futures[0] is futures[2] and futures[1] is futures[4]
+        assert mailbox.coalesced == 2
+
+    asyncio.run(run())
+
+
+def test_key_is_queued_again_once_its_operation_has_started():
+    async def run():
+        mailbox = Mailbox("test")
+        started = asyncio.Event()
+        release = asyncio.Event()
+        ran = []
+
+        async def op(name):
+            ran.append(name)
+            started.set()
+            await release.wait()
+
+        first = mailbox.submit(op, "first", key="start")
+        await started.wait()
+        # The first "start" is running, not waiting, so this one is not a duplicate
+        second = mailbox.submit(op, "second", key="start")
+        assert second is not first
+        release.set()
+        await asyncio.gather(first, second)
+        assert ran == ["first", "second"]
+
+    asyncio.run(run())
+
+
+def test_nested_calls_run_inline_and_context_is_kept():
+    request = contextvars.ContextVar("request", default=None)
+
+    async def run():
+        mailbox = Mailbox("test")
+        seen = []
+
+        async def inner():
+            seen.append(("inner", request.get()))
+            return "inner"
+
+        async def outer():
+            seen.append(("outer", request.get()))
+            # Would deadlock if it waited behind itself in the mailbox
+            return await mailbox.call(inner, key="inner")
+
+        request.set("cmd-1")
+        assert await asyncio.wait_for(mailbox.call(outer, key="outer"), 1) == "inner"
+        assert seen == [("outer", "cmd-1"), ("inner", "cmd-1")]
+
+    asyncio.run(run())
+
+
+def test_failures_reach_the_caller_and_later_operations_still_run():
+    async def run():
+        mailbox = Mailbox("test")
+
+        async def broken():
+            raise ValueError("nope")
+
+        async def ok():
+            return "ok"
+
+        with pytest.raises(ValueError):
+            await mailbox.call(broken, key="skip")
+        assert await mailbox.call(ok, key="skip") == "ok"
+
+    asyncio.run(run())
+
+
+def test_close_cancels_queued_operations():
+    async def run():
+        mailbox = Mailbox("test")
+        release = asyncio.Event()
+
+        async def op():
+            await release.wait()
+
+        running = mailbox.submit(op, key="a")
+        queued = mailbox.submit(op, key="b")
+        await asyncio.sleep(0)
+        mailbox.close()
+        assert queued.cancelled()
+        assert len(mailbox) == 0
+        # The running operation is cancelled along with the consumer task
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(running, 1)
+
+    asyncio.run(run())
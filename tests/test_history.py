@@ -0,0 +1,134 @@
+# tests/test_history.py
+import asyncio
+import os
+
+from core.history import PlayHistory
+from core.tracks import TrackRef
+
+
+def _ref(n: int) -> TrackRef:
+    return TrackRef(f"enc{n}", f"id{n}", f"Track {n}", "Artist", 1000 * n)
+
+
+def _ids(history) -> list[str]:
+    return [ref.identifier for ref in history]
+
+
+def _lines(path) -> int:
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def test_ring_buffer_wraps_like_a_bounded_list():
+    history = PlayHistory(1, capacity=5, directory="unused")
+    expected = []
+    for n in range(13):
+        history.append(_ref(n))
+        expected = (expected + [f"id{n}"])[-5:]
+        assert _ids(history) == expected
+        assert len(history) == len(expected)
+        assert history[-1].identifier == expected[-1]
+        assert history[0].identifier == expected[0]
+    assert [ref.identifier for ref in history.recent(3)] == ["id12", "id11", "id10"]
+    assert [ref.identifier for ref in history.recent(50)] == expected[::-1]
+
+
+def test_membership_counts_follow_evictions():
+    history = PlayHistory(1, capacity=3, directory="unused")
+    for n in (1, 2, 1):
+        history.append(_ref(n))
+    history.append(_ref(3))  # evicts the older 1; the newer one is still there
+    assert _ref(1) in history
+    history.append(_ref(4))  # evicts 2
+    assert _ref(2) not in history
+    history.append(_ref(5))  # evicts the last 1
+    assert _ref(1) not in history
+    assert _ids(history) == ["id3", "id4", "id5"]
+
+
+def test_random_choice_skips_recent_when_possible():
+    history = PlayHistory(1, capacity=10, directory="unused")
+    assert history.random_choice() is None
+    for n in range(10):
+        history.append(_ref(n))
+    picks = {history.random_choice(skip_recent=7).identifier for _ in range(200)}
+    assert picks <= {"id0", "id1", "id2"}
+
+
+def test_flush_and_reload_round_trip(tmp_path):
+    history = PlayHistory(7, capacity=5, directory=str(tmp_path))
+    for n in range(3):
+        history.append(_ref(n))
+    history.flush()
+    history.append(_ref(3))
+    history.flush()
+    assert _lines(history.path) == 4
+
+    reloaded = PlayHistory(7, capacity=5, directory=str(tmp_path))
+    reloaded.load()
+    assert _ids(reloaded) == ["id0", "id1", "id2", "id3"]
+    assert reloaded[-1].to_dict() == _ref(3).to_dict()
+
+
+def test_file_is_compacted_to_the_live_window(tmp_path):
+    history = PlayHistory(7, capacity=3, directory=str(tmp_path))
+    history.load()  # compaction only happens once the file has been read
+    for n in range(5):
+        history.append(_ref(n))
+        history.flush()
+    assert _lines(history.path) == 5
+    for n in range(5, 8):
+        history.append(_ref(n))
+        history.flush()
+    # The file grew past twice the capacity, so only the live window was kept
+    assert _lines(history.path) <= 2 * history.capacity
+    reloaded = PlayHistory(7, capacity=3, directory=str(tmp_path))
+    reloaded.load()
+    assert _ids(reloaded) == ["id5", "id6", "id7"]
+
+
+def test_corrupt_lines_are_skipped(tmp_path):
+    history = PlayHistory(7, capacity=5, directory=str(tmp_path))
+    history.append(_ref(1))
+    history.flush()
+    with open(history.path, "a", encoding="utf-8") as f:
+        f.write("{not json\n")
+    history.append(_ref(2))
+    history.flush()
+    reloaded = PlayHistory(7, capacity=5, directory=str(tmp_path))
+    reloaded.load()
+    assert _ids(reloaded) == ["id1", "id2"]
+
+
+def test_async_load_keeps_plays_made_meanwhile(tmp_path):
+    async def run():
+        history = PlayHistory(7, capacity=4, directory=str(tmp_path))
+        await history.load_async()
+        for n in range(3):
+            history.append(_ref(n))
+        await history.flush_async()
+        assert not history.dirty
+
+        restarted = PlayHistory(7, capacity=4, directory=str(tmp_path))
+        loading = asyncio.create_task(restarted.load_async())
+        restarted.append(_ref(10))
+        # Nothing is written until the file has been read, so it can't be read back twice
+        await restarted.flush_async()
+        assert restarted.dirty
+        await loading
+        assert _ids(restarted) == ["id0", "id1", "id2", "id10"]
+        await restarted.flush_async()
+        assert not restarted.dirty
+        assert _lines(restarted.path) == 4
+
+    asyncio.run(run())
+
+
+def test_failed_write_keeps_plays_pending(tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    history = PlayHistory(7, capacity=5, directory=str(blocker))
+    history.append(_ref(1))
+    history.flush()
+    assert history.dirty
+    assert not os.path.exists(history.path)
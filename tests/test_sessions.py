@@ -0,0 +1,98 @@
+# tests/test_sessions.py
+import gzip
+import json
+import time
+from types import SimpleNamespace
+
+from core.sessions import SessionStore, _decode_entry, _encode_entry
+from core.tracks import PendingTrack, TrackRef
+
+
+def _ref(n: int) -> TrackRef:
+    return TrackRef(f"enc{n}", f"id{n}", f"Track {n}", "Artist", 1000 * n, f"https://example.com/{n}",
+                    None, "youtube", False, True)
+
+
+def _fields(ref: TrackRef) -> dict:
+    return ref.to_dict()
+
+
+def _player(guild_id: int, current, queue):
+    vc = SimpleNamespace(connected=True, channel=SimpleNamespace(id=guild_id * 10), position=42_000, paused=True)
+    filters = SimpleNamespace(signature=lambda: (True, False, 80))
+    return SimpleNamespace(vc=vc, guild_id=guild_id, current_song=current, queue=queue, loop_mode="queue",
+                           autoplay_enabled=True, filters=filters)
+
+
+def test_entries_round_trip():
+    playable = _ref(1).to_playable()
+    decoded = _decode_entry(json.loads(json.dumps(_encode_entry(playable))))
+    assert isinstance(decoded, TrackRef)
+    assert _fields(decoded) == _fields(_ref(1))
+
+    pending = PendingTrack("artist - song", title="Song", author="Artist", length=1234, uri="spotify:track:x")
+    decoded = _decode_entry(json.loads(json.dumps(_encode_entry(pending))))
+    assert isinstance(decoded, PendingTrack)
+    assert (decoded.query, decoded.title, decoded.author, decoded.length, decoded.uri) == \
+        ("artist - song", "Song", "Artist", 1234, "spotify:track:x")
+
+    # A PendingTrack that was already resolved is stored as its track
+    pending.resolved = _ref(2)
+    decoded = _decode_entry(json.loads(json.dumps(_encode_entry(pending))))
+    assert isinstance(decoded, TrackRef) and _fields(decoded) == _fields(_ref(2))
+
+
+def test_snapshot_round_trip(tmp_path):
+    queue = [_ref(3), PendingTrack("next song"), _ref(4).to_playable()]
+    store = SessionStore([_player(1, _ref(2).to_playable(), queue)], path=str(tmp_path / "sessions.json.gz"))
+    store._write(store.snapshot())
+
+    sessions = SessionStore([], path=store.path)._read()
+    assert len(sessions) == 1
+    saved = sessions[0]
+    assert (saved["guild"], saved["channel"], saved["position"], saved["paused"]) == (1, 10, 42_000, True)
+    assert (saved["loop"], saved["autoplay"], saved["filters"]) == ("queue", True, [True, False, 80])
+    assert _fields(_decode_entry(saved["track"])) == _fields(_ref(2))
+    restored = [_decode_entry(e) for e in saved["queue"]]
+    assert _fields(restored[0]) == _fields(_ref(3))
+    assert isinstance(restored[1], PendingTrack) and restored[1].query == "next song"
+    assert _fields(restored[2]) == _fields(_ref(4))
+
+
+def test_corrupt_or_truncated_snapshots_are_ignored(tmp_path):
+    path = tmp_path / "sessions.json.gz"
+    store = SessionStore([], path=str(path))
+    good = gzip.compress(json.dumps({"version": 1, "saved_at": time.time(), "sessions": [{"guild": 1}]}).encode())
+
+    path.write_bytes(good[: len(good) // 2])
+    assert store._read() == []
+    path.write_bytes(b"not gzip at all")
+    assert store._read() == []
+    path.write_bytes(gzip.compress(b"{\"version\": 1, \"sessions\": ["))
+    assert store._read() == []
+    path.write_bytes(good)
+    assert store._read() == [{"guild": 1}]
+
+
+def test_stale_or_foreign_snapshots_are_ignored(tmp_path):
+    path = tmp_path / "sessions.json.gz"
+    store = SessionStore([], path=str(path), max_age=60)
+    path.write_bytes(gzip.compress(json.dumps({"version": 1, "saved_at": time.time() - 120, "sessions": [{}]}).encode()))
+    assert store._read() == []
+    path.write_bytes(gzip.compress(json.dumps({"version": 99, "saved_at": time.time(), "sessions": [{}]}).encode()))
+    assert store._read() == []
+
+
+def test_empty_capture_at_shutdown_keeps_previous_snapshot(tmp_path):
+    path = tmp_path / "sessions.json.gz"
+    player = _player(1, _ref(1).to_playable(), [])
+    store = SessionStore([player], path=str(path))
+    store.restored = True
+    store.save()
+    before = path.read_bytes()
+    assert len(store._read()) == 1
+
+    # Voice clients already torn down: every player looks disconnected
+    player.vc.connected = False
+    store.save()
+    assert path.read_bytes() == before
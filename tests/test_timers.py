@@ -0,0 +1,107 @@
+# tests/test_timers.py
+import asyncio
+import random
+
+from core.timers import TimerWheel
+
+TICK = 0.5
+
+
+def _wheel(slots: int = 8) -> TimerWheel:
+    # Driven by hand through advance(), so no test depends on wall-clock time
+    return TimerWheel(tick=TICK, slots=slots, drive=False)
+
+
+def test_fires_in_deadline_order():
+    # Few slots, so most timers wrap around the wheel at least once
+    wheel = _wheel()
+    fired = []
+    delays = random.Random(0).sample(range(1, 60), 30)
+    for ticks in delays:
+        wheel.schedule(ticks, ticks * TICK, lambda ticks=ticks: fired.append(ticks))
+    assert len(wheel) == len(delays)
+    for tick in range(1, max(delays) + 1):
+        wheel.advance()
+        # Each timer fires on exactly the tick its delay rounds up to
+        assert fired == sorted(d for d in delays if d <= tick)
+    assert len(wheel) == 0
+
+
+def test_delays_round_up_to_whole_ticks():
+    wheel = _wheel()
+    fired = []
+    wheel.schedule("soon", 0, lambda: fired.append("soon"))
+    wheel.schedule("partial", 1.2 * TICK, lambda: fired.append("partial"))
+    assert wheel.advance() == 1
+    assert fired == ["soon"]
+    assert wheel.advance() == 1
+    assert fired == ["soon", "partial"]
+
+
+def test_cancel_and_reschedule():
+    wheel = _wheel()
+    fired = []
+    wheel.schedule("a", 3 * TICK, lambda: fired.append("a"))
+    wheel.schedule("b", 3 * TICK, lambda: fired.append("b"))
+    wheel.schedule("c", 20 * TICK, lambda: fired.append("c"))
+    assert wheel.cancel("b")
+    assert not wheel.cancel("b")
+    assert "b" not in wheel and "a" in wheel
+    # Scheduling a pending key replaces it instead of adding a second timer
+    wheel.schedule("a", 10 * TICK, lambda: fired.append("a2"))
+    assert len(wheel) == 2
+    wheel.advance(9)
+    assert fired == []
+    wheel.advance()
+    assert fired == ["a2"]
+    # "c" passes its slot at ticks 4 and 12 but only fires once its rounds are used up
+    wheel.advance(9)
+    assert fired == ["a2"]
+    wheel.advance()
+    assert fired == ["a2", "c"]
+    assert len(wheel) == 0
+
+
+def test_cancelled_timer_never_fires():
+    wheel = _wheel()
+    fired = []
+    wheel.schedule("x", 20 * TICK, lambda: fired.append("x"))
+    wheel.advance(5)
+    assert wheel.cancel("x")
+    wheel.advance(40)
+    assert fired == []
+
+
+def test_coroutine_callbacks_and_failures():
+    async def run():
+        wheel = _wheel()
+        fired = []
+
+        async def callback():
+            fired.append("async")
+
+        def broken():
+            raise RuntimeError("boom")
+
+        wheel.schedule("broken", TICK, broken)
+        wheel.schedule("async", 2 * TICK, callback)
+        wheel.schedule("after", 3 * TICK, lambda: fired.append("after"))
+        # A failing callback is logged and does not stop the wheel
+        assert wheel.advance(3) == 3
+        await asyncio.sleep(0)
+        # Coroutine callbacks run as tasks, so the synchronous one lands first
+        assert fired == ["after", "async"]
+
+    asyncio.run(run())
+
+
+def test_driver_task_advances_with_the_event_loop():
+    async def run():
+        wheel = TimerWheel(tick=0.01, slots=8)
+        done = asyncio.Event()
+        wheel.schedule("key", 0.02, done.set)
+        # Generous timeout: only checks that the driver runs, not its precision
+        await asyncio.wait_for(done.wait(), 5)
+        wheel.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,128 @@
+# tests/test_track_cache.py
+import asyncio
+
+import pytest
+import wavelink
+
+from core import music
+from core.music import TrackCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(music.time, "monotonic", clock)
+    return clock
+
+
+def test_ttl_and_negative_ttl(clock):
+    cache = TrackCache(maxsize=10, ttl=60, negative_ttl=5)
+    cache.put("hit", ["track"])
+    cache.put("miss", [])
+    assert cache.get("hit") == (True, ["track"])
+    assert cache.get("miss") == (True, [])
+    clock.now += 6
+    assert cache.get("miss") == (False, None)
+    assert cache.get("hit") == (True, ["track"])
+    clock.now += 60
+    assert cache.get("hit") == (False, None)
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_lru_eviction(clock):
+    cache = TrackCache(maxsize=2, ttl=60, negative_ttl=5)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", [3])
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, [1])
+    assert cache.get("c") == (True, [3])
+    assert cache.evictions == 1
+
+
+def test_normalize_keeps_urls_and_paths():
+    assert TrackCache.normalize("  Never   Gonna\tGive ") == "never gonna give"
+    assert TrackCache.normalize("https://YouTube.com/watch?v=AbC") == "https://YouTube.com/watch?v=AbC"
+
+
+@pytest.fixture
+def search(monkeypatch):
+    """Replace the Lavalink search with one that blocks until ``release`` is set."""
+    calls = []
+    release = asyncio.Event()
+
+    async def fake_search(query):
+        calls.append(query)
+        await release.wait()
+        if query == "boom":
+            raise RuntimeError("lavalink down")
+        return [f"track:{query}"]
+
+    monkeypatch.setattr(music, "track_cache", TrackCache(maxsize=10, ttl=60, negative_ttl=5))
+    monkeypatch.setattr(music, "_inflight_searches", {})
+    monkeypatch.setattr(music, "compact_search", lambda result: result)
+    monkeypatch.setattr(wavelink.Playable, "search", staticmethod(fake_search))
+    return calls, release
+
+
+def test_concurrent_identical_searches_share_one_request(search):
+    calls, release = search
+
+    async def run():
+        waiters = [asyncio.create_task(music.resolve_tracks(q)) for q in ("Song A", "song a", " SONG  A ")]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        assert results == [["track:Song A"]] * 3
+        assert calls == ["Song A"]
+        assert music.track_cache.coalesced == 2
+        assert not music._inflight_searches
+        # Now served from the cache without another request
+        assert await music.resolve_tracks("song a") == ["track:Song A"]
+        assert calls == ["Song A"]
+
+    asyncio.run(run())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_search(search):
+    calls, release = search
+
+    async def run():
+        first = asyncio.create_task(music.resolve_tracks("song"))
+        second = asyncio.create_task(music.resolve_tracks("song"))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await second == ["track:song"]
+        assert first.cancelled()
+        assert calls == ["song"]
+        assert music.track_cache.get("song") == (True, ["track:song"])
+
+    asyncio.run(run())
+
+
+def test_errors_reach_every_waiter_and_are_not_cached(search):
+    calls, release = search
+
+    async def run():
+        waiters = [asyncio.create_task(music.resolve_tracks("boom")) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert calls == ["boom"]
+        assert music.track_cache.get("boom") == (False, None)
+        assert not music._inflight_searches
+
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+# tests/test_track_map.py
+import random
+
+from core.track_map import TrackMapMatcher
+
+
+def _linear_lookup(mapping: dict[str, str], query: str) -> str | None:
+    """The longest key contained in the query, leftmost on ties, by scanning every key."""
+    query = query.lower().strip()
+    best = None
+    for key, url in mapping.items():
+        key = key.lower().strip()
+        position = query.find(key) if key else -1
+        if position >= 0 and (best is None or (-len(key), position) < best[0]):
+            best = ((-len(key), position), url)
+    return best[1] if best else None
+
+
+def test_matches_linear_scan():
+    rng = random.Random(0)
+    for _ in range(500):
+        # A small alphabet makes overlapping and nested keys common
+        mapping = {"x" + "".join(rng.choice("ab ") for _ in range(rng.randint(0, 4))) + "y": f"url{i}"
+                   for i in range(rng.randint(0, 12))}
+        matcher = TrackMapMatcher(mapping)
+        for _ in range(30):
+            query = "".join(rng.choice("abxy ") for _ in range(rng.randint(0, 15)))
+            assert matcher.lookup(query) == _linear_lookup(mapping, query), (mapping, query)
+
+
+def test_longest_key_wins_and_case_is_ignored():
+    matcher = TrackMapMatcher({"never gonna": "short", "never gonna give you up": "long", "": "empty"})
+    assert matcher.lookup("  Rick Astley - NEVER GONNA GIVE YOU UP ") == "long"
+    assert matcher.lookup("never gonna let you down") == "short"
+    assert matcher.lookup("something else") is None
+
+
+def test_tracks_map_changes():
+    mapping = {"song": "a"}
+    matcher = TrackMapMatcher(mapping)
+    matcher.set_override("song remix", "b")
+    assert matcher.lookup("song remix") == "b"
+    assert matcher.remove_override("song remix")
+    assert not matcher.remove_override("song remix")
+    assert matcher.lookup("song remix") == "a"
+    # Edits that change the number of keys are picked up without rebuild()
+    mapping["remix"] = "c"
+    assert matcher.lookup("the remix") == "c"
+    matcher.mapping = {"other": "d"}
+    assert matcher.lookup("song") is None
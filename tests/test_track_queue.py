@@ -0,0 +1,109 @@
+# tests/test_track_queue.py
+import random
+
+import pytest
+
+from core.track_queue import TrackQueue
+
+
+class _Track:
+    def __init__(self, n: int):
+        self.length = n
+
+    def __repr__(self):
+        return f"_Track({self.length})"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 512])
+def test_matches_list(chunk_size):
+    """Random operations give the same result on a TrackQueue as on a plain list."""
+    rng = random.Random(chunk_size)
+    queue, expected = TrackQueue(chunk_size=chunk_size), []
+    counter = iter(range(10**9))
+    for _ in range(3000):
+        op = rng.randrange(10)
+        if op == 0:
+            track = _Track(next(counter))
+            queue.append(track)
+            expected.append(track)
+        elif op == 1:
+            track = _Track(next(counter))
+            queue.appendleft(track)
+            expected.insert(0, track)
+        elif op == 2 and expected:
+            assert queue.popleft() is expected.pop(0)
+        elif op == 3 and expected:
+            index = rng.randrange(-len(expected), len(expected))
+            assert queue.pop(index) is expected.pop(index)
+        elif op == 4:
+            index = rng.randrange(-len(expected) - 2, len(expected) + 3)
+            track = _Track(next(counter))
+            queue.insert(index, track)
+            expected.insert(index, track)
+        elif op == 5:
+            tracks = [_Track(next(counter)) for _ in range(rng.randrange(12))]
+            queue.extend(tracks)
+            expected.extend(tracks)
+        elif op == 6 and expected:
+            src, dst = rng.randrange(len(expected)), rng.randrange(len(expected))
+            track = expected.pop(src)
+            expected.insert(dst, track)
+            assert queue.move(src, dst) is track
+        elif op == 7 and expected:
+            index = rng.randrange(len(expected))
+            assert queue[index] is expected[index]
+            assert queue[-1 - index] is expected[-1 - index]
+        elif op == 8:
+            start, stop = rng.randrange(-5, len(expected) + 5), rng.randrange(-5, len(expected) + 5)
+            assert queue[start:stop] == expected[start:stop]
+        elif op == 9 and expected and rng.random() < 0.05:
+            queue.clear()
+            expected.clear()
+        assert len(queue) == len(expected)
+        assert bool(queue) == bool(expected)
+        assert list(queue) == expected
+        assert queue.total_length == sum(t.length for t in expected)
+
+
+def test_remove_and_shuffle():
+    tracks = [_Track(n) for n in range(100)]
+    queue = TrackQueue(tracks, chunk_size=4)
+    queue.remove(tracks[10])
+    assert list(queue) == tracks[:10] + tracks[11:]
+    with pytest.raises(ValueError):
+        queue.remove(tracks[10])
+    queue.shuffle()
+    assert sorted(queue, key=lambda t: t.length) == tracks[:10] + tracks[11:]
+    assert queue.total_length == sum(t.length for t in tracks) - 10
+
+
+def test_peek_does_not_consume():
+    tracks = [_Track(n) for n in range(10)]
+    queue = TrackQueue(tracks, chunk_size=2)
+    assert queue.peek(3) == tracks[:3]
+    assert queue.peek(50) == tracks
+    assert list(queue) == tracks
+
+
+def test_empty_queue_errors():
+    queue = TrackQueue()
+    assert queue.peek(1) == []
+    with pytest.raises(IndexError):
+        queue.popleft()
+    with pytest.raises(IndexError):
+        queue[0]
+
+
+def test_deletions_merge_underfull_chunks():
+    chunk_size = 8
+    queue = TrackQueue((_Track(n) for n in range(4000)), chunk_size=chunk_size)
+    expected = list(queue)
+    rng = random.Random(1)
+    for _ in range(3500):
+        index = rng.randrange(len(expected))
+        assert queue.pop(index) is expected.pop(index)
+    assert list(queue) == expected
+    # Every chunk but the last holds at least chunk_size / 2 tracks
+    sizes = [len(chunk) for chunk in queue._chunks]
+    assert all(size * 2 >= chunk_size for size in sizes[:-1]), sizes
+    assert len(sizes) <= 2 * len(expected) // chunk_size + 1